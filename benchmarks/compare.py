@@ -0,0 +1,69 @@
+"""
+Compares two benchmark result files written by benchmarks.run, and flags regressions.
+
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json --threshold 10
+
+Exits with status 1 if any metric regressed by more than the threshold percentage.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Metrics where a larger value is better. For every other compared metric, smaller is better.
+HIGHER_IS_BETTER_SUFFIXES = ("_per_second",)
+# Only timing and throughput metrics are compared; counts describe the run rather than its speed
+COMPARED_SUFFIXES = ("_ms", "seconds", "_per_second")
+
+
+def flatten(results: dict | list, prefix: str = "") -> dict[str, float]:
+    """Flattens nested results into dotted metric names. Match results are keyed by their parameters."""
+    metrics: dict[str, float] = {}
+    items = (
+        ((f"batch{item.get('llm_batch_size')}-concurrency{item.get('concurrency')}", item) for item in results)
+        if isinstance(results, list)
+        else results.items()
+    )
+    for key, value in items:
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, (dict, list)):
+            metrics.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and name.endswith(COMPARED_SUFFIXES):
+            metrics[name] = float(value)
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="The percentage change counted as a regression.")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    if baseline.get("results_version") != candidate.get("results_version"):
+        sys.exit("The result files were written by different versions of the benchmarks and can't be compared.")
+    if baseline.get("parameters") != candidate.get("parameters"):
+        print("Warning: the runs used different parameters.", file=sys.stderr)
+
+    baseline_metrics = flatten(baseline["results"])
+    candidate_metrics = flatten(candidate["results"])
+    regressions = 0
+    print(f"{'metric':<60} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for name in sorted(baseline_metrics.keys() & candidate_metrics.keys()):
+        before, after = baseline_metrics[name], candidate_metrics[name]
+        change = (after - before) / before * 100 if before else 0.0
+        worse = -change if name.endswith(HIGHER_IS_BETTER_SUFFIXES) else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:<60} {before:>12.3f} {after:>12.3f} {change:>+8.1f}%{flag}")
+    if regressions:
+        print(f"{regressions} metrics regressed by more than {args.threshold:g}%.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+Runs the benchmark scenarios against a synthetic register and a stub LLM server, entirely
+offline, and writes the results as JSON for comparing between commits.
+
+Scenarios:
+    - ingest: CompaniesHouseDB.create_database_from_source, loading and indexing the
+      synthetic register. Always run, since the other scenarios query its database.
+    - fts: rebuilding the companies FTS index with _create_fts_index.
+    - search: search_companies_by_name latency percentiles, for each search mode.
+    - batch_search: search_companies_by_names latency and throughput, for each number of
+      names searched at once.
+    - match: /api/match-companies throughput and latency over HTTP, for each LLM batch size
+      and number of concurrent requests, with the stub server standing in for the LLM.
+
+    uv run python -m benchmarks.run --rows 100000
+    uv run python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+import httpx
+
+from benchmarks.stub_llm_server import create_app as create_stub_llm_app, free_port, serve_in_background
+from benchmarks.synthetic_register import SyntheticRegister
+from company_structure_api.app import app
+from company_structure_api.config import Settings
+from company_structure_api.db import CompaniesHouseDB
+from company_structure_api.db_versions import DatabaseVersions
+
+logger = logging.getLogger("benchmarks")
+
+# Bump when results change meaning, so compare.py doesn't compare them with older results
+RESULTS_VERSION = 1
+
+SCENARIOS = ["fts", "search", "batch_search", "match"]
+
+
+def latency_summary(seconds: list[float]) -> dict[str, float]:
+    """Summarizes latencies, in milliseconds."""
+    if not seconds:
+        return {}
+    ordered = sorted(seconds)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(0.5),
+        "p90_ms": percentile(0.9),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def git_revision() -> dict[str, str | bool | None]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+@contextmanager
+def environment(**variables: str) -> Iterator[None]:
+    """Sets environment variables, which Settings reads, for the duration of the block."""
+    previous = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def bench_ingest(config: Settings) -> tuple[Path, dict]:
+    """Builds a database version from the synthetic register and makes it live."""
+    versions = DatabaseVersions(config.db_path)
+    db_path = versions.new_version_path()
+    started_at = time.perf_counter()
+    with CompaniesHouseDB(db_path=str(db_path)) as db:
+        db.create_database_from_source(config)
+        rows = db.row_count()
+    elapsed = time.perf_counter() - started_at
+    versions.set_current(db_path)
+    versions.prune(keep=1)
+    return db_path, {
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed,
+        "source_bytes": Path(config.data_source).stat().st_size,
+        "database_bytes": db_path.stat().st_size,
+    }
+
+
+def bench_fts_index(db_path: Path, repeats: int) -> dict:
+    durations = []
+    with CompaniesHouseDB(db_path=str(db_path)) as db:
+        for _ in range(repeats):
+            started_at = time.perf_counter()
+            db._create_fts_index()
+            durations.append(time.perf_counter() - started_at)
+    return {"repeats": repeats, "median_seconds": statistics.median(durations), "min_seconds": min(durations)}
+
+
+def bench_search(db_path: Path, queries: list[str], search_modes: list[str], warmup: int = 20) -> dict:
+    results = {}
+    for search_mode in search_modes:
+        with CompaniesHouseDB(db_path=str(db_path), read_only=True, search_mode=search_mode) as db:
+            for query in queries[:warmup]:
+                db.search_companies_by_name(query)
+            durations = []
+            for query in queries:
+                started_at = time.perf_counter()
+                db.search_companies_by_name(query)
+                durations.append(time.perf_counter() - started_at)
+            results[search_mode] = latency_summary(durations)
+    return results
+
+
+def bench_batch_search(db_path: Path, queries: list[str], batch_sizes: list[int]) -> dict:
+    """Searches the queries in batches of each size, as /api/match-companies does."""
+    results = {}
+    with CompaniesHouseDB(db_path=str(db_path), read_only=True) as db:
+        # Warm up the caches
+        db.search_companies_by_names(queries[:max(batch_sizes)])
+        for batch_size in batch_sizes:
+            batches = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+            durations = []
+            for batch in batches:
+                started_at = time.perf_counter()
+                db.search_companies_by_names(batch)
+                durations.append(time.perf_counter() - started_at)
+            elapsed = sum(durations)
+            results[f"batch{batch_size}"] = {
+                "batches": len(batches),
+                "names": len(queries),
+                "names_per_second": len(queries) / elapsed,
+                "batch_latency": latency_summary(durations),
+            }
+            logger.warning(f"batch_search: batch size {batch_size}: {len(queries) / elapsed:,.0f} names/s")
+    return results
+
+
+async def run_match_load(
+    base_url: str,
+    request_bodies: list[dict],
+    concurrency: int,
+) -> dict:
+    """Posts the requests to /api/match-companies, `concurrency` at a time."""
+    pending = list(reversed(request_bodies))
+    durations: list[float] = []
+    decisions: Counter[str] = Counter()
+    errors = 0
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        while pending:
+            body = pending.pop()
+            started_at = time.perf_counter()
+            response = await client.post("/api/match-companies", json=body)
+            durations.append(time.perf_counter() - started_at)
+            if response.status_code != 200:
+                errors += 1
+                continue
+            for result in response.json()["matches"].values():
+                decisions[result.get("decided_by") or "no_match"] += 1
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+        started_at = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started_at
+
+    names = sum(len(body["company_names"]) for body in request_bodies)
+    return {
+        "requests": len(request_bodies),
+        "names": names,
+        "errors": errors,
+        "seconds": elapsed,
+        "requests_per_second": len(request_bodies) / elapsed,
+        "names_per_second": names / elapsed,
+        "request_latency": latency_summary(durations),
+        "decided_by": dict(decisions),
+    }
+
+
+def bench_match(
+    config: Settings,
+    workdir: Path,
+    queries: list[str],
+    batch_sizes: list[int],
+    concurrency_levels: list[int],
+    requests: int,
+    names_per_request: int,
+    llm_latency_ms: float,
+) -> list[dict]:
+    request_bodies = [
+        {"company_names": [queries[(i * names_per_request + j) % len(queries)] for j in range(names_per_request)]}
+        for i in range(requests)
+    ]
+    stub_llm_app = create_stub_llm_app(latency_ms=llm_latency_ms)
+    results = []
+    with serve_in_background(stub_llm_app, free_port()) as stub_llm_url:
+        for batch_size in batch_sizes:
+            with environment(
+                DB_PATH=config.db_path,
+                OPENAI_BASE_URL=f"{stub_llm_url}/v1",
+                OPENAI_API_KEY="stub",
+                OPENAI_MODEL_NAME="stub",
+                LLM_BATCH_SIZE=str(batch_size),
+                RECOMMENDATION_CACHE_ENABLED="false",
+                DB_VERSION_POLL_SECONDS="0",
+                FORCE_RECREATE_DB="false",
+                MATCH_JOB_STORE_PATH=str(workdir / "match_jobs.sqlite"),
+            ), serve_in_background(app, free_port()) as app_url:
+                # Warm up the connection pool and caches
+                asyncio.run(run_match_load(app_url, request_bodies[:1], 1))
+                for concurrency in concurrency_levels:
+                    llm_requests_before = stub_llm_app.state.requests
+                    result = asyncio.run(run_match_load(app_url, request_bodies, concurrency))
+                    result.update({
+                        "llm_batch_size": batch_size,
+                        "concurrency": concurrency,
+                        "llm_requests": stub_llm_app.state.requests - llm_requests_before,
+                    })
+                    logger.warning(
+                        f"match: batch size {batch_size}, concurrency {concurrency}: "
+                        f"{result['names_per_second']:,.0f} names/s"
+                    )
+                    results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark scenarios and write the results as JSON.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Companies in the synthetic register.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--workdir", type=Path, help="Where to write the register and database. Defaults to a temporary directory.")
+    parser.add_argument("--output", type=Path, help="The results file. Defaults to benchmarks/results/<time>-<commit>.json.")
+    parser.add_argument("--fts-repeats", type=int, default=3)
+    parser.add_argument("--search-queries", type=int, default=500)
+    parser.add_argument("--search-modes", nargs="+", choices=["index", "scan"], default=["index"])
+    parser.add_argument("--search-batch-sizes", nargs="+", type=int, default=[1, 10, 60, 200])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 10, 25])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32, help="Match requests sent per batch size and concurrency.")
+    parser.add_argument("--names-per-request", type=int, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    args = parser.parse_args()
+
+    # The package logs every request and query at INFO, which would drown out the progress
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="company-structure-benchmarks-") as temp_dir:
+        workdir = args.workdir or Path(temp_dir)
+        register = SyntheticRegister(args.rows, args.seed)
+        source_path = workdir / f"synthetic-{args.rows}-{args.seed}.zip"
+        if not source_path.exists():
+            logger.warning(f"Generating {args.rows:,} companies into '{source_path}'...")
+            register.write(source_path)
+        config = Settings(
+            data_source=str(source_path),
+            db_path=str(workdir / "db" / "companies.duckdb"),
+            data_dir=str(workdir / "data"),
+            parquet_cache_enabled=False,
+        )
+        Path(config.db_path).parent.mkdir(parents=True, exist_ok=True)
+        queries = register.queries(max(args.search_queries, args.requests * args.names_per_request), args.seed)
+
+        results: dict = {}
+        logger.warning("Running scenario: ingest")
+        db_path, results["ingest"] = bench_ingest(config)
+        if "fts" in args.scenarios:
+            logger.warning("Running scenario: fts")
+            results["fts"] = bench_fts_index(db_path, args.fts_repeats)
+        if "search" in args.scenarios:
+            logger.warning("Running scenario: search")
+            results["search"] = bench_search(db_path, queries[:args.search_queries], args.search_modes)
+        if "batch_search" in args.scenarios:
+            logger.warning("Running scenario: batch_search")
+            results["batch_search"] = bench_batch_search(
+                db_path, queries[:args.search_queries], args.search_batch_sizes
+            )
+        if "match" in args.scenarios:
+            logger.warning("Running scenario: match")
+            results["match"] = bench_match(
+                config, workdir, queries, args.batch_sizes, args.concurrency,
+                args.requests, args.names_per_request, args.llm_latency_ms,
+            )
+
+    revision = git_revision()
+    report = {
+        "results_version": RESULTS_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git": revision,
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": {
+            key: value for key, value in vars(args).items() if key not in ("workdir", "output")
+        },
+        "results": results,
+    }
+    output = args.output or Path("benchmarks/results") / (
+        f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{(revision['commit'] or 'unknown')[:12]}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"Wrote benchmark results to '{output}'.")
+
+
+if __name__ == "__main__":
+    main()
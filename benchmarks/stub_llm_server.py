@@ -0,0 +1,129 @@
+"""
+A local OpenAI-compatible chat completions server for benchmarking without a real LLM.
+
+It answers the prompts CompanyVisualizer sends, single-query and batched, after a
+configurable latency, and reports token usage estimated from the prompt length.
+
+    python -m benchmarks.stub_llm_server --port 8099 --latency-ms 400
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=stub uv run company_structure_api
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Literal
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+AnswerMode = Literal["first", "last", "random", "invalid"]
+
+QUERY_PATTERN = re.compile(r'^Query (\d+): ', re.MULTILINE)
+MATCH_PATTERN = re.compile(r'^- ([^:\s]+): ', re.MULTILINE)
+
+# Roughly how many characters make a token, for the reported usage
+CHARACTERS_PER_TOKEN = 4
+
+
+def choose_answer(candidates: list[str], answer: AnswerMode, rng: random.Random) -> str:
+    if answer == "invalid" or not candidates:
+        return "NONE"
+    if answer == "last":
+        return candidates[-1]
+    if answer == "random":
+        return rng.choice(candidates)
+    return candidates[0]
+
+
+def answer_prompt(prompt: str, batched: bool, answer: AnswerMode, rng: random.Random) -> str:
+    """Answers a RECOMMEND_BEST_MATCH_PROMPT, or a RECOMMEND_BEST_MATCHES_PROMPT if `batched`."""
+    if not batched:
+        return choose_answer(MATCH_PATTERN.findall(prompt), answer, rng)
+    answers = {}
+    query_starts = list(QUERY_PATTERN.finditer(prompt))
+    for i, query_start in enumerate(query_starts):
+        end = query_starts[i + 1].start() if i + 1 < len(query_starts) else len(prompt)
+        block = prompt[query_start.end():end]
+        answers[query_start.group(1)] = choose_answer(MATCH_PATTERN.findall(block), answer, rng)
+    return json.dumps(answers)
+
+
+def create_app(latency_ms: float = 200.0, jitter_ms: float = 0.0, answer: AnswerMode = "first", seed: int = 0) -> FastAPI:
+    app = FastAPI(title="Stub OpenAI-compatible server")
+    rng = random.Random(seed)
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        batched = (body.get("response_format") or {}).get("type") == "json_object"
+        app.state.requests += 1
+        await asyncio.sleep(max(latency_ms + rng.uniform(-jitter_ms, jitter_ms), 0) / 1000)
+        content = answer_prompt(prompt, batched, answer, rng)
+        prompt_tokens = len(prompt) // CHARACTERS_PER_TOKEN + 1
+        completion_tokens = len(content) // CHARACTERS_PER_TOKEN + 1
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def serve_in_background(app, port: int) -> Iterator[str]:
+    """Serves an ASGI app on a background thread, yielding its base URL once it is up."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Server on port {port} failed to start.")
+        time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub OpenAI-compatible chat completions server.")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="How long each completion takes.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="A random +/- variation on the latency.")
+    parser.add_argument(
+        "--answer", choices=["first", "last", "random", "invalid"], default="first",
+        help="Which listed match to recommend. 'invalid' answers with no valid company number.",
+    )
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.answer), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
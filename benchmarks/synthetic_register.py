@@ -0,0 +1,231 @@
+"""
+Generates synthetic Companies House "BasicCompanyData" CSVs for benchmarking.
+
+Every row is derived from the seed and its row number alone, so the same arguments always
+produce the same file, and the names of any row can be regenerated (e.g. to make search
+queries) without reading the file back.
+
+    python -m benchmarks.synthetic_register data/synthetic.zip --rows 1000000
+"""
+import argparse
+import csv
+import io
+import random
+import zipfile
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+
+from company_structure_api.models import Company
+
+NAME_WORDS = [
+    "ACME", "ALPHA", "ANCHOR", "APEX", "ARROW", "ATLAS", "AURORA", "BEACON", "BIRCH", "BLUE", "BRIDGE",
+    "BRIGHT", "CASTLE", "CEDAR", "CENTRAL", "CITY", "CLEAR", "COASTAL", "CROWN", "DELTA", "EAGLE", "EAST",
+    "EDEN", "ELM", "EMPIRE", "FALCON", "FIRST", "FOREST", "FOX", "GLOBAL", "GOLDEN", "GRANITE", "GREEN",
+    "HARBOUR", "HERITAGE", "HIGHLAND", "HORIZON", "IRON", "IVY", "JUNIPER", "KINGS", "LAKESIDE", "LION",
+    "MAPLE", "MERIDIAN", "MILL", "MONARCH", "NORTH", "NOVA", "OAK", "ORBIT", "PARK", "PEAK", "PHOENIX",
+    "PINE", "PIONEER", "PRIME", "QUAY", "RAVEN", "RED", "RIVER", "ROYAL", "SILVER", "SOUTH", "SOVEREIGN",
+    "SPRING", "STAR", "STONE", "SUMMIT", "THAMES", "TRINITY", "UNION", "VALLEY", "VANGUARD", "VICTORIA",
+    "WEST", "WILLOW", "WINDSOR", "YORK", "ZENITH",
+]
+BUSINESS_WORDS = [
+    "ACCOUNTANCY", "BUILDERS", "CAPITAL", "CARE", "CATERING", "CONSULTANCY", "CONSULTING", "CONSTRUCTION",
+    "DESIGN", "DEVELOPMENTS", "DIGITAL", "ELECTRICAL", "ENERGY", "ENGINEERING", "ESTATES", "FINANCE",
+    "FOODS", "GROUP", "HOLDINGS", "HOMES", "INVESTMENTS", "LOGISTICS", "MANAGEMENT", "MARKETING", "MEDIA",
+    "MOTORS", "PROPERTIES", "RETAIL", "SECURITY", "SERVICES", "SOLUTIONS", "SYSTEMS", "TECHNOLOGIES",
+    "TRADING", "TRANSPORT", "VENTURES",
+]
+SUFFIXES = [("LIMITED", 0.75), ("LTD", 0.12), ("PLC", 0.03), ("LLP", 0.05), ("& CO LIMITED", 0.05)]
+CATEGORIES = [
+    ("Private Limited Company", 0.88),
+    ("PRI/LTD BY GUAR/NSC (Private, limited by guarantee, no share capital)", 0.04),
+    ("Public Limited Company", 0.03),
+    ("Limited Liability Partnership", 0.05),
+]
+STATUSES = [
+    ("Active", 0.85),
+    ("Active - Proposal to Strike off", 0.05),
+    ("Liquidation", 0.03),
+    ("Dissolved", 0.07),
+]
+NUMBER_PREFIXES = [("", 0.9), ("SC", 0.06), ("NI", 0.02), ("OC", 0.02)]
+POST_TOWNS = [
+    ("LONDON", "EC"), ("MANCHESTER", "M"), ("BIRMINGHAM", "B"), ("LEEDS", "LS"), ("GLASGOW", "G"),
+    ("EDINBURGH", "EH"), ("CARDIFF", "CF"), ("BRISTOL", "BS"), ("BELFAST", "BT"), ("NEWCASTLE", "NE"),
+]
+STREETS = ["HIGH STREET", "STATION ROAD", "CHURCH LANE", "MILL ROAD", "KING STREET", "VICTORIA ROAD", "PARK LANE"]
+SIC_CODES = [
+    "62012 - Business and domestic software development",
+    "68209 - Other letting and operating of own or leased real estate",
+    "70229 - Management consultancy activities other than financial management",
+    "41100 - Development of building projects",
+    "56101 - Licensed restaurants",
+    "82990 - Other business support service activities n.e.c.",
+    "99999 - Dormant Company",
+]
+
+# The register's earliest and latest incorporation dates
+FIRST_INCORPORATION = date(1900, 1, 1)
+LAST_INCORPORATION = date(2025, 12, 31)
+
+
+def _choose(rng: random.Random, weighted: list[tuple[str, float]]) -> str:
+    value = rng.random()
+    for choice, weight in weighted:
+        value -= weight
+        if value < 0:
+            return choice
+    return weighted[-1][0]
+
+
+def _format_date(value: date | None) -> str:
+    return value.strftime("%d/%m/%Y") if value else ""
+
+
+@dataclass
+class SyntheticCompany:
+    row: dict[str, str]
+
+    @property
+    def company_name(self) -> str:
+        return self.row["CompanyName"]
+
+    @property
+    def company_number(self) -> str:
+        return self.row["CompanyNumber"]
+
+    @property
+    def previous_names(self) -> list[str]:
+        return [
+            self.row[f"PreviousName_{i}.CompanyName"]
+            for i in range(1, 11)
+            if self.row.get(f"PreviousName_{i}.CompanyName")
+        ]
+
+
+class SyntheticRegister:
+    """A deterministic synthetic register, with `rows` companies generated from `seed`."""
+
+    # Every Company column, in the order the real register lists them
+    COLUMNS = [field_info.alias for field_info in Company.model_fields.values()]
+
+    def __init__(self, rows: int, seed: int = 0, previous_name_fraction: float = 0.2):
+        self.rows = rows
+        self.seed = seed
+        self.previous_name_fraction = previous_name_fraction
+
+    def _random_name(self, rng: random.Random) -> str:
+        words = [rng.choice(NAME_WORDS)]
+        if rng.random() < 0.5:
+            words.append(rng.choice(NAME_WORDS))
+        words.append(rng.choice(BUSINESS_WORDS))
+        words.append(_choose(rng, SUFFIXES))
+        return " ".join(words)
+
+    def company(self, index: int) -> SyntheticCompany:
+        rng = random.Random(self.seed * 1_000_003 + index)
+        prefix = _choose(rng, NUMBER_PREFIXES)
+        company_number = prefix + str(index + 1).zfill(8 - len(prefix))
+        incorporation_date = FIRST_INCORPORATION + timedelta(
+            days=rng.randrange((LAST_INCORPORATION - FIRST_INCORPORATION).days)
+        )
+        status = _choose(rng, STATUSES)
+        post_town, postcode_area = rng.choice(POST_TOWNS)
+        row = dict.fromkeys(self.COLUMNS, "")
+        row.update({
+            "CompanyName": self._random_name(rng),
+            "CompanyNumber": company_number,
+            "RegAddress.AddressLine1": f"{rng.randint(1, 250)} {rng.choice(STREETS)}",
+            "RegAddress.PostTown": post_town,
+            "RegAddress.Country": "UNITED KINGDOM",
+            "RegAddress.PostCode": (
+                f"{postcode_area}{rng.randint(1, 20)} {rng.randint(1, 9)}"
+                f"{rng.choice('ABDEFGHJLNPQRSTUWXYZ')}{rng.choice('ABDEFGHJLNPQRSTUWXYZ')}"
+            ),
+            "CompanyCategory": _choose(rng, CATEGORIES),
+            "CompanyStatus": status,
+            "CountryOfOrigin": "United Kingdom",
+            "DissolutionDate": _format_date(
+                incorporation_date + timedelta(days=rng.randrange(1, 20 * 365)) if status == "Dissolved" else None
+            ),
+            "IncorporationDate": _format_date(incorporation_date),
+            "Accounts.AccountRefDay": str(rng.randint(1, 28)),
+            "Accounts.AccountRefMonth": str(rng.randint(1, 12)),
+            "Accounts.AccountCategory": rng.choice(["MICRO ENTITY", "TOTAL EXEMPTION FULL", "DORMANT", "FULL"]),
+            "Mortgages.NumMortCharges": str(rng.choice([0, 0, 0, 1, 2])),
+            "Mortgages.NumMortOutstanding": "0",
+            "Mortgages.NumMortPartSatisfied": "0",
+            "Mortgages.NumMortSatisfied": "0",
+            "SICCode.SicText_1": rng.choice(SIC_CODES),
+            "LimitedPartnerships.NumGenPartners": "0",
+            "LimitedPartnerships.NumLimPartners": "0",
+            "URI": f"http://business.data.gov.uk/id/company/{company_number}",
+        })
+        if rng.random() < self.previous_name_fraction:
+            changed_on = incorporation_date
+            for i in range(1, rng.randint(1, 3) + 1):
+                changed_on += timedelta(days=rng.randrange(30, 5 * 365))
+                row[f"PreviousName_{i}.CONDATE"] = _format_date(changed_on)
+                row[f"PreviousName_{i}.CompanyName"] = self._random_name(rng)
+        return SyntheticCompany(row)
+
+    def write_csv(self, file: io.TextIOBase):
+        writer = csv.DictWriter(file, fieldnames=self.COLUMNS, lineterminator="\n")
+        writer.writeheader()
+        for index in range(self.rows):
+            writer.writerow(self.company(index).row)
+
+    def write(self, path: Path):
+        """Writes the register as a CSV, or as a zipped CSV like the published file if `path` ends in .zip."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".zip":
+            with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+                with zip_file.open(path.with_suffix(".csv").name, "w") as csv_file:
+                    with io.TextIOWrapper(csv_file, encoding="utf-8", newline="") as text_file:
+                        self.write_csv(text_file)
+        else:
+            with open(path, "w", encoding="utf-8", newline="") as text_file:
+                self.write_csv(text_file)
+
+    def queries(self, count: int, seed: int = 0) -> list[str]:
+        """
+        Returns `count` search queries for random companies in the register, varied the way
+        user-supplied names are: a different suffix spelling, lower case, a dropped word,
+        a typo, or a previous name.
+        """
+        rng = random.Random(seed)
+        queries = []
+        for _ in range(count):
+            company = self.company(rng.randrange(self.rows))
+            name = company.company_name
+            variation = rng.random()
+            if variation < 0.15:
+                queries.append(name)
+            elif variation < 0.35:
+                queries.append(name.replace("LIMITED", "LTD") if "LIMITED" in name else name.replace("LTD", "LIMITED"))
+            elif variation < 0.5:
+                queries.append(name.title())
+            elif variation < 0.65:
+                words = name.split()
+                del words[rng.randrange(len(words))]
+                queries.append(" ".join(words))
+            elif variation < 0.85:
+                position = rng.randrange(len(name))
+                queries.append(name[:position] + rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") + name[position + 1:])
+            else:
+                queries.append(rng.choice(company.previous_names or [name]))
+        return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Companies House CSV for benchmarking.")
+    parser.add_argument("path", type=Path, help="The file to write. A .zip path writes a zipped CSV.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    SyntheticRegister(args.rows, args.seed).write(args.path)
+    print(f"Wrote {args.rows:,} companies to '{args.path}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI, HTTPException
@@ -12,18 +15,75 @@ from company_structure_api.companies_api_router import router as companies_api_r
 from company_structure_api.company_visualizer import CompanyVisualizer
 from company_structure_api.db import initialize_database
 from company_structure_api.config import Settings
+from company_structure_api.group_structure_api_router import router as group_structure_api_router
+from company_structure_api.health import router as health_router
+from company_structure_api.metrics import metrics
+from company_structure_api.match_jobs import MatchJobRunner, MatchJobStore, match_job_store_path
+from company_structure_api.match_jobs_api_router import router as match_jobs_api_router
 from company_structure_api.swagger import router as swagger_router
 
+logger = logging.getLogger(__name__)
+
 @asynccontextmanager
 async def lifespan(lifespan_app: FastAPI):
+    lifespan_app.state.started_at = time.perf_counter()
+    lifespan_app.state.first_request_logged = False
     config = Settings()
-    db = await initialize_database(config)
-    with CompanyVisualizer(config, db) as company_visualizer:
+    metrics.configure(config.metrics_enabled, config.slow_query_log_seconds)
+    db = await asyncio.to_thread(initialize_database, config)
+    with CompanyVisualizer(config, db) as company_visualizer, MatchJobStore(match_job_store_path(config)) as match_job_store:
         lifespan_app.state.company_visualizer = company_visualizer
-        yield
+        await asyncio.to_thread(match_job_store.prune, config.match_job_retention_seconds)
+        match_job_runner = MatchJobRunner(
+            match_job_store, company_visualizer, config.match_job_workers, config.llm_batch_size
+        )
+        lifespan_app.state.match_job_runner = match_job_runner
+        tasks = []
+        if db is None or config.force_recreate_db:
+            # Start serving straight away. /readyz and the API report the build's progress until it completes.
+            tasks.append(asyncio.create_task(company_visualizer.build_database()))
+        if config.db_version_poll_seconds > 0:
+            tasks.append(asyncio.create_task(company_visualizer.watch_database_versions()))
+        await match_job_runner.start()
+        logger.info(f"Server started in {time.perf_counter() - lifespan_app.state.started_at:.2f}s.")
+        try:
+            yield
+        finally:
+            await match_job_runner.stop()
+            for task in tasks:
+                task.cancel()
 
 app = FastAPI(title="Company structure visualizer", docs_url=None, redoc_url=None, lifespan=lifespan)
 app.include_router(swagger_router)
+app.include_router(health_router)
+
+@app.middleware("http")
+async def log_time_to_first_request(request: Request, call_next):
+    response = await call_next(request)
+    if (not request.app.state.first_request_logged and request.url.path.startswith("/api")
+            and response.status_code < 500):
+        request.app.state.first_request_logged = True
+        logger.info(
+            f"First API request served {time.perf_counter() - request.app.state.started_at:.2f}s after startup."
+        )
+    return response
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    if not metrics.enabled or not request.url.path.startswith("/api"):
+        return await call_next(request)
+    started_at = time.perf_counter()
+    token = metrics.start_request()
+    response = await call_next(request)
+    # The route's path template, so that e.g. every company number shares one series
+    route = request.scope.get("route")
+    server_timing = metrics.finish_request(
+        token, getattr(route, "path", "unmatched"), response.status_code, time.perf_counter() - started_at
+    )
+    if server_timing:
+        # A streamed response has only started by now, so this covers the stages before its first event
+        response.headers["Server-Timing"] = server_timing
+    return response
 
 templates = Jinja2Templates(directory=Path(__file__).parent.parent.parent / "templates")
 templates.env.variable_start_string = "[["
@@ -49,4 +109,6 @@ class SPAStaticFiles(StaticFiles):
                 raise ex
 
 app.include_router(companies_api_router)
+app.include_router(group_structure_api_router)
+app.include_router(match_jobs_api_router)
 app.mount("/", SPAStaticFiles(directory=Path(__file__).parent.parent.parent / "static"), name="static")
\ No newline at end of file
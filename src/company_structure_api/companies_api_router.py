@@ -1,14 +1,91 @@
+import asyncio
+import json
 import logging
-from fastapi import APIRouter, HTTPException
+from typing import Annotated, AsyncIterator, Literal
 
-from company_structure_api.models import CompanyMatchRequest, CompanyMatchResponse, CompanyMatchResult
-from company_structure_api.company_visualizer import InjectedCompanyVisualizer
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+from starlette.responses import Response, StreamingResponse
+
+from company_structure_api.models import (
+    Company,
+    CompanyLookupRequest,
+    CompanyLookupResponse,
+    CompanyMatch,
+    CompanyMatchRequest,
+    CompanyMatchResponse,
+    CompanyMatchResult,
+    CompanyMatchStreamError,
+    CompanyMatchStreamProgress,
+    CompanyMatchStreamResult,
+    CompanySearchFilters,
+    CompanySuggestion,
+)
+from company_structure_api.company_visualizer import CompanyVisualizer, InjectedCompanyVisualizer, Recommendation
+from company_structure_api.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api")
 
 
+def build_match_result(matches: list[CompanyMatch], recommendation: Recommendation | None) -> CompanyMatchResult:
+    """
+    Splits the search matches for a name into the recommended match and the other matches.
+    """
+    if not matches:
+        # decided_by is passed so that it is serialized as null, since responses exclude unset fields
+        return CompanyMatchResult(recommended_match=None, other_matches=[], decided_by=None)
+
+    recommended_match = None
+    other_matches = []
+    decided_by = recommendation.decided_by if recommendation else "fallback"
+
+    if recommendation:
+        for match in matches:
+            if match.company_number == recommendation.company_number:
+                recommended_match = match
+            else:
+                other_matches.append(match)
+
+    if not recommended_match:
+        # If LLM fails or returns invalid number, use the best scoring match as recommended
+        recommended_match = matches[0]  # First match has the best score
+        other_matches = matches[1:]     # Rest are other matches
+        decided_by = "fallback"
+
+    return CompanyMatchResult(
+        recommended_match=recommended_match,
+        other_matches=other_matches,
+        decided_by=decided_by,
+    )
+
+
+async def match_names(
+    names: list[str],
+    company_visualizer: CompanyVisualizer,
+    fields: list[str] | None = None,
+    filters: CompanySearchFilters | None = None,
+) -> dict[str, CompanyMatchResult]:
+    """
+    Searches for a list of unique company names in a single database query, and
+    recommends the best match for each. Only the given company fields are fetched,
+    and only companies passing the given filters are matched.
+    """
+    db = company_visualizer.db
+    with metrics.stage("search"):
+        search_results = await db.run(
+            db.search_companies_by_names, names, limit=5, fields=fields, filters=filters
+        )
+    with metrics.stage("recommend"):
+        recommendations = await company_visualizer.recommend_best_matches(search_results, filters, fields)
+    with metrics.stage("build"):
+        return {
+            name: build_match_result(search_results[name], recommendations.get(name))
+            for name in names
+        }
+
+
 @router.post(
     "/match-companies",
     response_model=CompanyMatchResponse,
@@ -21,49 +98,26 @@ async def match_companies(
     """
     Accepts a list of company names and returns the closest matches
     from the Companies House database using Full-Text Search.
-    For each name, it uses an LLM to recommend the best match.
+    For each name, it recommends the best match from exact name or number
+    matches, a decisive search score, or an LLM, and reports which decided it.
+    Duplicate names are matched once, all names are searched in a single
+    database query, and the LLM recommendations are batched and run concurrently.
     """
+    # dict.fromkeys de-duplicates while preserving the request order
+    unique_names = list(dict.fromkeys(request.company_names))
     logger.info(
-        f"Received request to match {len(request.company_names)} company names."
+        f"Received request to match {len(request.company_names)} company names "
+        f"({len(unique_names)} unique)."
     )
-    results = {}
     try:
-        for name in request.company_names:
-            matches = company_visualizer.db.search_companies_by_name(name, limit=5)
-
-            if not matches:
-                results[name] = CompanyMatchResult(recommended_match=None, other_matches=[])
-                continue
-
-            recommended_company_number = await company_visualizer.recommend_best_match(
-                query=name,
-                matches=matches
-            )
-
-            recommended_match = None
-            other_matches = []
-
-            if recommended_company_number:
-                for match in matches:
-                    if match.company_number == recommended_company_number:
-                        recommended_match = match
-                    else:
-                        other_matches.append(match)
-
-            if not recommended_match:
-                # If LLM fails or returns invalid number, use the best scoring match as recommended
-                if matches:
-                    recommended_match = matches[0]  # First match has the best score
-                    other_matches = matches[1:]     # Rest are other matches
-                else:
-                    other_matches = matches
-
-            results[name] = CompanyMatchResult(
-                recommended_match=recommended_match,
-                other_matches=other_matches
-            )
-
-        return CompanyMatchResponse(matches=results)
+        response = CompanyMatchResponse(
+            matches=await match_names(unique_names, company_visualizer, request.company_fields(), request.filters)
+        )
+        # Serialize directly rather than letting FastAPI re-validate every match against
+        # response_model. exclude_unset leaves out fields that weren't selected.
+        with metrics.stage("serialize"):
+            content = response.model_dump_json(by_alias=True, exclude_unset=True)
+        return Response(content=content, media_type="application/json")
 
     except ConnectionError as e:
         logger.error(f"Database connection error during company match: {e}")
@@ -78,3 +132,180 @@ async def match_companies(
             status_code=500,
             detail="An internal server error occurred while matching companies.",
         )
+
+
+def format_stream_event(event: BaseModel, stream_format: Literal["ndjson", "sse"]) -> str:
+    # Every field of the event envelope is sent, including its defaulted type, but a result
+    # excludes unset fields so that its matches only carry the selected company fields
+    payload = event.model_dump(mode="json", by_alias=True, exclude={"result"})
+    if isinstance(event, CompanyMatchStreamResult):
+        payload["result"] = event.result.model_dump(mode="json", by_alias=True, exclude_unset=True)
+    data = json.dumps(payload)
+    if stream_format == "sse":
+        return f"event: {event.type}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+async def stream_match_events(
+    unique_names: list[str],
+    company_visualizer: CompanyVisualizer,
+    fields: list[str] | None = None,
+    filters: CompanySearchFilters | None = None,
+) -> AsyncIterator[CompanyMatchStreamResult | CompanyMatchStreamProgress | CompanyMatchStreamError]:
+    """
+    Matches names in chunks of llm_batch_size, with at most match_concurrency chunks in
+    flight, yielding each chunk's results and a progress event as soon as it completes.
+    Only the in-flight chunks are held in memory, however many names are requested.
+    """
+    chunk_size = max(company_visualizer.config.llm_batch_size, 1)
+    chunks = iter([unique_names[i:i + chunk_size] for i in range(0, len(unique_names), chunk_size)])
+    pending: dict[asyncio.Task, list[str]] = {}
+
+    def start_next_chunk():
+        chunk = next(chunks, None)
+        if chunk:
+            pending[asyncio.create_task(match_names(chunk, company_visualizer, fields, filters))] = chunk
+
+    for _ in range(company_visualizer.config.match_concurrency):
+        start_next_chunk()
+
+    completed = 0
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                chunk = pending.pop(task)
+                start_next_chunk()
+                try:
+                    for name, result in task.result().items():
+                        yield CompanyMatchStreamResult(query=name, result=result)
+                except ConnectionError as e:
+                    logger.error(f"Database connection error during company match: {e}")
+                    for name in chunk:
+                        yield CompanyMatchStreamError(
+                            query=name, detail="The service is currently unable to connect to the database."
+                        )
+                except Exception:
+                    logger.exception("An unexpected error occurred during company matching.")
+                    for name in chunk:
+                        yield CompanyMatchStreamError(
+                            query=name, detail="An internal server error occurred while matching this company."
+                        )
+                completed += len(chunk)
+                yield CompanyMatchStreamProgress(completed=completed, total=len(unique_names))
+    finally:
+        # The client disconnected or the stream otherwise ended early
+        for task in pending:
+            task.cancel()
+
+
+@router.post(
+    "/match-companies/stream",
+    tags=["Companies"],
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "A stream of result, progress and error events.",
+            "content": {"application/x-ndjson": {}, "text/event-stream": {}},
+        }
+    },
+)
+async def match_companies_stream(
+    request: CompanyMatchRequest,
+    company_visualizer: InjectedCompanyVisualizer,
+    format: Literal["ndjson", "sse"] = "ndjson",
+):
+    """
+    Streaming variant of /match-companies. Emits each name's CompanyMatchResult as soon
+    as it is ready, as newline-delimited JSON or server-sent events. Each result event
+    carries its originating query, and progress and error events are interleaved.
+    """
+    unique_names = list(dict.fromkeys(request.company_names))
+    logger.info(
+        f"Received request to stream matches for {len(request.company_names)} company names "
+        f"({len(unique_names)} unique)."
+    )
+
+    async def body() -> AsyncIterator[str]:
+        async for event in stream_match_events(
+            unique_names, company_visualizer, request.company_fields(), request.filters
+        ):
+            yield format_stream_event(event, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    # Ask reverse proxies not to buffer the stream, so events reach the browser as they are emitted
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
+
+
+@router.get(
+    "/companies/suggest",
+    response_model=list[CompanySuggestion],
+    tags=["Companies"]
+)
+async def suggest_companies(
+    company_visualizer: InjectedCompanyVisualizer,
+    q: Annotated[str, Query(min_length=1, max_length=200, description="The name or number typed so far.")],
+    limit: Annotated[int, Query(ge=1, le=50)] = 10,
+):
+    """
+    Suggests companies whose name or company number starts with `q`, for search-as-you-type.
+    Names are compared in the same normalized form as exact matching, so case, punctuation
+    and LTD/LIMITED don't matter.
+
+    Suggestions come from a memory-mapped prefix index rather than the database, and take
+    microseconds, so they are computed inline instead of on the query pool. A request the
+    client has abandoned therefore never queues behind others, and Starlette discards its
+    response when the client disconnects.
+    """
+    suggest_index = company_visualizer.db.suggest_index
+    if suggest_index is None:
+        raise HTTPException(status_code=503, detail="The suggest index is not available.")
+    return suggest_index.suggest(q, limit)
+
+
+@router.get(
+    "/companies/{company_number}",
+    response_model=Company,
+    tags=["Companies"]
+)
+async def get_company(
+    company_number: str,
+    company_visualizer: InjectedCompanyVisualizer,
+):
+    """
+    Returns the full Companies House record for a single company number.
+    """
+    company = (await company_visualizer.get_companies_by_numbers([company_number])).get(company_number)
+    if company is None:
+        raise HTTPException(status_code=404, detail=f"Company '{company_number}' not found.")
+    return company
+
+
+@router.post(
+    "/companies/by-number",
+    response_model=CompanyLookupResponse,
+    tags=["Companies"]
+)
+async def get_companies_by_number(
+    request: CompanyLookupRequest,
+    company_visualizer: InjectedCompanyVisualizer,
+):
+    """
+    Returns the full Companies House records for many company numbers at once, e.g. to
+    refresh every entity in a saved visualization. Numbers not in the in-process cache are
+    fetched in a single database query.
+    """
+    try:
+        companies = await company_visualizer.get_companies_by_numbers(request.company_numbers)
+    except ConnectionError as e:
+        logger.error(f"Database connection error during company lookup: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="The service is currently unable to connect to the database.",
+        )
+    response = CompanyLookupResponse(
+        companies=companies,
+        not_found=[number for number in dict.fromkeys(request.company_numbers) if number not in companies],
+    )
+    return Response(content=response.model_dump_json(by_alias=True), media_type="application/json")
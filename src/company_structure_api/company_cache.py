@@ -0,0 +1,54 @@
+import logging
+from collections import OrderedDict
+
+from company_structure_api.models import Company
+
+logger = logging.getLogger(__name__)
+
+
+class CompanyCache:
+    """
+    An in-process, least recently used cache of companies by company number.
+
+    A cache holds companies from a single database version, and is replaced rather than
+    cleared when the live version changes, so a lookup that started on the old version
+    can't repopulate the new cache with stale rows. It is only used from the event loop,
+    so needs no locking.
+    """
+
+    def __init__(self, db_version: str, max_entries: int):
+        self.db_version = db_version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._companies: OrderedDict[str, Company] = OrderedDict()
+
+    def get_many(self, company_numbers: list[str]) -> tuple[dict[str, Company], list[str]]:
+        """
+        Returns:
+            The cached companies keyed by company number, and the numbers that weren't cached.
+        """
+        found: dict[str, Company] = {}
+        missing: list[str] = []
+        for company_number in company_numbers:
+            company = self._companies.get(company_number)
+            if company is None:
+                missing.append(company_number)
+            else:
+                self._companies.move_to_end(company_number)
+                found[company_number] = company
+        self.hits += len(found)
+        self.misses += len(missing)
+        return found, missing
+
+    def put_many(self, companies: list[Company]):
+        if self.max_entries <= 0:
+            return
+        for company in companies:
+            self._companies[company.company_number] = company
+            self._companies.move_to_end(company.company_number)
+        while len(self._companies) > self.max_entries:
+            self._companies.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._companies)}
@@ -0,0 +1,146 @@
+import re
+import unicodedata
+
+COMPANY_NUMBER_PATTERN = re.compile(r"^(?:[A-Z]{2}\d{6}|\d{8})$")
+
+
+def normalize_company_number(query: str) -> str | None:
+    """
+    Returns the query as a Companies House company number (e.g. 01234567 or SC123456),
+    zero-padding purely numeric queries, or None if it can't be one.
+    """
+    candidate = "".join(query.split()).upper()
+    if candidate.isdigit() and len(candidate) < 8:
+        candidate = candidate.zfill(8)
+    return candidate if COMPANY_NUMBER_PATTERN.match(candidate) else None
+
+
+def normalize_exact_company_name(query: str) -> str:
+    """Returns the query in the upper-case, single-spaced form used by the register."""
+    return " ".join(query.upper().split())
+
+
+# Company name suffixes folded to a single spelling, applied in order to the end of a name.
+# Welsh companies may use the Welsh forms of LIMITED and PUBLIC LIMITED COMPANY.
+COMPANY_NAME_SUFFIXES = [
+    ("PUBLIC LIMITED COMPANY|CWMNI CYFYNGEDIG CYHOEDDUS|CCC", "PLC"),
+    ("LIMITED LIABILITY PARTNERSHIP", "LLP"),
+    ("LIMITED|CYFYNGEDIG|CYF", "LTD"),
+]
+
+
+def company_name_key_sql(name_expression: str) -> str:
+    """
+    Returns a SQL expression for the canonical form of a company name, used to match
+    names that differ only in case, accents, punctuation, "&" or "AND", or the spelling
+    of their LTD/PLC/LLP suffix. For example, "Acme Holdings Ltd." and "ACME HOLDINGS
+    LIMITED" both become "ACME HOLDINGS LTD".
+
+    The same expression is used to build the name keys at ingest and to normalize queries,
+    so the two always agree.
+    """
+    key = f"upper(strip_accents({name_expression}))"
+    key = f"replace({key}, '&', ' AND ')"
+    # Drop dots and apostrophes rather than splitting on them, so "L.T.D." is "LTD"
+    key = f"regexp_replace({key}, '[.''`]', '', 'g')"
+    key = f"trim(regexp_replace({key}, '[^A-Z0-9]+', ' ', 'g'))"
+    for suffixes, folded in COMPANY_NAME_SUFFIXES:
+        key = f"regexp_replace({key}, '(^| )({suffixes})$', '\\1{folded}')"
+    return key
+
+
+def normalize_company_name_key(name: str) -> str:
+    """
+    Returns the canonical form of a company name in Python, mirroring company_name_key_sql
+    for lookups that don't go through the database.
+    """
+    key = _unfolded_company_name_key(name)
+    for suffixes, folded in COMPANY_NAME_SUFFIXES:
+        key = re.sub(rf"(^| )({suffixes})$", rf"\g<1>{folded}", key)
+    return key
+
+
+def _unfolded_company_name_key(name: str) -> str:
+    key = "".join(c for c in unicodedata.normalize("NFKD", name) if not unicodedata.combining(c)).upper()
+    key = key.replace("&", " AND ")
+    key = re.sub(r"[.'`]", "", key)
+    return re.sub(r"[^A-Z0-9]+", " ", key).strip()
+
+
+def company_name_key_prefixes(prefix: str) -> list[str]:
+    """
+    Returns the name key prefixes of the names a partly typed name may be the start of.
+    Suffixes are only folded once they are complete, so as well as its own key, "Acme
+    Limi" gives "ACME LIMI" for e.g. "Acme Limitless Ltd" and "ACME LTD" for "Acme Limited".
+    """
+    key = _unfolded_company_name_key(prefix)
+    if not key:
+        return []
+    prefixes = [normalize_company_name_key(prefix), key]
+    # Any trailing words may be the start of a suffix
+    word_starts = [0, *(match.end() for match in re.finditer(" ", key))]
+    for suffixes, folded in COMPANY_NAME_SUFFIXES:
+        for suffix in suffixes.split("|"):
+            prefixes.extend(key[:start] + folded for start in word_starts if suffix.startswith(key[start:]))
+    return list(dict.fromkeys(prefixes))
+
+
+def company_name_trigram_text_sql(key_expression: str) -> str:
+    """
+    Returns a SQL expression for the text a name key's character trigrams are taken from:
+    the key without its LTD/PLC/LLP suffix or spaces, padded with "#" so the first and last
+    characters form trigrams of their own. Dropping the spaces makes "AcmeHoldings" and
+    "ACME HOLDINGS LIMITED" identical, and a typo only changes the three trigrams around it.
+    """
+    text = f"regexp_replace({key_expression}, '(^| )(LTD|PLC|LLP)$', '')"
+    return f"'#' || replace({text}, ' ', '') || '#'"
+
+
+def postcode_sql(postcode_expression: str) -> str:
+    """
+    Returns a SQL expression for a postcode in the form search filters compare against:
+    upper case, with a single space before the three-character inward code, e.g. "LS1 4AP".
+    """
+    compact = f"upper(regexp_replace({postcode_expression}, '\\s+', '', 'g'))"
+    return (
+        f"CASE WHEN length({compact}) >= 5 "
+        f"THEN left({compact}, length({compact}) - 3) || ' ' || right({compact}, 3) "
+        f"ELSE {compact} END"
+    )
+
+
+def normalize_postcode(postcode: str) -> str:
+    """Returns a postcode in the form postcode_sql gives, in Python."""
+    compact = "".join(postcode.split()).upper()
+    return f"{compact[:-3]} {compact[-3:]}" if len(compact) >= 5 else compact
+
+
+def postcode_prefix_pattern(prefix: str) -> str:
+    """
+    Returns a regular expression matching the postcodes (in postcode_sql form) that start
+    with a postcode area, district or sector, e.g. "L", "LS1" or "LS1 4". An area matches
+    only whole areas, so "L" doesn't match "LS1 4AP", and a district only whole districts,
+    so "LS1" doesn't match "LS14 6AB".
+    """
+    if prefix.isalpha():
+        return f"^{prefix}[0-9]"
+    if prefix[-1].isdigit() and " " not in prefix:
+        return f"^{prefix}([^0-9]|$)"
+    return f"^{prefix}"
+
+
+def parse_sic_code(sic_text: str | None) -> int | None:
+    """Returns the numeric code of a register SIC text, mirroring sic_code_sql in Python."""
+    match = re.match(r"^([0-9]{4,5})", sic_text or "")
+    return int(match.group(1)) if match else None
+
+
+def sic_code_sql(sic_text_expression: str) -> str:
+    """Returns a SQL expression for the numeric code of a register SIC text, e.g. 62012 for "62012 - ..."."""
+    return f"TRY_CAST(regexp_extract({sic_text_expression}, '^([0-9]{{4,5}})', 1) AS INTEGER)"
+
+
+def sic_code_range(prefix: str) -> tuple[int, int]:
+    """Returns the first and last five-digit SIC codes starting with some digits, e.g. 62000-62999 for "62"."""
+    scale = 10 ** (5 - len(prefix))
+    return int(prefix) * scale, (int(prefix) + 1) * scale - 1
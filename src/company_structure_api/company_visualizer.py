@@ -1,15 +1,34 @@
+import asyncio
+import json
 import logging
 import os
-from typing import Annotated
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Annotated, NamedTuple
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException
 from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletionUserMessageParam
 from starlette.requests import Request
 
-from company_structure_api.db import CompaniesHouseDB
-from company_structure_api.models import Company
+from company_structure_api.company_cache import CompanyCache
+from company_structure_api.company_names import normalize_company_number
+from company_structure_api.db import CompaniesHouseDB, build_database_version, open_database
+from company_structure_api.db_versions import DatabaseVersions
+from company_structure_api.metrics import metrics
+from company_structure_api.models import (
+    COMPANY_FILTER_FIELDS,
+    Company,
+    CompanyMatch,
+    CompanySearchFilters,
+    DatabaseStatus,
+    MatchDecision,
+)
 from company_structure_api.config import Settings
+from company_structure_api.recommendation_cache import RecommendationCache
+from company_structure_api.reranker import Reranker, create_reranker
 
 def openai_client(config: Settings) -> AsyncOpenAI:
     if config.custom_openai_api_key_header is not None:
@@ -18,16 +37,51 @@ def openai_client(config: Settings) -> AsyncOpenAI:
             api_key='',  # Empty string prevents Authorization header
             default_headers={
                 config.custom_openai_api_key_header: f'Bearer {config.openai_api_key}'
-            }
+            },
+            max_retries=config.openai_max_retries,
+            timeout=config.openai_timeout_seconds,
         )
     else:
         return AsyncOpenAI(
             base_url=config.openai_base_url,
             api_key=config.openai_api_key,
+            max_retries=config.openai_max_retries,
+            timeout=config.openai_timeout_seconds,
         )
 
+def recommendation_cache(config: Settings, db: CompaniesHouseDB) -> RecommendationCache | None:
+    if not config.recommendation_cache_enabled:
+        return None
+    cache_path = config.recommendation_cache_path or os.path.join(
+        os.path.dirname(config.db_path), "recommendation_cache.sqlite"
+    )
+    cache = RecommendationCache(
+        cache_path=cache_path,
+        db_version=db.version(),
+        ttl_seconds=config.recommendation_cache_ttl_seconds,
+        max_entries=config.recommendation_cache_max_entries,
+    )
+    cache.connect()
+    return cache
+
 logger = logging.getLogger(__name__)
 
+# Score given to an exact match that the full-text search did not return, which the UI shows as full confidence.
+EXACT_MATCH_SCORE = 10.0
+
+def format_match(match: Company) -> str:
+    """Formats a potential match for a prompt, noting the previous name it matched on, if any."""
+    formatted = f"- {match.company_number}: {match.company_name}"
+    if getattr(match, "matched_name_changed_on", None):
+        formatted += f" (formerly {match.matched_name}, until {match.matched_name_changed_on.isoformat()})"
+    return formatted
+
+class Recommendation(NamedTuple):
+    company_number: str
+    decided_by: MatchDecision
+
+# Bump whenever RECOMMEND_BEST_MATCH_PROMPT changes, so cached recommendations are not reused.
+RECOMMEND_BEST_MATCH_PROMPT_VERSION = "best-match-v2"
 RECOMMEND_BEST_MATCH_PROMPT = '''
 Given a search query for a company and a list of potential matches from a database, please choose the best match.
 
@@ -39,11 +93,56 @@ Potential Matches:
 Respond with the company number of the best match. Only return the company number, with no additional commentary or formatting.
 '''
 
+# Bump whenever RECOMMEND_BEST_MATCHES_PROMPT changes, so cached recommendations are not reused.
+RECOMMEND_BEST_MATCHES_PROMPT_VERSION = "best-matches-v2"
+RECOMMEND_BEST_MATCHES_PROMPT = '''
+Below are several numbered search queries for companies. Each query has a list of potential matches from a database. For each query, please choose the best match.
+
+{queries}
+
+Respond with a JSON object that maps every query number to the company number of its best match, for example {{"1": "01234567", "2": "SC123456"}}. Only return the JSON object, with no additional commentary or formatting.
+'''
+
+def parse_batch_recommendations(content: str | None) -> dict[str, str]:
+    """
+    Parses the LLM's JSON answer to RECOMMEND_BEST_MATCHES_PROMPT into a dict of query
+    number to company number. Tolerates surrounding text or code fences, and returns
+    an empty dict if no JSON object can be parsed.
+    """
+    if not content:
+        return {}
+    start, end = content.find("{"), content.rfind("}")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        parsed = json.loads(content[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    return {
+        str(key).strip(): str(value).strip()
+        for key, value in parsed.items()
+        if isinstance(value, (str, int))
+    }
+
 class CompanyVisualizer:
-    def __init__(self, config: Settings, db: CompaniesHouseDB):
+    def __init__(self, config: Settings, db: CompaniesHouseDB | None, reranker: Reranker | None = None):
         self.config = config
         self.openai_client = openai_client(config)
+        # None until the first database build completes (see build_database)
         self.db = db
+        self.database_status = DatabaseStatus(ready=db is not None, phase="ready" if db else "starting")
+        # Held while building or swapping to a database version, so a build never races a version swap
+        self.database_versions_lock = asyncio.Lock()
+        # Swapped-out database versions (and their recommendation caches) still draining their queries
+        self.retiring_databases: dict[asyncio.Task, tuple[CompaniesHouseDB, RecommendationCache | None]] = {}
+        # Bounds the number of in-flight LLM calls across all concurrent requests.
+        self.llm_semaphore = asyncio.Semaphore(config.match_concurrency)
+        # Decides queries before (or instead of) the LLM. Defaults to the one named in config.
+        self.reranker = reranker or create_reranker(config.reranker)
+        self.recommendation_cache = recommendation_cache(config, db) if db else None
+        self.company_cache = CompanyCache(db.version(), config.company_cache_max_entries) if db else None
 
     def __enter__(self):
         return self
@@ -51,41 +150,340 @@ class CompanyVisualizer:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
-    async def recommend_best_match(self, query: str, matches: list[Company]) -> str | None:
+    async def _ask_best_match(self, query: str, matches: list[Company]) -> str | None:
+        """
+        Sends a query and its matches to the LLM and asks it to recommend the best match.
+        Returns the company number of the recommended match, or None if the model returns no content.
+        """
+        # Format the matches for the prompt
+        formatted_matches = "\n".join([format_match(match) for match in matches])
+
+        prompt = RECOMMEND_BEST_MATCH_PROMPT.format(query=query, matches=formatted_matches)
+
+        try:
+            # The client retries 408/429/5xx responses with exponential backoff (see openai_max_retries).
+            async with self.llm_semaphore:
+                with metrics.stage("llm"):
+                    response = await self.openai_client.chat.completions.create(
+                        model=self.config.openai_model_name,
+                        messages=[ChatCompletionUserMessageParam(role="user", content=prompt)],
+                        max_tokens=20,
+                    )
+            metrics.record_llm_usage(self.config.openai_model_name, response.usage)
+            recommended_company_number = response.choices[0].message.content
+            logger.info(f"Successfully received recommendation from LLM: {recommended_company_number}")
+            return recommended_company_number.strip() if recommended_company_number else None
+        except Exception as e:
+            logger.error(f"An error occurred while communicating with the LLM: {e}", exc_info=True)
+            metrics.increment("llm_errors", model=self.config.openai_model_name)
+            raise
+
+    async def recommend_best_matches(
+        self,
+        queries: dict[str, list[CompanyMatch]],
+        filters: CompanySearchFilters | None = None,
+        fields: list[str] | None = None,
+    ) -> dict[str, Recommendation]:
         """
-        Sends a query and a list of matches to the LLM and asks it to recommend the best match.
+        Recommends the best match for many queries, only asking the LLM where it is needed.
+
+        Each query is decided by the first of these stages that applies:
+            - company_number / exact_name: the query is a company number, or exactly matches
+              a single company's name. If the search did not return that company, it is added
+              to the front of the query's matches.
+            - score_margin: there is a single match, or the top BM25 score leads the runner-up
+              by at least llm_bypass_score_margin.
+            - cache: a recommendation for the same query and matches is cached.
+            - reranker: with reranker "local", the local reranker chose one of the matches.
+              With "local_then_llm", it only decides when its choice leads the runner-up
+              by at least reranker_min_margin, and the rest go on to the LLM.
+            - llm: the LLM chose one of the matches. With an llm_batch_size above 1, queries are
+              packed llm_batch_size at a time into a single completion that answers with JSON.
+            - fallback: the LLM gave no valid answer, or its request failed, so the top BM25
+              match is used.
 
         Args:
-            query: The original search query.
-            matches: A list of potential company matches.
+            queries: The potential company matches for each search query, best BM25 score first.
+            filters: The filters the matches were searched with. An exact match that fails
+                them is ignored, as the search would have excluded it.
+            fields: The Company fields the matches were searched with (all of them if None).
+                An exact match added to a query's matches carries the same fields.
 
         Returns:
-            The company number of the recommended match, or None if the model returns no content.
+            The recommendation for each query that has matches.
         """
+        exact_matches = {}
+        if self.config.exact_match_enabled:
+            with metrics.stage("exact_match"):
+                # The filters are checked against the exact matches, so need their fields too
+                lookup_fields = [*fields, *COMPANY_FILTER_FIELDS] if fields and filters is not None else fields
+                exact_matches = await self.db.run(self.db.find_exact_matches, list(queries), lookup_fields)
+            if filters is not None:
+                exact_matches = {
+                    query: match for query, match in exact_matches.items() if filters.matches(match[1])
+                }
+        batched = self.config.llm_batch_size > 1
+        prompt_version = RECOMMEND_BEST_MATCHES_PROMPT_VERSION if batched else RECOMMEND_BEST_MATCH_PROMPT_VERSION
 
-        # Format the matches for the prompt
-        formatted_matches = "\n".join([f"- {match.company_number}: {match.company_name}" for match in matches])
+        results: dict[str, Recommendation] = {}
+        undecided: dict[str, list[CompanyMatch]] = {}
+        for query, matches in queries.items():
+            if query in exact_matches:
+                decided_by, company = exact_matches[query]
+                if all(match.company_number != company.company_number for match in matches):
+                    top_score = matches[0].score if matches else 0.0
+                    matches.insert(0, CompanyMatch.model_construct(
+                        **company.model_dump(include=set(fields) if fields else None),
+                        score=max(EXACT_MATCH_SCORE, top_score),
+                    ))
+                results[query] = Recommendation(company.company_number, decided_by)
+            elif not matches:
+                continue
+            elif self._has_decisive_score_margin(matches):
+                results[query] = Recommendation(matches[0].company_number, "score_margin")
+            else:
+                undecided[query] = matches
 
-        prompt = RECOMMEND_BEST_MATCH_PROMPT.format(query=query, matches=formatted_matches)
+        # Hold on to this version's cache, in case it is swapped mid-request. Its lookups and
+        # writes are blocking SQLite calls, so each is done for the whole request off the event loop.
+        cache = self.recommendation_cache
+        cache_keys: dict[str, str] = {}
+        if cache and undecided:
+            cache_keys = {
+                query: self._cache_key(query, matches, prompt_version) for query, matches in undecided.items()
+            }
+            cached_company_numbers = await asyncio.to_thread(cache.get_many, list(cache_keys.values()))
+            for query, cache_key in cache_keys.items():
+                if cache_key in cached_company_numbers:
+                    results[query] = Recommendation(cached_company_numbers[cache_key], "cache")
+                    del undecided[query]
 
-        try:
-            response = await self.openai_client.chat.completions.create(
-                model=self.config.openai_model_name,
-                messages=[ChatCompletionUserMessageParam(role="user", content=prompt)],
-                max_tokens=20,
+        if self.reranker and undecided:
+            with metrics.stage("rerank"):
+                # Scoring a large request's candidates takes long enough to run off the event loop
+                reranked = await asyncio.to_thread(self.reranker.rerank, undecided)
+            for query, reranked_match in reranked.items():
+                if self.config.reranker == "local_then_llm" and reranked_match.margin < self.config.reranker_min_margin:
+                    continue
+                results[query] = Recommendation(reranked_match.company_number, "reranker")
+                del undecided[query]
+
+        if batched:
+            undecided_items = list(undecided.items())
+            batch_size = self.config.llm_batch_size
+            batches = [undecided_items[i:i + batch_size] for i in range(0, len(undecided_items), batch_size)]
+            answers: dict[str, str] = {}
+            # A failed completion (already logged) leaves its batch's queries unanswered, so
+            # they fall back to their top match rather than failing the whole request
+            for batch_answers in await asyncio.gather(
+                *(self._ask_best_matches(batch) for batch in batches), return_exceptions=True
+            ):
+                if not isinstance(batch_answers, BaseException):
+                    answers.update(batch_answers)
+        else:
+            single_answers = await asyncio.gather(
+                *(self._ask_best_match(query, matches) for query, matches in undecided.items()),
+                return_exceptions=True,
             )
-            recommended_company_number = response.choices[0].message.content
-            logger.info(f"Successfully received recommendation from LLM: {recommended_company_number}")
-            return recommended_company_number.strip()
+            answers = {
+                query: answer
+                for query, answer in zip(undecided, single_answers)
+                if not isinstance(answer, BaseException)
+            }
+
+        recommended_company_numbers: dict[str, str] = {}
+        for query, matches in undecided.items():
+            company_number = answers.get(query)
+            if company_number in {match.company_number for match in matches}:
+                results[query] = Recommendation(company_number, "llm")
+                if cache:
+                    recommended_company_numbers[cache_keys[query]] = company_number
+            else:
+                logger.warning(
+                    f"LLM gave no valid recommendation for '{query}' ({company_number!r}), using the top search match."
+                )
+                results[query] = Recommendation(matches[0].company_number, "fallback")
+        if cache and recommended_company_numbers:
+            await asyncio.to_thread(cache.put_many, recommended_company_numbers)
+
+        decision_counts = Counter(recommendation.decided_by for recommendation in results.values())
+        logger.info(f"Recommendations decided by: {dict(decision_counts)}")
+        for decided_by, count in decision_counts.items():
+            metrics.increment("recommendations", count, decided_by=decided_by)
+        return results
+
+    def _has_decisive_score_margin(self, matches: list[CompanyMatch]) -> bool:
+        if len(matches) == 1:
+            return True
+        margin = self.config.llm_bypass_score_margin
+        return margin is not None and matches[0].score - matches[1].score >= margin
+
+    async def _ask_best_matches(self, batch: list[tuple[str, list[Company]]]) -> dict[str, str]:
+        """
+        Asks the LLM for the best match for a batch of queries in a single completion.
+        Queries the model gave no answer for are left out of the result.
+        """
+        formatted_queries = "\n\n".join(
+            f'Query {number}: "{query}"\n'
+            + "\n".join(format_match(match) for match in matches)
+            for number, (query, matches) in enumerate(batch, start=1)
+        )
+        prompt = RECOMMEND_BEST_MATCHES_PROMPT.format(queries=formatted_queries)
+
+        try:
+            async with self.llm_semaphore:
+                with metrics.stage("llm"):
+                    response = await self.openai_client.chat.completions.create(
+                        model=self.config.openai_model_name,
+                        messages=[ChatCompletionUserMessageParam(role="user", content=prompt)],
+                        response_format={"type": "json_object"},
+                        max_tokens=20 * len(batch) + 20,
+                    )
+            metrics.record_llm_usage(self.config.openai_model_name, response.usage)
         except Exception as e:
             logger.error(f"An error occurred while communicating with the LLM: {e}", exc_info=True)
+            metrics.increment("llm_errors", model=self.config.openai_model_name)
             raise
 
+        answers = parse_batch_recommendations(response.choices[0].message.content)
+        logger.info(f"Received {len(answers)} recommendations from LLM for a batch of {len(batch)} queries.")
+        return {
+            query: answers[str(number)]
+            for number, (query, _) in enumerate(batch, start=1)
+            if str(number) in answers
+        }
+
+    def _cache_key(self, query: str, matches: list[Company], prompt_version: str) -> str:
+        return RecommendationCache.make_key(
+            query,
+            [match.company_number for match in matches],
+            self.config.openai_model_name,
+            prompt_version,
+        )
+
+    async def get_companies_by_numbers(self, company_numbers: list[str]) -> dict[str, Company]:
+        """
+        Looks up many companies by number, serving what it can from the company cache and
+        fetching the rest in a single database query.
+
+        Returns:
+            The companies found, keyed by each company number as given. Numeric numbers may
+            omit their leading zeros.
+        """
+        normalized_numbers = {
+            company_number: normalize_company_number(company_number) or company_number.strip().upper()
+            for company_number in company_numbers
+        }
+        # Hold on to this version's database and cache, in case they are swapped mid-lookup
+        db, company_cache = self.db, self.company_cache
+        companies, missing = company_cache.get_many(list(dict.fromkeys(normalized_numbers.values())))
+        if missing:
+            fetched = await db.run(db.get_companies_by_numbers, missing)
+            company_cache.put_many(fetched)
+            companies.update((company.company_number, company) for company in fetched)
+        return {
+            company_number: companies[normalized_number]
+            for company_number, normalized_number in normalized_numbers.items()
+            if normalized_number in companies
+        }
+
+    async def swap_database(self, db: CompaniesHouseDB):
+        """
+        Makes `db` the database used for new queries. Queries already running on the old
+        database finish on it before it is closed, in the background, so the caller (which
+        holds database_versions_lock) isn't held up by slow queries.
+        """
+        old_db, old_cache = self.db, self.recommendation_cache
+        # The cache clears itself when opened against a different database version
+        new_cache = await asyncio.to_thread(recommendation_cache, self.config, db)
+        self.db = db
+        self.recommendation_cache = new_cache
+        self.company_cache = CompanyCache(db.version(), self.config.company_cache_max_entries)
+        self.database_status.ready = True
+        self.database_status.phase = "ready"
+        if old_db is None:
+            logger.info(f"Database '{db.db_path}' is ready.")
+            return
+        logger.info(f"Swapped database from '{old_db.db_path}' to '{db.db_path}'.")
+        task = asyncio.create_task(self._retire_database(old_db, old_cache))
+        self.retiring_databases[task] = (old_db, old_cache)
+        task.add_done_callback(self.retiring_databases.pop)
+
+    async def _retire_database(self, db: CompaniesHouseDB, cache: RecommendationCache | None):
+        await db.close_when_idle()
+        if cache:
+            await asyncio.to_thread(cache.close)
+
+    async def build_database(self):
+        """
+        Builds a new database version from the data source while the server keeps running,
+        then swaps to it. Until the first build completes, the API responds with 503 and
+        the build's progress (see database_status).
+        """
+        status = self.database_status
+        status.started_at = datetime.now(timezone.utc)
+        status.error = None
+        versions = DatabaseVersions(self.config.db_path)
+        cancelled = threading.Event()
+        try:
+            async with self.database_versions_lock:
+                try:
+                    new_path = await asyncio.to_thread(
+                        build_database_version, self.config, versions, status=status, cancelled=cancelled
+                    )
+                except asyncio.CancelledError:
+                    # The build's thread can't be interrupted, so it stops at its next phase instead
+                    cancelled.set()
+                    raise
+                db = await asyncio.to_thread(open_database, self.config, new_path)
+                await self.swap_database(db)
+        except Exception as e:
+            logger.exception("Failed to build the companies database.")
+            status.phase = "failed"
+            status.error = str(e)
+
+    async def watch_database_versions(self):
+        """
+        Polls for a new live database version, e.g. one built by `company_structure_api_manage rebuild`
+        or selected by `rollback`, and hot swaps to it.
+        """
+        versions = DatabaseVersions(self.config.db_path)
+        while True:
+            await asyncio.sleep(self.config.db_version_poll_seconds)
+            try:
+                async with self.database_versions_lock:
+                    current_path = versions.current_path()
+                    if current_path is None or (self.db and current_path == Path(self.db.db_path)):
+                        continue
+                    logger.info(f"New live database version found at '{current_path}'.")
+                    db = await asyncio.to_thread(open_database, self.config, current_path)
+                    await self.swap_database(db)
+            except Exception:
+                logger.exception("Failed to swap to the new live database version.")
+
     def close(self):
         self.openai_client.close()
-        self.db.disconnect()
+        for task, (db, cache) in list(self.retiring_databases.items()):
+            task.cancel()
+            db.disconnect()
+            if cache:
+                cache.close()
+        if self.recommendation_cache:
+            logger.info(f"Recommendation cache stats: {self.recommendation_cache.stats()}")
+            self.recommendation_cache.close()
+        if self.company_cache:
+            logger.info(f"Company cache stats: {self.company_cache.stats()}")
+        if self.db:
+            self.db.disconnect()
 
 def company_visualizer(request: Request) -> CompanyVisualizer:
-    return request.app.state.company_visualizer
+    company_visualizer = request.app.state.company_visualizer
+    if company_visualizer.db is None:
+        raise HTTPException(
+            status_code=503,
+            detail=company_visualizer.database_status.model_dump(mode="json"),
+            headers={"Retry-After": "30"},
+        )
+    return company_visualizer
 
 InjectedCompanyVisualizer = Annotated[CompanyVisualizer, Depends(company_visualizer)]
\ No newline at end of file
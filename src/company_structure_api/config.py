@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -5,19 +7,110 @@ class Settings(BaseSettings):
     openai_model_name: str = "gpt-4.1-mini"
     openai_api_key: str | None = None
     openai_base_url: str | None = None
-    
+
+    # --- Matching Settings ---
+    # Maximum number of LLM recommendation requests in flight at once, shared across all requests.
+    match_concurrency: int = 8
+    # Number of queries packed into a single LLM completion. 1 sends one completion per query.
+    llm_batch_size: int = 10
+    # Resolve names that exactly match a company name, or are a company number, without the LLM.
+    exact_match_enabled: bool = True
+    # Skip the LLM when the top search score leads the runner-up by at least this much. None disables.
+    llm_bypass_score_margin: float | None = 2.5
+    # How queries left undecided by the earlier stages are decided: "llm" asks the LLM, "local"
+    # uses the in-process string-similarity reranker instead, and "local_then_llm" uses the
+    # local reranker where its choice leads the runner-up by reranker_min_margin, and asks the
+    # LLM about the rest.
+    reranker: Literal["llm", "local", "local_then_llm"] = "llm"
+    reranker_min_margin: float = 0.15
+    # Retries (with exponential backoff) on 408/429/5xx and connection errors from the OpenAI-compatible endpoint.
+    openai_max_retries: int = 3
+    openai_timeout_seconds: float = 60.0
+
     # --- Database Settings ---
+    # Where the optional Parquet cache of the data source is written.
     data_dir: str = "data"
     db_path: str = "db/companies.duckdb"
     test_db_path: str = "db/test_companies.duckdb"
 
+    # How name searches are executed: "index" scores only documents containing a query term
+    # via the FTS index tables, "scan" runs match_bm25 over every row (current names only,
+    # BM25 only), and "compare" runs both and logs timings and ranking differences.
+    fts_search_mode: Literal["index", "scan", "compare"] = "index"
+
+    # Also search a character-trigram index of company names, merged with the BM25 results, to
+    # find names with typos or run-together words ("AcmeHoldings") that word search misses.
+    trigram_search_enabled: bool = True
+    # Trigrams found in more than this fraction of names are skipped when searching, trading a
+    # little recall on names made of common words for speed. None searches every trigram.
+    trigram_max_df_fraction: float | None = 0.02
+    # Trigram matches with a lower cosine similarity (0 to 1) to the query are not returned.
+    trigram_min_similarity: float = 0.5
+
+    # Number of threads running database queries off the event loop. Defaults to the CPU count.
+    db_pool_size: int | None = None
+    # DuckDB's own per-query thread count. Defaults to DuckDB's choice (the CPU count); lowering
+    # it avoids oversubscribing cores when many pooled queries run at once.
+    duckdb_threads: int | None = None
+
     # Path to the source data file for initial database creation.
     # Defaults to the large CSV file in the project root.
     data_source: str = "BasicCompanyDataAsOneFile-2026-02-01.zip"
 
-    # Flag to force recreation of the database on startup.
+    # --- Recommendation Cache Settings ---
+    # LLM recommendations are cached in a SQLite file, by default next to db_path.
+    recommendation_cache_enabled: bool = True
+    recommendation_cache_path: str | None = None
+    recommendation_cache_ttl_seconds: int = 30 * 24 * 60 * 60
+    recommendation_cache_max_entries: int = 100_000
+
+    # --- Company Lookup Settings ---
+    # Companies looked up by number are kept in an in-process LRU cache, cleared when the live
+    # database version changes. 0 disables.
+    company_cache_max_entries: int = 50_000
+
+    # Flag to force recreation of the database on startup. The server keeps serving any
+    # existing database while the new one is built in the background.
     force_recreate_db: bool = False
 
+    # A prebuilt database file to adopt as the live version on startup, when there is no
+    # live version or the artifact is newer. Without one, a missing database is built in the
+    # background while /api returns 503.
+    db_artifact_path: str | None = None
+
+    # Size of each block read when streaming a zipped CSV source, which bounds ingest memory use.
+    ingest_block_size_bytes: int = 64 * 1024 * 1024
+    # Save the typed companies table as Parquet in data_dir, so rebuilds from the same source skip CSV parsing.
+    parquet_cache_enabled: bool = False
+
+    # --- Database Version Settings ---
+    # Each rebuild is written as a new versioned file next to db_path and swapped in once validated.
+    # Number of versions to keep on disk, including the live one, for rollback.
+    db_versions_to_keep: int = 3
+    # A rebuild must have at least this fraction of the live version's rows to go live.
+    db_min_row_ratio: float = 0.9
+    # How often the server checks for a new live version to hot swap to. 0 disables.
+    db_version_poll_seconds: float = 30.0
+    # Incremental rebuilds update the FTS index in place, unless more than this fraction of
+    # companies were renamed, added or removed, when rebuilding the index is cheaper.
+    incremental_fts_max_fraction: float = 0.2
+
+    # --- Match Job Settings ---
+    # Background bulk-match jobs are stored in a SQLite file, by default next to db_path, so
+    # they resume after a restart.
+    match_job_store_path: str | None = None
+    # Number of chunks of llm_batch_size names matched at once across all jobs.
+    match_job_workers: int = 4
+    # Completed and cancelled jobs are deleted on startup once this old.
+    match_job_retention_seconds: int = 7 * 24 * 60 * 60
+
+    # --- Metrics Settings ---
+    # Record per-stage latencies, LLM token usage and cache hit rates, served in the Prometheus
+    # format at /metrics and as Server-Timing headers on API responses.
+    metrics_enabled: bool = False
+    # Log database queries slower than this, with their SQL and parameters. None disables.
+    slow_query_log_seconds: float | None = None
+
     # Configure Pydantic-Settings to look for a .env file in the project root.
     model_config = SettingsConfigDict(
         env_file=(".env.local", ".env"),
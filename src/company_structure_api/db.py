@@ -1,65 +1,256 @@
+import asyncio
 import os
+import shutil
 import sysconfig
+import threading
+import time
 import zipfile
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, TYPE_CHECKING
+from typing import Any, Callable, Literal, Optional, TYPE_CHECKING, TypeVar
 import duckdb
+import pyarrow
+import pyarrow.csv
 
-from company_structure_api.models import CompanyMatch
+from company_structure_api.models import CompanyMatch, CompanySearchFilters, DatabaseStatus, MatchDecision
 from company_structure_api.models import Company, PYDANTIC_TO_DUCKDB
 from company_structure_api.config import Settings
+from company_structure_api.db_versions import DatabaseVersions
+from company_structure_api.metrics import metrics
+from company_structure_api.company_names import (
+    company_name_key_sql,
+    company_name_trigram_text_sql,
+    normalize_company_number,
+    normalize_exact_company_name,
+    postcode_prefix_pattern,
+    postcode_sql,
+    sic_code_range,
+    sic_code_sql,
+)
+from company_structure_api.suggest_index import CompanySuggestIndex, suggest_index_path
 
 if TYPE_CHECKING:
     from company_structure_api.db import CompaniesHouseDB
 
 logger = logging.getLogger(__name__)
 
-async def initialize_database(config: Settings) -> "CompaniesHouseDB":
+def initialize_database(config: Settings) -> Optional["CompaniesHouseDB"]:
     """
-    Initializes the database. If the DB file doesn't exist or if a force
-    recreation is requested, it builds the DB from the specified data source.
+    Opens the live database version for serving. If a prebuilt artifact is configured
+    and is newer than the live version, it is adopted as the live version first.
+
+    Returns:
+        The connected database, or None if no database has been built yet, in which case
+        the caller should build one in the background with build_database_version.
     """
     Path(config.db_path).parent.mkdir(exist_ok=True)
-    db_exists = os.path.exists(config.db_path)
+    versions = DatabaseVersions(config.db_path)
+    current_path = versions.current_path()
 
-    if config.force_recreate_db and db_exists:
-        logger.info(f"FORCE_RECREATE_DB is true. Deleting existing database at {config.db_path}")
-        os.remove(config.db_path)
-        db_exists = False
+    if config.db_artifact_path and Path(config.db_artifact_path).is_file():
+        artifact_path = Path(config.db_artifact_path)
+        if current_path is None or artifact_path.stat().st_mtime > current_path.stat().st_mtime:
+            try:
+                current_path = import_database_artifact(config, versions, artifact_path)
+            except Exception:
+                logger.exception(f"Failed to adopt prebuilt database artifact '{artifact_path}'.")
 
-    if not db_exists:
+    if current_path is None:
         logger.info(f"Database not found at '{config.db_path}'.")
-        if not os.path.exists(config.data_source):
-            logger.exception(f"FATAL: Data source not found at '{config.data_source}'. Cannot create database.")
-            raise
+        return None
 
-        logger.info(f"Creating database from source: '{config.data_source}'...")
-        temp_instance = CompaniesHouseDB(db_path=config.db_path)
-        try:
-            with temp_instance as db:
-                await db.create_database_from_source(config)
-            logger.info("Database created successfully.")
-        except Exception:
-            logger.exception(f"FATAL: Failed to create database from '{config.data_source}'")
-            if os.path.exists(config.db_path):
-                os.remove(config.db_path)
-            raise
+    logger.info(f"Connecting to database at '{current_path}'...")
+    db_instance = open_database(config, current_path)
+    logger.info("Database connection successful.")
+    return db_instance
+
+def import_database_artifact(config: Settings, versions: DatabaseVersions, artifact_path: Path) -> Path:
+    """
+    Adopts a prebuilt database file as a new live version. The artifact is copied rather
+    than hard-linked, since a shared inode would let later writes to the artifact change the
+    live database. The copy is validated before it goes live.
+    """
+    new_path = versions.new_version_path()
+    if new_path == versions.current_path():
+        raise ValueError(f"Database version '{new_path}' is the live version. Refusing to overwrite it.")
+    logger.info(f"Adopting prebuilt database artifact '{artifact_path}' as '{new_path}'...")
+    try:
+        shutil.copyfile(artifact_path, new_path)
+        with CompaniesHouseDB(db_path=str(new_path), read_only=True) as db:
+            db.validate()
+    except Exception:
+        versions.delete_version(new_path)
+        raise
+    versions.set_current(new_path)
+    versions.prune(keep=config.db_versions_to_keep)
+    return new_path
 
-    logger.info(f"Connecting to database at '{config.db_path}'...")
-    db_instance = CompaniesHouseDB(db_path=config.db_path, read_only=True)
+def open_database(config: Settings, db_path: Path) -> "CompaniesHouseDB":
+    """Opens a read-only connection to a built database for serving queries."""
+    db_instance = CompaniesHouseDB(
+        db_path=str(db_path),
+        read_only=True,
+        search_mode=config.fts_search_mode,
+        pool_size=config.db_pool_size,
+        duckdb_threads=config.duckdb_threads,
+        trigram_search=config.trigram_search_enabled,
+        trigram_max_df_fraction=config.trigram_max_df_fraction,
+        trigram_min_similarity=config.trigram_min_similarity,
+    )
     db_instance.connect()
-    logger.info("Database connection successful.")
+    db_instance.open_suggest_index()
     return db_instance
 
+def build_database_version(
+    config: Settings,
+    versions: DatabaseVersions,
+    incremental: bool = False,
+    status: DatabaseStatus | None = None,
+    cancelled: threading.Event | None = None,
+) -> Path:
+    """
+    Builds a new database version from the data source alongside the live one, validates
+    it, and then makes it the live version. Old versions beyond db_versions_to_keep are
+    deleted. The live version is untouched if the build or validation fails.
+
+    An incremental build copies the live version and applies only the differences from
+    the new snapshot, rather than loading and indexing the whole register.
+
+    If a `status` is given, it is updated with the build's progress. If `cancelled` is
+    set, the build stops at its next phase and the new version is deleted.
+    """
+    if not os.path.exists(config.data_source):
+        raise FileNotFoundError(f"Data source not found at '{config.data_source}'. Cannot create database.")
+
+    # A new build must have at least db_min_row_ratio of the live version's rows, to
+    # catch truncated or partial snapshots before they go live.
+    min_rows = 1
+    current_path = versions.current_path()
+    if current_path is not None:
+        with CompaniesHouseDB(db_path=str(current_path), read_only=True) as current_db:
+            min_rows = max(int(current_db.row_count() * config.db_min_row_ratio), 1)
+
+    new_path = versions.new_version_path()
+    if new_path == current_path:
+        raise ValueError(f"Database version '{new_path}' is the live version. Refusing to overwrite it.")
+    logger.info(f"Creating database version '{new_path}' from source: '{config.data_source}'...")
+    if incremental and current_path is None:
+        logger.info("No live database to update incrementally. Building from scratch.")
+        incremental = False
+    try:
+        if incremental:
+            shutil.copyfile(current_path, new_path)
+        with CompaniesHouseDB(db_path=str(new_path), status=status, cancelled=cancelled) as db:
+            if incremental:
+                db.apply_snapshot_from_source(config)
+            else:
+                db.create_database_from_source(config)
+            db.set_phase("validating")
+            db.validate(min_rows=min_rows)
+            db.set_phase("indexing suggestions")
+            CompanySuggestIndex.write(db.suggest_index_table(), suggest_index_path(new_path))
+    except Exception:
+        versions.delete_version(new_path)
+        raise
+    logger.info(f"Database version '{new_path}' created and validated successfully.")
+
+    versions.set_current(new_path)
+    versions.prune(keep=config.db_versions_to_keep)
+    return new_path
+
+SearchMode = Literal["index", "scan", "compare"]
+
+T = TypeVar("T")
+
 class CompaniesHouseDB:
     COMPANIES_TABLE_NAME = "companies"
     FTS_INDEX_NAME = "companies_fts_idx"
+    FTS_SCHEMA_NAME = f"fts_main_{COMPANIES_TABLE_NAME}"
+    STAGING_TABLE_NAME = "companies_staging"
+    SNAPSHOTS_TABLE_NAME = "snapshots"
+    REMOVALS_TABLE_NAME = "company_removals"
+    NAME_KEYS_TABLE_NAME = "company_name_keys"
+    PREVIOUS_NAMES_TABLE_NAME = "company_previous_names"
+    PREVIOUS_NAMES_FTS_SCHEMA_NAME = f"fts_main_{PREVIOUS_NAMES_TABLE_NAME}"
+    # The register lists up to ten previous names per company, as previousname_1..10 columns
+    PREVIOUS_NAME_COUNT = 10
+    TRIGRAM_DOCS_TABLE_NAME = "company_name_trigram_docs"
+    TRIGRAMS_TABLE_NAME = "company_name_trigrams"
+    TRIGRAM_DF_TABLE_NAME = "company_name_trigram_df"
+    # Character trigrams are hashed into this many buckets, so postings hold an integer rather than text
+    TRIGRAM_BUCKETS = 1 << 20
+    # Trigram similarities are scaled by the query's top BM25 score to rank among BM25 matches,
+    # but by at least this much, so a close trigram match outranks BM25 matches on a single
+    # common word. Among trigram matches alone, the runner-up must then trail by half the
+    # similarity range to clear the default llm_bypass_score_margin.
+    TRIGRAM_MIN_SCORE_SCALE = 5.0
+    # How many times $limit candidates found by uncommon trigrams are rescored by all of them
+    TRIGRAM_SHORTLIST_FACTOR = 4
+    SEARCH_FILTERS_TABLE_NAME = "company_search_filters"
+    PREVIOUS_NAME_SEARCH_FILTERS_TABLE_NAME = "company_previous_name_search_filters"
+    # The search filter columns stored as ENUMs, and the name of each ENUM type
+    SEARCH_FILTER_ENUM_TYPES = {
+        "company_status": "company_status_value",
+        "company_category": "company_category_value",
+    }
+    # The register lists up to four SIC codes per company, as siccode_sictext_1..4 columns
+    SIC_CODE_COUNT = 4
+    # Each FTS index's table of the most any document can score for each term
+    TERM_BOUNDS_TABLE_NAME = "term_bounds"
+    # Query terms in at most this fraction of documents are scored first, to find the score
+    # a document must beat to make the top $limit, so that more common terms can be skipped
+    BM25_PROBE_MAX_DF_FRACTION = 0.05
 
-    def __init__(self, db_path: str, read_only: bool = False):
+    def __init__(
+        self,
+        db_path: str,
+        read_only: bool = False,
+        search_mode: SearchMode = "index",
+        pool_size: int | None = None,
+        duckdb_threads: int | None = None,
+        status: DatabaseStatus | None = None,
+        cancelled: threading.Event | None = None,
+        trigram_search: bool = True,
+        trigram_max_df_fraction: float | None = 0.02,
+        trigram_min_similarity: float = 0.5,
+    ):
         self.db_path = db_path
+        # Build progress, reported while the database is created
+        self.status = status
+        # Set from another thread to stop a build at its next phase
+        self.cancelled = cancelled
+        # Whether the database has name keys. Databases built before they were added don't.
+        self._has_name_keys: bool | None = None
+        self._has_previous_names: bool | None = None
+        self._has_name_trigrams: bool | None = None
+        self._has_search_filters: bool | None = None
+        # Whether each FTS index has term bounds, keyed by its schema name
+        self._has_term_bounds: dict[str, bool] = {}
+        # The ENUM values of each search filter column, keyed by their lower-case form
+        self._search_filter_values: dict[str, dict[str, str]] | None = None
+        self.suggest_index: CompanySuggestIndex | None = None
         self.con = None
         self.read_only = read_only
+        self.search_mode = search_mode
+        self.trigram_search = trigram_search
+        self.trigram_max_df_fraction = trigram_max_df_fraction
+        self.trigram_min_similarity = trigram_min_similarity
+        self.pool_size = pool_size or os.cpu_count() or 4
+        self.duckdb_threads = duckdb_threads
+        self.executor: ThreadPoolExecutor | None = None
+        # Each pool thread queries through its own cursor, since a DuckDB connection
+        # must not be used from several threads at once.
+        self._local = threading.local()
+        self._cursors: list[duckdb.DuckDBPyConnection] = []
+        self._cursors_lock = threading.Lock()
+        # Queue wait metrics for the query pool
+        self._stats_lock = threading.Lock()
+        self.queued_queries = 0
+        self.in_flight_queries = 0
+        self.completed_queries = 0
+        self.queue_wait_seconds_total = 0.0
+        self.queue_wait_seconds_max = 0.0
 
     def __enter__(self):
         self.connect()
@@ -76,68 +267,547 @@ class CompaniesHouseDB:
         logger.info(f"Connecting to DuckDB at: {self.db_path}")
         self.con = duckdb.connect(database=self.db_path, read_only=self.read_only)
         try:
+            # Loading the packaged extension file directly needs no INSTALL step, so
+            # connecting doesn't copy the extension into the DuckDB home directory each time.
             duckdb_fts_extension_path = str(Path(sysconfig.get_path('purelib')) / "duckdb_extension_fts" / "extensions" / "v1.5.2" / "fts.duckdb_extension")
-            logger.info(f"Installing and loading DuckDB FTS extension from: {duckdb_fts_extension_path}")
-            self.con.execute(f"FORCE INSTALL '{duckdb_fts_extension_path}';")
+            logger.info(f"Loading DuckDB FTS extension from: {duckdb_fts_extension_path}")
             self.con.execute(f"LOAD '{duckdb_fts_extension_path}';")
-            logger.info("FTS extension installed and loaded successfully.")
+            logger.info("FTS extension loaded successfully.")
         except Exception:
-            logger.exception("Failed to install or load DuckDB FTS extension.")
+            logger.exception("Failed to load DuckDB FTS extension.")
             raise
 
+        if self.duckdb_threads:
+            self.con.execute(f"SET threads = {int(self.duckdb_threads)};")
+        self.executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="duckdb")
+        logger.info(f"Started DuckDB query pool with {self.pool_size} threads.")
+
     def disconnect(self):
+        if self.executor:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        with self._cursors_lock:
+            for cursor in self._cursors:
+                cursor.close()
+            self._cursors.clear()
+        self._local = threading.local()
+        self.suggest_index = None
         if self.con:
             self.con.close()
             self.con = None
             logger.info("Database connection closed.")
 
+    def set_phase(self, phase: str):
+        if self.cancelled and self.cancelled.is_set():
+            raise InterruptedError("The database build was cancelled.")
+        if self.status:
+            self.status.phase = phase
+        logger.info(f"Database build phase: {phase}")
+
+    def cursor(self) -> duckdb.DuckDBPyConnection:
+        """Returns a cursor on the connection that is private to the calling thread."""
+        if not self.con:
+            raise ConnectionError("Database is not connected.")
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self.con.cursor()
+            self._local.cursor = cursor
+            with self._cursors_lock:
+                self._cursors.append(cursor)
+        return cursor
+
+    def fetch_rows(self, query: str, params: Any = None) -> list[dict[str, Any]]:
+        """
+        Runs a query on the calling thread's cursor and returns its rows as dicts. Queries
+        slower than slow_query_log_seconds are logged with their parameters.
+        """
+        started_at = time.perf_counter()
+        rows = self.cursor().execute(query, params).arrow().read_all().to_pylist()
+        metrics.log_if_slow_query(query, params, time.perf_counter() - started_at)
+        return rows
+
+    async def run(self, func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """
+        Runs a blocking database call on the query pool, so it doesn't block the event loop.
+        The pool size bounds how many queries run at once; the rest wait in its queue.
+        """
+        if not self.executor:
+            raise ConnectionError("Database is not connected.")
+
+        submitted_at = time.perf_counter()
+        queue_wait = 0.0
+        with self._stats_lock:
+            self.queued_queries += 1
+            self.in_flight_queries += 1
+
+        def timed_call() -> T:
+            nonlocal queue_wait
+            queue_wait = time.perf_counter() - submitted_at
+            with self._stats_lock:
+                self.queued_queries -= 1
+                self.completed_queries += 1
+                self.queue_wait_seconds_total += queue_wait
+                self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, queue_wait)
+            return func(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, timed_call)
+        finally:
+            with self._stats_lock:
+                self.in_flight_queries -= 1
+            # Observed here rather than on the pool thread, so it counts towards this request's Server-Timing
+            metrics.observe("db_queue", queue_wait)
+
+    async def close_when_idle(self, timeout_seconds: float = 300.0):
+        """
+        Waits for in-flight queries to finish, then disconnects. Used to retire a database
+        version after the live version has been swapped for a new one.
+        """
+        deadline = time.monotonic() + timeout_seconds
+        while self.in_flight_queries > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self.in_flight_queries > 0:
+            logger.warning(f"Closing '{self.db_path}' with {self.in_flight_queries} queries still in flight.")
+        await asyncio.to_thread(self.disconnect)
+
+    def pool_stats(self) -> dict[str, float]:
+        return {
+            "pool_size": self.pool_size,
+            "queued_queries": self.queued_queries,
+            "in_flight_queries": self.in_flight_queries,
+            "completed_queries": self.completed_queries,
+            "queue_wait_seconds_total": self.queue_wait_seconds_total,
+            "queue_wait_seconds_max": self.queue_wait_seconds_max,
+        }
+
+    def version(self) -> str:
+        """
+        Returns an identifier for the current build of the database file, which changes
+        whenever the database is rebuilt.
+        """
+        stat = os.stat(self.db_path)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def open_suggest_index(self):
+        """Opens the suggest index built for this database, building it first if needed."""
+        path = suggest_index_path(self.db_path)
+        if not path.exists():
+            logger.info(f"No suggest index found for '{self.db_path}'. Building it...")
+            CompanySuggestIndex.write(self.suggest_index_table(), path)
+        self.suggest_index = CompanySuggestIndex.open(path)
+
+    def suggest_index_table(self) -> pyarrow.Table:
+        """
+        Returns the rows of the suggest index (see CompanySuggestIndex): each company's name
+        key, number, name and status, sorted by name key, and the row positions sorted by
+        company number.
+        """
+        if not self.con:
+            raise ConnectionError("Database is not connected.")
+        query = f"""
+            WITH suggestions AS (
+                SELECT
+                    row_number() OVER (ORDER BY name_key, company_number) - 1 AS position,
+                    name_key, company_number, company_name, company_status
+                FROM (
+                    SELECT {company_name_key_sql("company_name")} AS name_key, company_number, company_name, company_status
+                    FROM {self.COMPANIES_TABLE_NAME}
+                    WHERE company_name IS NOT NULL
+                )
+            ),
+            number_order AS (
+                SELECT row_number() OVER (ORDER BY company_number, position) - 1 AS position, position AS number_order
+                FROM suggestions
+            )
+            SELECT suggestions.name_key, suggestions.company_number, suggestions.company_name,
+                suggestions.company_status, number_order.number_order::INTEGER AS number_order
+            FROM suggestions
+            JOIN number_order USING (position)
+            ORDER BY position;
+        """
+        return self.cursor().execute(query).arrow().read_all()
+
+    def row_count(self) -> int:
+        if not self.con:
+            raise ConnectionError("Database is not connected.")
+        return self.cursor().execute(f"SELECT COUNT(*) FROM {self.COMPANIES_TABLE_NAME};").fetchone()[0]
+
+    def validate(self, min_rows: int = 1) -> int:
+        """
+        Checks that a built database is fit to serve: the companies table has at least
+        `min_rows` rows, every row is in the FTS index, every previous name is in the
+        previous names index, every company has search filters, and the lookup indexes, name
+        keys and name trigram index exist.
+
+        Returns:
+            The number of companies.
+        """
+        if not self.con:
+            raise ConnectionError("Database is not connected.")
+
+        row_count = self.row_count()
+        if row_count < min_rows:
+            raise ValueError(f"Database has {row_count} companies, expected at least {min_rows}.")
+
+        if not self.table_exists(f"{self.FTS_SCHEMA_NAME}.docs"):
+            raise ValueError("Database has no full-text search index.")
+        indexed_count = self.cursor().execute(f"SELECT COUNT(*) FROM {self.FTS_SCHEMA_NAME}.docs;").fetchone()[0]
+        if indexed_count != row_count:
+            raise ValueError(f"Full-text search index covers {indexed_count} of {row_count} companies.")
+        if not self.has_term_bounds(self.FTS_SCHEMA_NAME):
+            raise ValueError("Full-text search index has no term bounds.")
+
+        index_names = {
+            row[0] for row in self.cursor().execute(
+                "SELECT index_name FROM duckdb_indexes() WHERE table_name = ?;", [self.COMPANIES_TABLE_NAME]
+            ).fetchall()
+        }
+        expected_index_names = {
+            f"{self.COMPANIES_TABLE_NAME}_company_number_idx",
+            f"{self.COMPANIES_TABLE_NAME}_company_name_idx",
+        }
+        if not expected_index_names <= index_names:
+            raise ValueError(f"Database is missing lookup indexes: {sorted(expected_index_names - index_names)}")
+
+        if not self.table_exists(f"{self.PREVIOUS_NAMES_FTS_SCHEMA_NAME}.docs"):
+            raise ValueError("Database has no previous names search index.")
+        previous_name_count, indexed_previous_name_count = self.cursor().execute(f"""
+            SELECT (SELECT COUNT(*) FROM {self.PREVIOUS_NAMES_TABLE_NAME}),
+                (SELECT COUNT(*) FROM {self.PREVIOUS_NAMES_FTS_SCHEMA_NAME}.docs);
+        """).fetchone()
+        if indexed_previous_name_count != previous_name_count:
+            raise ValueError(
+                f"Previous names search index covers {indexed_previous_name_count} of {previous_name_count} names."
+            )
+
+        if not self.table_exists(self.NAME_KEYS_TABLE_NAME):
+            raise ValueError("Database has no company name keys.")
+        name_key_count = self.cursor().execute(f"SELECT COUNT(*) FROM {self.NAME_KEYS_TABLE_NAME};").fetchone()[0]
+        if name_key_count != row_count:
+            raise ValueError(f"Company name keys cover {name_key_count} of {row_count} companies.")
+
+        for table_name in (self.SEARCH_FILTERS_TABLE_NAME, self.PREVIOUS_NAME_SEARCH_FILTERS_TABLE_NAME):
+            if not self.table_exists(table_name):
+                raise ValueError(f"Database has no search filters table '{table_name}'.")
+        filtered_count = self.cursor().execute(f"SELECT COUNT(*) FROM {self.SEARCH_FILTERS_TABLE_NAME};").fetchone()[0]
+        if filtered_count != row_count:
+            raise ValueError(f"Search filters cover {filtered_count} of {row_count} companies.")
+
+        if not self.table_exists(self.TRIGRAM_DF_TABLE_NAME):
+            raise ValueError("Database has no company name trigram index.")
+        trigram_doc_count = self.cursor().execute(f"SELECT COUNT(*) FROM {self.TRIGRAM_DOCS_TABLE_NAME};").fetchone()[0]
+        if trigram_doc_count > row_count:
+            raise ValueError(f"Company name trigram index holds {trigram_doc_count} names for {row_count} companies.")
+
+        logger.info(f"Validated database '{self.db_path}' with {row_count} companies.")
+        return row_count
+
     def table_exists(self, table_name: str) -> bool:
         """Checks if a table exists in the database."""
         if not self.con:
             raise ConnectionError("Database is not connected.")
         try:
-            self.con.execute(f"SELECT 1 FROM {table_name} LIMIT 1;")
+            self.cursor().execute(f"SELECT 1 FROM {table_name} LIMIT 1;")
             return True
         except duckdb.CatalogException:
             return False
 
-    async def create_database_from_source(self, config: Settings):
+    def create_database_from_source(self, config: Settings):
         if not self.con:
             raise ConnectionError("Database is not connected. Please connect first.")
 
         self.con.execute("DROP TABLE IF EXISTS " + self.COMPANIES_TABLE_NAME)
 
-        source_path = Path(config.data_source)
-        data_dir = Path(config.data_dir)
-        data_dir.mkdir(exist_ok=True)
+        self.set_phase("loading")
+        self._load_source(config, self.COMPANIES_TABLE_NAME)
+        logger.info("Data loaded successfully.")
+        self.set_phase("indexing")
+        self._cluster_companies()
+        self._create_name_keys()
+        self._create_previous_names()
+        self._create_lookup_indexes()
+        self._create_fts_index()
+        self._create_previous_names_fts_index()
+        self._create_name_trigrams()
+        self._create_search_filters()
+        row_count = self.row_count()
+        self._record_snapshot(config, "full", inserted=row_count, updated=0, removed=0)
+
+    def apply_snapshot_from_source(self, config: Settings):
+        """
+        Updates an existing database to match a new snapshot, touching only what changed.
+
+        The snapshot is loaded into a staging table and diffed against the companies table
+        by company_number. New and changed rows are upserted, and companies missing from
+        the snapshot are deleted and recorded in the company_removals table. The FTS index
+        is updated in place for companies whose name changed, unless so many changed that
+        rebuilding it is cheaper, and so are the search filters of the changed companies.
+
+        Changed rows are appended rather than clustered with their status, category and
+        postcode (see _cluster_companies), so filtered searches slowly lose some of their
+        row group skipping until the next full build.
+        """
+        if not self.con:
+            raise ConnectionError("Database is not connected. Please connect first.")
+
+        self.set_phase("loading")
+        self._load_source(config, self.STAGING_TABLE_NAME)
+        self.set_phase("applying changes")
 
-        if source_path.is_file() and source_path.suffix == ".zip":
-            csv_file_path = self._unzip_first_file(source_path, data_dir)
-        elif source_path.is_file() and source_path.suffix == ".csv":
-            csv_file_path = source_path
+        changed_filter = " OR ".join(
+            f"companies.{field_name} IS DISTINCT FROM staging.{field_name}"
+            for field_name in Company.model_fields
+            if field_name != "company_number"
+        )
+        self.con.execute("BEGIN TRANSACTION;")
+        try:
+            self.con.execute(f"""
+                CREATE TEMP TABLE delta AS
+                SELECT
+                    staging.company_number,
+                    companies.company_number IS NULL AS is_new,
+                    companies.company_name IS DISTINCT FROM staging.company_name AS name_changed
+                FROM {self.STAGING_TABLE_NAME} AS staging
+                LEFT JOIN {self.COMPANIES_TABLE_NAME} AS companies ON companies.company_number = staging.company_number
+                WHERE companies.company_number IS NULL OR {changed_filter};
+            """)
+            self.con.execute(f"""
+                CREATE TEMP TABLE removed AS
+                SELECT companies.company_number, companies.company_name
+                FROM {self.COMPANIES_TABLE_NAME} AS companies
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {self.STAGING_TABLE_NAME} AS staging
+                    WHERE staging.company_number = companies.company_number
+                );
+            """)
+            inserted, updated, renamed = self.con.execute(
+                "SELECT count(*) FILTER (is_new), count(*) FILTER (NOT is_new), count(*) FILTER (name_changed) FROM delta;"
+            ).fetchone()
+            removed = self.con.execute("SELECT count(*) FROM removed;").fetchone()[0]
+            logger.info(f"Snapshot delta: {inserted} new, {updated} changed ({renamed} renamed), {removed} removed.")
+
+            self.con.execute(f"""
+                DELETE FROM {self.COMPANIES_TABLE_NAME} WHERE company_number IN (
+                    SELECT company_number FROM delta UNION ALL SELECT company_number FROM removed
+                );
+            """)
+            self.con.execute(f"""
+                INSERT INTO {self.COMPANIES_TABLE_NAME}
+                SELECT * FROM {self.STAGING_TABLE_NAME}
+                WHERE company_number IN (SELECT company_number FROM delta);
+            """)
+            self.con.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.REMOVALS_TABLE_NAME} (
+                    company_number VARCHAR, company_name VARCHAR, removed_in_source VARCHAR, removed_at TIMESTAMP
+                );
+            """)
+            self.con.execute(
+                f"INSERT INTO {self.REMOVALS_TABLE_NAME} SELECT company_number, company_name, ?, now() FROM removed;",
+                [config.data_source],
+            )
+            self._update_name_keys()
+            self._update_name_trigrams()
+            previous_names_changed = self._update_previous_names()
+
+            # Removed companies count towards the FTS changes, since their postings go too
+            fts_changes = renamed + removed
+            row_count = self.con.execute(f"SELECT count(*) FROM {self.COMPANIES_TABLE_NAME};").fetchone()[0]
+            if fts_changes > row_count * config.incremental_fts_max_fraction:
+                logger.info(f"{fts_changes} companies need re-indexing, rebuilding the FTS index instead.")
+                fts_rebuild = True
+            else:
+                self._update_fts_index()
+                fts_rebuild = False
+            # Keyed by FTS docids, which an FTS rebuild renumbers for every company
+            search_filters_updated = not fts_rebuild and self._update_search_filters()
+
+            for table_name in (self.STAGING_TABLE_NAME, "delta", "removed"):
+                self.con.execute(f"DROP TABLE {table_name};")
+            self.con.execute("COMMIT;")
+        except Exception:
+            self.con.execute("ROLLBACK;")
+            raise
+
+        # A no-op unless the live version predates an index
+        self._create_lookup_indexes()
+        if fts_rebuild:
+            self._create_fts_index()
+        if previous_names_changed:
+            # Far fewer companies have previous names than current ones, so this index is
+            # rebuilt rather than updated in place.
+            self._create_previous_names_fts_index()
+        if not search_filters_updated:
+            self._create_search_filters()
+        elif previous_names_changed:
+            # Keyed by the previous names index's docids, which its rebuild renumbered
+            self._create_previous_name_search_filters()
+        self._record_snapshot(config, "incremental", inserted=inserted, updated=updated, removed=removed)
+
+    def _update_fts_index(self):
+        """
+        Updates the FTS index tables in place for the companies in the `delta` (renamed or
+        new) and `removed` temp tables, mirroring how create_fts_index tokenizes and stems
+        names. Their postings are deleted, new postings are appended in termid order under
+        fresh docids, and the document frequencies and term bounds of the affected terms and the corpus stats
+        are recomputed.
+        """
+        fts_schema = self.FTS_SCHEMA_NAME
+        logger.info("Updating FTS index for changed companies...")
+        next_docid = self.con.execute(f"SELECT COALESCE(max(docid), 0) + 1 FROM {fts_schema}.docs;").fetchone()[0]
+        next_termid = self.con.execute(f"SELECT COALESCE(max(termid), -1) + 1 FROM {fts_schema}.dict;").fetchone()[0]
+        fieldid = self.con.execute(
+            f"SELECT fieldid FROM {fts_schema}.fields WHERE field = 'company_name';"
+        ).fetchone()[0]
+
+        self.con.execute(f"""
+            CREATE TEMP TABLE fts_stale_docs AS
+            SELECT docid FROM {fts_schema}.docs
+            WHERE name IN (
+                SELECT company_number FROM delta WHERE name_changed AND NOT is_new
+                UNION ALL SELECT company_number FROM removed
+            );
+        """)
+        self.con.execute(f"""
+            CREATE TEMP TABLE fts_new_docs AS
+            SELECT {next_docid} + row_number() OVER () - 1 AS docid, company_number AS name, company_name
+            FROM {self.COMPANIES_TABLE_NAME}
+            WHERE company_number IN (SELECT company_number FROM delta WHERE name_changed);
+        """)
+        self.con.execute(f"""
+            CREATE TEMP TABLE fts_new_postings AS
+            SELECT docid, term FROM (
+                SELECT docid, stem(unnest({fts_schema}.tokenize(company_name)), 'porter') AS term
+                FROM fts_new_docs
+            )
+            WHERE term != '' AND term NOT IN (SELECT sw FROM {fts_schema}.stopwords);
+        """)
+        self.con.execute(f"""
+            CREATE TEMP TABLE fts_affected_terms AS
+            SELECT DISTINCT termid FROM {fts_schema}.terms WHERE docid IN (SELECT docid FROM fts_stale_docs);
+        """)
+
+        self.con.execute(f"DELETE FROM {fts_schema}.terms WHERE docid IN (SELECT docid FROM fts_stale_docs);")
+        self.con.execute(f"DELETE FROM {fts_schema}.docs WHERE docid IN (SELECT docid FROM fts_stale_docs);")
+        self.con.execute(f"""
+            INSERT INTO {fts_schema}.dict (termid, term, df)
+            SELECT {next_termid} + row_number() OVER () - 1, term, 0
+            FROM (
+                SELECT DISTINCT term FROM fts_new_postings
+                WHERE term NOT IN (SELECT term FROM {fts_schema}.dict)
+            );
+        """)
+        # Ordered as _create_fts_index orders the table, so the appended postings are
+        # clustered by termid too, and lookups by termid can still skip their row groups
+        self.con.execute(f"""
+            INSERT INTO {fts_schema}.terms (docid, fieldid, termid)
+            SELECT postings.docid, {fieldid}, dict.termid
+            FROM fts_new_postings AS postings
+            JOIN {fts_schema}.dict AS dict ON dict.term = postings.term
+            ORDER BY dict.termid, postings.docid;
+        """)
+        self.con.execute(f"""
+            INSERT INTO {fts_schema}.docs (docid, name, len)
+            SELECT new_docs.docid, new_docs.name, count(postings.term)
+            FROM fts_new_docs AS new_docs
+            LEFT JOIN fts_new_postings AS postings ON postings.docid = new_docs.docid
+            GROUP BY new_docs.docid, new_docs.name;
+        """)
+        self.con.execute(f"""
+            INSERT INTO fts_affected_terms
+            SELECT DISTINCT dict.termid FROM fts_new_postings AS postings
+            JOIN {fts_schema}.dict AS dict ON dict.term = postings.term;
+        """)
+        self.con.execute(f"""
+            UPDATE {fts_schema}.dict SET df = COALESCE(counts.df, 0)
+            FROM (
+                SELECT affected.termid, count(DISTINCT terms.docid) AS df
+                FROM (SELECT DISTINCT termid FROM fts_affected_terms) AS affected
+                LEFT JOIN {fts_schema}.terms AS terms ON terms.termid = affected.termid
+                GROUP BY affected.termid
+            ) AS counts
+            WHERE dict.termid = counts.termid;
+        """)
+        self.con.execute(f"DELETE FROM {fts_schema}.stats;")
+        self.con.execute(f"""
+            INSERT INTO {fts_schema}.stats (num_docs, avgdl)
+            SELECT count(docid), sum(len) / count(len) FROM {fts_schema}.docs;
+        """)
+        if self.table_exists(f"{fts_schema}.{self.TERM_BOUNDS_TABLE_NAME}"):
+            self._create_term_bounds(fts_schema, "WHERE termid IN (SELECT termid FROM fts_affected_terms)")
         else:
+            # The live version predates term bounds
+            self._create_term_bounds(fts_schema)
+        for table_name in ("fts_stale_docs", "fts_new_docs", "fts_new_postings", "fts_affected_terms"):
+            self.con.execute(f"DROP TABLE {table_name};")
+        logger.info("FTS index updated successfully.")
+
+    def _load_source(self, config: Settings, table_name: str):
+        """
+        Loads the data source into `table_name`. A .zip source is streamed straight out of
+        the archive rather than extracted to disk. If parquet_cache_enabled is set, the typed
+        table is also saved as Parquet in data_dir, and later loads of the same source read
+        that instead of parsing the CSV again.
+        """
+        source_path = Path(config.data_source)
+        if not source_path.is_file() or source_path.suffix not in (".zip", ".csv"):
             raise ValueError(f"Invalid source: '{config.data_source}'. Must be a URL or a path to a .zip or .csv file.")
 
-        if not csv_file_path:
-            raise FileNotFoundError("Could not find a CSV file to load.")
+        cache_path = None
+        if config.parquet_cache_enabled:
+            data_dir = Path(config.data_dir)
+            data_dir.mkdir(exist_ok=True)
+            # The size distinguishes re-downloads of a snapshot under the same name
+            cache_path = data_dir / f"{source_path.stem}-{source_path.stat().st_size}.parquet"
 
-        logger.info(f"Loading data from '{csv_file_path}' into table '{self.COMPANIES_TABLE_NAME}'...")
-        safe_csv_path = csv_file_path.as_posix()
+        start = time.perf_counter()
+        self.con.execute(f"DROP TABLE IF EXISTS {table_name};")
+        if cache_path and cache_path.exists():
+            logger.info(f"Loading data from Parquet cache '{cache_path}' into table '{table_name}'...")
+            self.con.execute(f"CREATE TABLE {table_name} AS SELECT * FROM read_parquet('{cache_path.as_posix()}');")
+            cache_path = None
+        elif source_path.suffix == ".zip":
+            self._load_zip(source_path, table_name, config.ingest_block_size_bytes)
+        else:
+            self._load_csv(source_path, table_name)
 
-        columns_definition = {}
-        select_clauses = []
+        row_count = self.con.execute(f"SELECT count(*) FROM {table_name};").fetchone()[0]
+        elapsed = time.perf_counter() - start
+        logger.info(f"Loaded {row_count} rows in {elapsed:.1f}s ({row_count / max(elapsed, 1e-9):,.0f} rows/s).")
+
+        if cache_path:
+            logger.info(f"Writing Parquet cache to '{cache_path}'...")
+            temp_cache_path = cache_path.with_suffix(".parquet.tmp")
+            self.con.execute(
+                f"COPY {table_name} TO '{temp_cache_path.as_posix()}' (FORMAT parquet, COMPRESSION zstd);"
+            )
+            os.replace(temp_cache_path, cache_path)
+
+    @staticmethod
+    def _company_columns() -> list[tuple[str, str, str]]:
+        """Returns the (field name, CSV column name, DuckDB type) of each Company column."""
+        columns = []
         for field_name, field_info in Company.model_fields.items():
-            original_name = field_info.alias
             field_type = field_info.annotation
             if hasattr(field_type, '__args__'):
                 field_type = field_type.__args__[0]
-            columns_definition[original_name] = PYDANTIC_TO_DUCKDB.get(field_type, 'VARCHAR')
+            columns.append((field_name, field_info.alias, PYDANTIC_TO_DUCKDB.get(field_type, 'VARCHAR')))
+        return columns
+
+    def _load_csv(self, csv_file_path: Path, table_name: str):
+        logger.info(f"Loading data from '{csv_file_path}' into table '{table_name}'...")
+        safe_csv_path = csv_file_path.as_posix()
+
+        columns_definition = {}
+        select_clauses = []
+        for field_name, original_name, duckdb_type in self._company_columns():
+            columns_definition[original_name] = duckdb_type
             select_clauses.append(f'"{original_name}" AS {field_name}')
 
         select_statement = ",\n".join(select_clauses)
 
         self.con.execute(f"""
-            CREATE TABLE {self.COMPANIES_TABLE_NAME} AS
+            CREATE TABLE {table_name} AS
             SELECT 
                 {select_statement}
             FROM read_csv(
@@ -145,54 +815,1236 @@ class CompaniesHouseDB:
                 delim=',', quote='"', dateformat='%d/%m/%Y', columns={columns_definition}, escape='"'
             );
         """)
-        logger.info("Data loaded successfully.")
-        self._create_fts_index()
+        if self.status:
+            self.status.rows_loaded = self.con.execute(f"SELECT COUNT(*) FROM {table_name};").fetchone()[0]
+
+    # How often progress is logged while streaming a source
+    INGEST_PROGRESS_INTERVAL_SECONDS = 10.0
+
+    def _load_zip(self, zip_path: Path, table_name: str, block_size: int):
+        """
+        Streams the first file in a zip archive into `table_name`, decompressing and parsing
+        it one block at a time, so memory use is bounded by `block_size` rather than the
+        file size and nothing is extracted to disk.
+        """
+        columns = self._company_columns()
+        column_names = [original_name for _, original_name, _ in columns]
+        # Every column is parsed as a string and typed by DuckDB, matching read_csv's dateformat
+        select_clauses = []
+        for field_name, original_name, duckdb_type in columns:
+            if duckdb_type == 'DATE':
+                select_clauses.append(f"""CAST(strptime("{original_name}", '%d/%m/%Y') AS DATE) AS {field_name}""")
+            elif duckdb_type != 'VARCHAR':
+                select_clauses.append(f'CAST("{original_name}" AS {duckdb_type}) AS {field_name}')
+            else:
+                select_clauses.append(f'"{original_name}" AS {field_name}')
+        select_statement = ",\n".join(select_clauses)
+        columns_statement = ", ".join(f"{field_name} {duckdb_type}" for field_name, _, duckdb_type in columns)
+        self.con.execute(f"CREATE TABLE {table_name} ({columns_statement});")
+
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            member = zip_ref.infolist()[0]
+            logger.info(
+                f"Streaming '{member.filename}' ({member.file_size:,} bytes) from '{zip_path}' "
+                f"into table '{table_name}'..."
+            )
+            with zip_ref.open(member) as csv_file:
+                reader = pyarrow.csv.open_csv(
+                    csv_file,
+                    read_options=pyarrow.csv.ReadOptions(column_names=column_names, skip_rows=1, block_size=block_size),
+                    parse_options=pyarrow.csv.ParseOptions(
+                        delimiter=',', quote_char='"', double_quote=True, newlines_in_values=True
+                    ),
+                    convert_options=pyarrow.csv.ConvertOptions(
+                        column_types={name: pyarrow.string() for name in column_names},
+                        strings_can_be_null=True,
+                    ),
+                )
+                start = last_logged = time.perf_counter()
+                row_count = 0
+                for batch in reader:
+                    self.con.register("csv_batch", batch)
+                    self.con.execute(f"INSERT INTO {table_name} SELECT {select_statement} FROM csv_batch;")
+                    self.con.unregister("csv_batch")
+                    row_count += batch.num_rows
+                    if self.status:
+                        self.status.rows_loaded = row_count
+
+                    now = time.perf_counter()
+                    if now - last_logged >= self.INGEST_PROGRESS_INTERVAL_SECONDS:
+                        last_logged = now
+                        bytes_read = csv_file.tell()
+                        logger.info(
+                            f"Streamed {row_count:,} rows, {bytes_read:,} of {member.file_size:,} bytes "
+                            f"({bytes_read / member.file_size:.0%}) at {row_count / (now - start):,.0f} rows/s, "
+                            f"{bytes_read / (now - start) / 1e6:,.1f} MB/s."
+                        )
+
+    def _record_snapshot(self, config: Settings, ingest_mode: str, inserted: int, updated: int, removed: int):
+        """Records where the data came from, and what loading it changed, in the snapshots table."""
+        source_stat = os.stat(config.data_source)
+        self.con.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.SNAPSHOTS_TABLE_NAME} (
+                source VARCHAR,
+                source_size BIGINT,
+                source_modified TIMESTAMP,
+                ingest_mode VARCHAR,
+                loaded_at TIMESTAMP,
+                row_count BIGINT,
+                inserted_count BIGINT,
+                updated_count BIGINT,
+                removed_count BIGINT
+            );
+        """)
+        self.con.execute(
+            f"INSERT INTO {self.SNAPSHOTS_TABLE_NAME} VALUES (?, ?, to_timestamp(?), ?, now(), ?, ?, ?, ?);",
+            [
+                os.path.basename(config.data_source),
+                source_stat.st_size,
+                source_stat.st_mtime,
+                ingest_mode,
+                self.row_count(),
+                inserted,
+                updated,
+                removed,
+            ],
+        )
+
+    def _cluster_companies(self):
+        """
+        Rewrites the companies table ordered by status, category and postcode. The FTS index
+        numbers companies in table order, so companies alike in these get neighbouring
+        docids, and filtered searches (see _create_search_filters) skip whole row groups of
+        the search filters and of each term's postings.
+        """
+        logger.info(f"Clustering table '{self.COMPANIES_TABLE_NAME}' by status, category and postcode...")
+        self.con.execute(f"""
+            CREATE OR REPLACE TABLE {self.COMPANIES_TABLE_NAME} AS
+            SELECT * FROM {self.COMPANIES_TABLE_NAME}
+            ORDER BY company_status, company_category, {postcode_sql("regaddress_postcode")}, company_number;
+        """)
+
+    def _create_search_filters(self):
+        """
+        Creates the company_search_filters table, holding the columns a search can be filtered
+        on (see CompanySearchFilters) for each company, keyed by its FTS docid so that filters
+        apply before BM25 scoring. Statuses and categories are dictionary-encoded as ENUMs,
+        postcodes are in postcode_sql form, and SIC codes are integers. Rows are in docid
+        order, which follows the clustered companies table. Each row also holds the company's
+        trigram index doc_id, so the trigram search is filtered by integer id too.
+
+        The same columns are copied for each previous name, keyed by its docid in the previous
+        names FTS index, so that index is filtered without joining back on company_number.
+        """
+        logger.info(f"Creating search filters in table '{self.SEARCH_FILTERS_TABLE_NAME}'...")
+        # The ENUM types can only be replaced once no table uses them
+        for table_name in (self.SEARCH_FILTERS_TABLE_NAME, self.PREVIOUS_NAME_SEARCH_FILTERS_TABLE_NAME):
+            self.con.execute(f"DROP TABLE IF EXISTS {table_name};")
+        for column, type_name in self.SEARCH_FILTER_ENUM_TYPES.items():
+            self.con.execute(f"""
+                CREATE OR REPLACE TYPE {type_name} AS ENUM (
+                    SELECT DISTINCT {column} FROM {self.COMPANIES_TABLE_NAME} WHERE {column} IS NOT NULL ORDER BY {column}
+                );
+            """)
+        self.con.execute(f"""
+            CREATE TABLE {self.SEARCH_FILTERS_TABLE_NAME} AS
+            {self._company_search_filters_sql()}
+            ORDER BY docs.docid;
+        """)
+        self._create_previous_name_search_filters()
+        self._search_filter_values = None
+
+    def _create_previous_name_search_filters(self):
+        """Creates the search filters of each previous name (see _create_search_filters)."""
+        self.con.execute(f"""
+            CREATE OR REPLACE TABLE {self.PREVIOUS_NAME_SEARCH_FILTERS_TABLE_NAME} AS
+            SELECT docs.docid, {self._search_filter_columns_sql()}
+            FROM {self.PREVIOUS_NAMES_FTS_SCHEMA_NAME}.docs AS docs
+            JOIN {self.PREVIOUS_NAMES_TABLE_NAME} AS previous_names ON previous_names.previous_name_id = docs.name
+            JOIN {self.COMPANIES_TABLE_NAME} AS companies ON companies.company_number = previous_names.company_number
+            ORDER BY docs.docid;
+        """)
+
+    def _update_search_filters(self) -> bool:
+        """
+        Updates the company search filters for the companies in the `delta` and `removed`
+        temp tables, once _update_fts_index and _update_name_trigrams have given renamed and
+        new companies their docids. Their rows are deleted, and rows for the new and changed
+        companies are appended in docid order.
+
+        Returns:
+            Whether the filters were updated. If not, they must be recreated instead: they
+            don't exist yet, or a changed company has a status or category missing from the
+            ENUM types, which can't be extended in place.
+        """
+        if not self.table_exists(self.SEARCH_FILTERS_TABLE_NAME):
+            return False
+        for column, type_name in self.SEARCH_FILTER_ENUM_TYPES.items():
+            new_value = self.con.execute(f"""
+                SELECT {column} FROM {self.COMPANIES_TABLE_NAME}
+                WHERE company_number IN (SELECT company_number FROM delta)
+                    AND {column} NOT IN (SELECT unnest(enum_range(NULL::{type_name}))::VARCHAR)
+                LIMIT 1;
+            """).fetchone()
+            if new_value:
+                logger.info(f"New {column} '{new_value[0]}' found, recreating the search filters instead.")
+                return False
+        self.con.execute(f"""
+            DELETE FROM {self.SEARCH_FILTERS_TABLE_NAME} WHERE company_number IN (
+                SELECT company_number FROM delta UNION ALL SELECT company_number FROM removed
+            );
+        """)
+        self.con.execute(f"""
+            INSERT INTO {self.SEARCH_FILTERS_TABLE_NAME}
+            {self._company_search_filters_sql("WHERE companies.company_number IN (SELECT company_number FROM delta)")}
+            ORDER BY docs.docid;
+        """)
+        return True
+
+    def _company_search_filters_sql(self, where: str = "") -> str:
+        """Returns a query for the company_search_filters rows of the companies matching `where`."""
+        return f"""
+            SELECT docs.docid, companies.company_number, trigram_docs.doc_id AS trigram_doc_id,
+                {self._search_filter_columns_sql()}
+            FROM {self.COMPANIES_TABLE_NAME} AS companies
+            JOIN {self.FTS_SCHEMA_NAME}.docs AS docs ON docs.name = companies.company_number
+            LEFT JOIN {self.TRIGRAM_DOCS_TABLE_NAME} AS trigram_docs
+                ON trigram_docs.company_number = companies.company_number
+            {where}
+        """
 
-    def _create_fts_index(self):
+    def _search_filter_columns_sql(self) -> str:
+        """Returns the search filter columns of the `companies` alias, cast to their filter types."""
+        enum_columns = ", ".join(
+            f"companies.{column}::{type_name} AS {column}" for column, type_name in self.SEARCH_FILTER_ENUM_TYPES.items()
+        )
+        sic_code_columns = ", ".join(
+            f"{sic_code_sql(f'companies.siccode_sictext_{n}')} AS sic_code_{n}" for n in range(1, self.SIC_CODE_COUNT + 1)
+        )
+        return f"""
+            {enum_columns},
+            {postcode_sql("companies.regaddress_postcode")} AS postcode,
+            {sic_code_columns},
+            companies.incorporation_date
+        """
+
+    def _create_name_keys(self):
+        """
+        Creates the company_name_keys table, holding the canonical form of each company's
+        name (see company_name_key_sql), for suffix- and punctuation-insensitive lookups.
+        """
+        logger.info(f"Creating company name keys in table '{self.NAME_KEYS_TABLE_NAME}'...")
+        self.con.execute(f"""
+            CREATE OR REPLACE TABLE {self.NAME_KEYS_TABLE_NAME} AS
+            SELECT company_number, {company_name_key_sql("company_name")} AS name_key
+            FROM {self.COMPANIES_TABLE_NAME}
+            ORDER BY name_key;
+        """)
+
+    def _update_name_keys(self):
+        """Updates the name keys for the companies in the `delta` and `removed` temp tables."""
+        if not self.table_exists(self.NAME_KEYS_TABLE_NAME):
+            self._create_name_keys()
+            return
+        self.con.execute(f"""
+            DELETE FROM {self.NAME_KEYS_TABLE_NAME} WHERE company_number IN (
+                SELECT company_number FROM delta WHERE name_changed UNION ALL SELECT company_number FROM removed
+            );
+        """)
+        self.con.execute(f"""
+            INSERT INTO {self.NAME_KEYS_TABLE_NAME}
+            SELECT company_number, {company_name_key_sql("company_name")}
+            FROM {self.COMPANIES_TABLE_NAME}
+            WHERE company_number IN (SELECT company_number FROM delta WHERE name_changed);
+        """)
+
+    def _create_name_trigrams(self):
+        """
+        Creates the character-trigram index over the company name keys, for typo-tolerant
+        search (see company_name_trigram_text_sql). Each name is a binary vector of hashed
+        trigrams, stored sparsely across three tables:
+            - company_name_trigram_docs: a doc_id for each company, and its number of
+              distinct trigrams (the squared norm of its vector).
+            - company_name_trigrams: a (bucket, doc_id) posting per distinct trigram of each
+              name, ordered by bucket so a query reads only the row groups of its trigrams.
+              Both columns are integers, which DuckDB stores compressed.
+            - company_name_trigram_df: how many names each bucket occurs in.
+        """
+        logger.info(f"Creating company name trigram index in table '{self.TRIGRAMS_TABLE_NAME}'...")
+        self.con.execute(f"""
+            CREATE OR REPLACE TABLE {self.TRIGRAM_DOCS_TABLE_NAME} (
+                doc_id INTEGER, company_number VARCHAR, trigram_count INTEGER
+            );
+        """)
+        self.con.execute(f"CREATE OR REPLACE TABLE {self.TRIGRAMS_TABLE_NAME} (bucket INTEGER, doc_id INTEGER);")
+        self._index_name_trigrams(next_doc_id=1, where="true")
+        logger.info("Company name trigram index created successfully.")
+
+    def _update_name_trigrams(self):
+        """
+        Updates the trigram index for the companies in the `delta` and `removed` temp tables.
+        Their postings are deleted, renamed and new companies are indexed under fresh
+        doc_ids, and the bucket frequencies are recounted.
+        """
+        if not self.table_exists(self.TRIGRAM_DOCS_TABLE_NAME):
+            self._create_name_trigrams()
+            return
+        next_doc_id = self.con.execute(
+            f"SELECT COALESCE(max(doc_id), 0) + 1 FROM {self.TRIGRAM_DOCS_TABLE_NAME};"
+        ).fetchone()[0]
+        self.con.execute(f"""
+            CREATE TEMP TABLE trigram_stale_docs AS
+            SELECT doc_id FROM {self.TRIGRAM_DOCS_TABLE_NAME} WHERE company_number IN (
+                SELECT company_number FROM delta WHERE name_changed UNION ALL SELECT company_number FROM removed
+            );
+        """)
+        self.con.execute(
+            f"DELETE FROM {self.TRIGRAMS_TABLE_NAME} WHERE doc_id IN (SELECT doc_id FROM trigram_stale_docs);"
+        )
+        self.con.execute(
+            f"DELETE FROM {self.TRIGRAM_DOCS_TABLE_NAME} WHERE doc_id IN (SELECT doc_id FROM trigram_stale_docs);"
+        )
+        self.con.execute("DROP TABLE trigram_stale_docs;")
+        self._index_name_trigrams(
+            next_doc_id, where="company_number IN (SELECT company_number FROM delta WHERE name_changed)"
+        )
+
+    def _index_name_trigrams(self, next_doc_id: int, where: str):
+        """
+        Adds the name keys matching a WHERE clause to the trigram index, numbered from
+        `next_doc_id`, and recounts the bucket frequencies.
+        """
+        self.con.execute(f"""
+            CREATE OR REPLACE TEMP TABLE trigram_texts AS
+            SELECT
+                ({next_doc_id} + row_number() OVER (ORDER BY company_number) - 1)::INTEGER AS doc_id,
+                company_number, {company_name_trigram_text_sql("name_key")} AS text
+            FROM {self.NAME_KEYS_TABLE_NAME}
+            WHERE {where};
+        """)
+        self.con.execute(f"""
+            INSERT INTO {self.TRIGRAMS_TABLE_NAME}
+            {self._trigrams_sql("trigram_texts", "doc_id")}
+            ORDER BY bucket, doc_id;
+        """)
+        # Names with no trigrams (no letters or digits besides their suffix) can never match
+        self.con.execute(f"""
+            INSERT INTO {self.TRIGRAM_DOCS_TABLE_NAME}
+            SELECT trigram_texts.doc_id, trigram_texts.company_number, counts.trigram_count
+            FROM trigram_texts
+            JOIN (
+                SELECT doc_id, count(*)::INTEGER AS trigram_count
+                FROM {self.TRIGRAMS_TABLE_NAME}
+                WHERE doc_id >= {next_doc_id}
+                GROUP BY doc_id
+            ) AS counts ON counts.doc_id = trigram_texts.doc_id
+            ORDER BY trigram_texts.doc_id;
+        """)
+        self.con.execute(f"""
+            CREATE OR REPLACE TABLE {self.TRIGRAM_DF_TABLE_NAME} AS
+            SELECT bucket, count(*)::INTEGER AS df FROM {self.TRIGRAMS_TABLE_NAME} GROUP BY bucket ORDER BY bucket;
+        """)
+        self.con.execute("DROP TABLE trigram_texts;")
+
+    @classmethod
+    def _trigrams_sql(cls, table_name: str, id_column: str) -> str:
+        """
+        Returns a query for the distinct hashed trigrams of the `text` column of a table,
+        as (bucket, `id_column`) rows. Used both to index names and to vectorize queries,
+        so the two always hash alike.
+        """
+        return f"""
+            SELECT DISTINCT (hash(substr(text, position, 3)) % {cls.TRIGRAM_BUCKETS})::INTEGER AS bucket, {id_column}
+            FROM (SELECT {id_column}, text, unnest(range(1, length(text) - 1)) AS position FROM {table_name})
+        """
+
+    def _previous_names_sql(self, where: str = "") -> str:
+        """
+        Returns a query that unpivots the previousname_N columns of the companies table into
+        one row per previous name, optionally filtered by a WHERE clause on the companies.
+        """
+        return "\nUNION ALL\n".join(
+            f"""
+            SELECT company_number, {n} AS name_index,
+                previousname_{n}_companyname AS previous_name, previousname_{n}_condate AS changed_on
+            FROM {self.COMPANIES_TABLE_NAME}
+            WHERE previousname_{n}_companyname IS NOT NULL {f"AND ({where})" if where else ""}
+            """
+            for n in range(1, self.PREVIOUS_NAME_COUNT + 1)
+        )
+
+    def _create_previous_names(self):
+        """
+        Creates the company_previous_names table, holding each company's previous names and
+        the dates they changed, one per row, so they can be indexed and searched without
+        reading the ten wide previousname columns.
+        """
+        logger.info(f"Creating previous company names in table '{self.PREVIOUS_NAMES_TABLE_NAME}'...")
+        self.con.execute(f"""
+            CREATE OR REPLACE TABLE {self.PREVIOUS_NAMES_TABLE_NAME} AS
+            SELECT
+                row_number() OVER (ORDER BY company_number, name_index) AS previous_name_id,
+                company_number, name_index, previous_name, changed_on
+            FROM ({self._previous_names_sql()})
+            ORDER BY previous_name_id;
+        """)
+
+    def _update_previous_names(self) -> bool:
+        """
+        Updates the previous names for the companies in the `delta` and `removed` temp tables.
+
+        Returns:
+            Whether any previous names were added or removed.
+        """
+        if not self.table_exists(self.PREVIOUS_NAMES_TABLE_NAME):
+            self._create_previous_names()
+            return True
+        deleted = self.con.execute(f"""
+            DELETE FROM {self.PREVIOUS_NAMES_TABLE_NAME} WHERE company_number IN (
+                SELECT company_number FROM delta UNION ALL SELECT company_number FROM removed
+            );
+        """).fetchone()[0]
+        next_id = self.con.execute(
+            f"SELECT COALESCE(max(previous_name_id), 0) + 1 FROM {self.PREVIOUS_NAMES_TABLE_NAME};"
+        ).fetchone()[0]
+        inserted = self.con.execute(f"""
+            INSERT INTO {self.PREVIOUS_NAMES_TABLE_NAME}
+            SELECT
+                {next_id} + row_number() OVER (ORDER BY company_number, name_index) - 1,
+                company_number, name_index, previous_name, changed_on
+            FROM ({self._previous_names_sql("company_number IN (SELECT company_number FROM delta)")});
+        """).fetchone()[0]
+        return deleted > 0 or inserted > 0
+
+    def _create_lookup_indexes(self):
+        """Creates indexes for exact lookups by company number, company name and name key."""
+        logger.info(f"Creating lookup indexes on table '{self.COMPANIES_TABLE_NAME}'...")
+        self.con.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.COMPANIES_TABLE_NAME}_company_number_idx "
+            f"ON {self.COMPANIES_TABLE_NAME} (company_number);"
+        )
+        self.con.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.COMPANIES_TABLE_NAME}_company_name_idx "
+            f"ON {self.COMPANIES_TABLE_NAME} (company_name);"
+        )
+        self.con.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.NAME_KEYS_TABLE_NAME}_name_key_idx "
+            f"ON {self.NAME_KEYS_TABLE_NAME} (name_key);"
+        )
+        self.con.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.PREVIOUS_NAMES_TABLE_NAME}_company_number_idx "
+            f"ON {self.PREVIOUS_NAMES_TABLE_NAME} (company_number);"
+        )
+        logger.info("Lookup indexes created successfully.")
+
+    def _create_fts_index(
+        self,
+        table_name: str = COMPANIES_TABLE_NAME,
+        key_column: str = "company_number",
+        text_column: str = "company_name",
+    ):
         """Creates a full-text search index on company name and number."""
-        logger.info(f"Creating FTS index on table '{self.COMPANIES_TABLE_NAME}'...")
+        logger.info(f"Creating FTS index on table '{table_name}'...")
         self.con.execute(f"""
-            PRAGMA create_fts_index('{self.COMPANIES_TABLE_NAME}', 'company_number', 'company_name', overwrite=1);
+            PRAGMA create_fts_index('{table_name}', '{key_column}', '{text_column}', overwrite=1);
         """
         )
+        # The index-table search path looks postings up by termid. Storing the postings
+        # ordered by termid lets DuckDB skip row groups using their min/max statistics,
+        # rather than scanning every posting for each query. match_bm25 is unaffected.
+        self.con.execute(f"""
+            CREATE OR REPLACE TABLE fts_main_{table_name}.terms AS
+            SELECT * FROM fts_main_{table_name}.terms ORDER BY termid, docid;
+        """)
+        self._create_term_bounds(f"fts_main_{table_name}")
         logger.info("FTS index created successfully.")
 
-    @staticmethod
-    def _unzip_first_file(zip_path: Path, extract_dir: Path) -> Path:
-        with zipfile.ZipFile(zip_path, "r") as zip_ref:
-            file_to_extract = zip_ref.namelist()[0]
-            zip_ref.extract(file_to_extract, extract_dir)
-            return extract_dir / file_to_extract
+    def _create_term_bounds(self, fts_schema: str, where: str = ""):
+        """
+        Creates the term_bounds table of an FTS index, holding the largest tf and the
+        shortest document length among each term's postings. BM25 grows with tf and falls
+        with document length, so these bound what any document can score for the term,
+        which lets the search skip common terms (see _bm25_top_k_sql).
+
+        If `where` is given, only the bounds of the terms it selects are replaced.
+        """
+        if where:
+            self.con.execute(f"DELETE FROM {fts_schema}.{self.TERM_BOUNDS_TABLE_NAME} {where};")
+            statement = f"INSERT INTO {fts_schema}.{self.TERM_BOUNDS_TABLE_NAME}"
+        else:
+            statement = f"CREATE OR REPLACE TABLE {fts_schema}.{self.TERM_BOUNDS_TABLE_NAME} AS"
+        self.con.execute(f"""
+            {statement}
+            SELECT term_tf.termid, max(term_tf.tf) AS max_tf, min(docs.len) AS min_len
+            FROM (
+                SELECT termid, docid, count(*) AS tf FROM {fts_schema}.terms {where} GROUP BY termid, docid
+            ) AS term_tf
+            JOIN {fts_schema}.docs AS docs ON docs.docid = term_tf.docid
+            GROUP BY term_tf.termid;
+        """)
+        self._has_term_bounds.pop(fts_schema, None)
+
+    def _create_previous_names_fts_index(self):
+        """Creates a full-text search index on previous company names."""
+        self._create_fts_index(self.PREVIOUS_NAMES_TABLE_NAME, "previous_name_id", "previous_name")
 
     def search_companies_by_name(self, name_fragment: str, limit: int = 10) -> list[CompanyMatch]:
-        """Performs a full-text search on the company_name column."""
+        """Performs a full-text search for a single company name (see search_companies_by_names)."""
+        return self.search_companies_by_names([name_fragment], limit)[name_fragment]
+
+    def search_companies_by_names(
+        self,
+        names: list[str],
+        limit: int = 10,
+        fields: list[str] | None = None,
+        include_previous_names: bool = True,
+        include_trigrams: bool = True,
+        filters: CompanySearchFilters | None = None,
+    ) -> dict[str, list[CompanyMatch]]:
+        """
+        Performs a full-text search for many company names.
+
+        The search path is chosen by `search_mode`:
+            - "index": score only documents containing a query term, via the FTS index
+              tables, for every name in a single statement (see _search_companies_by_names_index).
+            - "scan": evaluate the match_bm25 macro against every row of the companies table,
+              one name at a time. Only current names are searched, by BM25 alone.
+            - "compare": run both, log their timings and any ranking difference, and return
+              the index results.
+
+        Returns:
+            A dict keyed by each distinct name, with matches ordered by descending score.
+            Names with no matching terms map to an empty list.
+        """
+        if self.search_mode == "scan":
+            return {
+                name: self._search_companies_by_name_scan(name, limit, fields, filters)
+                for name in dict.fromkeys(names)
+            }
+        index_results = self._search_companies_by_names_index(
+            names, limit, fields, include_previous_names, include_trigrams, filters
+        )
+        if self.search_mode == "compare":
+            self._compare_search_paths(names, limit, fields, filters)
+        return index_results
+
+    def _compare_search_paths(
+        self, names: list[str], limit: int, fields: list[str] | None, filters: CompanySearchFilters | None
+    ):
+        start = time.perf_counter()
+        # The scan path only searches current names, by BM25 alone
+        index_results = self._search_companies_by_names_index(
+            names, limit, fields, include_previous_names=False, include_trigrams=False, filters=filters
+        )
+        index_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        scan_results = {
+            name: self._search_companies_by_name_scan(name, limit, fields, filters) for name in index_results
+        }
+        scan_ms = (time.perf_counter() - start) * 1000
+
+        logger.info(f"Search for {len(index_results)} names: index path {index_ms:.1f}ms, scan path {scan_ms:.1f}ms")
+        for name, index_matches in index_results.items():
+            index_ranking = [(m.company_number, round(m.score, 6)) for m in index_matches]
+            scan_ranking = [(m.company_number, round(m.score, 6)) for m in scan_results[name]]
+            if index_ranking != scan_ranking:
+                logger.warning(f"Search paths disagree for '{name}': index={index_ranking} scan={scan_ranking}")
+
+    def _search_companies_by_name_scan(
+        self,
+        name_fragment: str,
+        limit: int,
+        fields: list[str] | None = None,
+        filters: CompanySearchFilters | None = None,
+    ) -> list[CompanyMatch]:
+        """Performs a full-text search by scoring every row with the match_bm25 macro."""
         if not self.con:
             raise ConnectionError("Database is not connected.")
 
+        # fields are validated Company field names, so are safe to interpolate
+        selected_columns = ", ".join(fields) if fields else "*"
+        params = {"name": name_fragment, "limit": limit}
+        if filters is not None and not filters.is_empty():
+            if not self.has_search_filters():
+                raise ValueError("This database has no search filters. Rebuild it to filter searches.")
+            filter_condition, filter_params = self._search_filters_sql(filters)
+            params.update(filter_params)
+            company_filter = f"""WHERE company_number IN (
+                SELECT company_number FROM {self.SEARCH_FILTERS_TABLE_NAME} WHERE {filter_condition}
+            )"""
+        else:
+            company_filter = ""
         # Using a subquery and explicitly targeting the 'company_name' field for the search.
         query = f"""
-            SELECT score, *
+            SELECT score, {selected_columns}
             FROM (
                 SELECT
                     *,
                     fts_main_{self.COMPANIES_TABLE_NAME}.match_bm25(
                         company_number,
-                        ?,
+                        $name,
                         fields := 'company_name'
                     ) AS score
                 FROM {self.COMPANIES_TABLE_NAME}
+                {company_filter}
             ) sq
             WHERE score IS NOT NULL
             ORDER BY score DESC
-            LIMIT ?;
+            LIMIT $limit;
+        """
+        results = self.fetch_rows(query, params)
+        return [CompanyMatch.model_construct(**row) for row in results]
+
+    def _search_companies_by_names_index(
+        self,
+        names: list[str],
+        limit: int = 10,
+        fields: list[str] | None = None,
+        include_previous_names: bool = True,
+        include_trigrams: bool = True,
+        filters: CompanySearchFilters | None = None,
+    ) -> dict[str, list[CompanyMatch]]:
+        """
+        Performs a full-text search for many company names in a single statement.
+
+        Rather than evaluating the match_bm25 macro once per name (a scan of the whole
+        table each time), the query tokenizes every name, joins the tokens against the
+        FTS index's dict/terms/docs tables, and computes the same BM25 score as match_bm25
+        (k=1.2, b=0.75) for all names at once. Only documents containing at least one
+        query term are scored, and only the top `limit` documents per name are joined
+        back to the companies table.
+
+        If `include_previous_names` is set, the previous names index is scored the same way
+        in the same statement, and a company matched by several of its names is ranked by
+        its best-scoring one. Each match reports the name that matched, and for a previous
+        name, the date the company changed from it.
+
+        If `include_trigrams` and `trigram_search` are set, the name trigram index (see _create_name_trigrams) is
+        searched in the same statement too, finding names BM25 misses because of a typo or
+        run-together words. Each company's score is the greater of its BM25 score and its
+        trigram similarity scaled by the query's top BM25 score (but at least by
+        TRIGRAM_MIN_SCORE_SCALE), so trigram candidates rank among BM25 ones on one scale.
+
+        Only the Company `fields` requested are selected (all of them by default). Rows
+        come straight from the typed companies table, so matches are constructed without
+        re-validating each row.
+
+        If `filters` are given, the companies passing them are selected from the search
+        filters table first (see _create_search_filters), and only their postings are scored
+        by each index, so a selective filter makes the search cheaper rather than dearer.
+
+        Returns:
+            A dict keyed by each distinct name, with matches ordered by descending score.
+            Names with no matching terms map to an empty list.
+        """
+        if not self.con:
+            raise ConnectionError("Database is not connected.")
+
+        unique_names = list(dict.fromkeys(names))
+        results: dict[str, list[CompanyMatch]] = {name: [] for name in unique_names}
+        if not unique_names:
+            return results
+
+        fts_schema = self.FTS_SCHEMA_NAME
+        previous_fts_schema = self.PREVIOUS_NAMES_FTS_SCHEMA_NAME
+        # fields are validated Company field names, so are safe to interpolate
+        selected_columns = ", ".join(f"companies.{field}" for field in fields) if fields else "companies.*"
+        params = {"names": unique_names, "limit": limit}
+        filtered = filters is not None and not filters.is_empty()
+        if filtered:
+            if not self.has_search_filters():
+                raise ValueError("This database has no search filters. Rebuild it to filter searches.")
+            filter_condition, filter_params = self._search_filters_sql(filters)
+            params.update(filter_params)
+            filtered_companies = f"""
+                filtered_companies AS (
+                    SELECT docid, trigram_doc_id FROM {self.SEARCH_FILTERS_TABLE_NAME} WHERE {filter_condition}
+                ),
+            """
+            docid_filter = "terms.docid IN (SELECT docid FROM filtered_companies)"
+            previous_docid_filter = f"""terms.docid IN (
+                SELECT docid FROM {self.PREVIOUS_NAME_SEARCH_FILTERS_TABLE_NAME} WHERE {filter_condition}
+            )"""
+        else:
+            filtered_companies = ""
+            docid_filter = previous_docid_filter = "true"
+        if include_previous_names and self.has_previous_names():
+            previous_name_candidates = f"""
+                UNION ALL
+                SELECT top_k.query_idx, previous_names.company_number, top_k.score,
+                    previous_names.previous_name, previous_names.changed_on
+                FROM ({self._bm25_top_k_sql(previous_fts_schema, previous_docid_filter)}) AS top_k
+                JOIN {previous_fts_schema}.docs AS docs ON docs.docid = top_k.docid
+                JOIN {self.PREVIOUS_NAMES_TABLE_NAME} AS previous_names ON previous_names.previous_name_id = docs.name
+            """
+        else:
+            previous_name_candidates = ""
+        if include_trigrams and self.trigram_search and self.has_name_trigrams():
+            trigram_candidates = self._trigram_top_k_sql(filtered)
+            params["trigram_max_df_fraction"] = (
+                1.0 if self.trigram_max_df_fraction is None else self.trigram_max_df_fraction
+            )
+            params["trigram_min_similarity"] = self.trigram_min_similarity
+        else:
+            trigram_candidates = (
+                "SELECT NULL::BIGINT AS query_idx, NULL::VARCHAR AS company_number, NULL::DOUBLE AS similarity "
+                "WHERE false"
+            )
+        query = f"""
+            WITH queries AS (
+                SELECT unnest($names) AS query, generate_subscripts($names, 1) AS query_idx
+            ),
+            {filtered_companies}
+            tokens AS (
+                SELECT DISTINCT query_idx, stem(unnest({fts_schema}.tokenize(query)), 'porter') AS term
+                FROM queries
+            ),
+            candidates AS (
+                SELECT top_k.query_idx, docs.name AS company_number, top_k.score,
+                    NULL::VARCHAR AS previous_name, NULL::DATE AS changed_on
+                FROM ({self._bm25_top_k_sql(fts_schema, docid_filter)}) AS top_k
+                JOIN {fts_schema}.docs AS docs ON docs.docid = top_k.docid
+                {previous_name_candidates}
+            ),
+            best_candidates AS (
+                -- A company's best-scoring name, preferring its current name on a tie
+                SELECT * FROM candidates
+                QUALIFY row_number() OVER (
+                    PARTITION BY query_idx, company_number ORDER BY score DESC, changed_on DESC NULLS FIRST
+                ) = 1
+            ),
+            trigram_queries AS (
+                SELECT query_idx, {company_name_trigram_text_sql(company_name_key_sql("query"))} AS text
+                FROM queries
+            ),
+            trigram_candidates AS ({trigram_candidates}),
+            top_scores AS (
+                SELECT query_idx, max(score) AS top_score FROM best_candidates GROUP BY query_idx
+            ),
+            merged_candidates AS (
+                SELECT
+                    COALESCE(bm25.query_idx, trigram.query_idx) AS query_idx,
+                    COALESCE(bm25.company_number, trigram.company_number) AS company_number,
+                    greatest(
+                        COALESCE(bm25.score, 0),
+                        COALESCE(
+                            trigram.similarity * greatest(top_scores.top_score, {self.TRIGRAM_MIN_SCORE_SCALE}), 0
+                        )
+                    ) AS score,
+                    trigram.similarity, bm25.previous_name, bm25.changed_on
+                FROM best_candidates AS bm25
+                FULL OUTER JOIN trigram_candidates AS trigram
+                    ON trigram.query_idx = bm25.query_idx AND trigram.company_number = bm25.company_number
+                LEFT JOIN top_scores ON top_scores.query_idx = COALESCE(bm25.query_idx, trigram.query_idx)
+            ),
+            top_k AS (
+                SELECT * FROM merged_candidates
+                QUALIFY row_number() OVER (PARTITION BY query_idx ORDER BY score DESC, company_number) <= $limit
+            )
+            SELECT
+                top_k.query_idx, top_k.score, top_k.similarity,
+                COALESCE(top_k.previous_name, companies.company_name) AS matched_name,
+                top_k.changed_on AS matched_name_changed_on,
+                {selected_columns}
+            FROM top_k
+            JOIN {self.COMPANIES_TABLE_NAME} AS companies ON companies.company_number = top_k.company_number
+            ORDER BY top_k.query_idx, top_k.score DESC, top_k.company_number;
+        """
+        rows = self.fetch_rows(query, params)
+        for row in rows:
+            # generate_subscripts is 1-based
+            name = unique_names[row.pop("query_idx") - 1]
+            results[name].append(CompanyMatch.model_construct(**row))
+        return results
+
+    @staticmethod
+    def _bm25_sql(idf: str, tf: str, length: str) -> str:
+        """Returns match_bm25's score (k=1.2, b=0.75) for a term's postings in a document."""
+        return f"{idf} * (({tf} * (1.2 + 1)) / ({tf} + 1.2 * (1 - 0.75 + 0.75 * ({length} / stats.avgdl))))"
+
+    def _bm25_top_k_sql(self, fts_schema: str, docid_filter: str = "true") -> str:
+        """
+        Returns a query for the top $limit documents per query_idx in an FTS index, scored
+        by BM25 against the `tokens` of each query, as (query_idx, docid, score) rows. Only
+        the postings matching `docid_filter`, a condition on terms.docid, are scored.
+
+        Most names contain a term like LIMITED that occurs in most documents, and scoring
+        every document containing it would dominate the cost of a search. So the query
+        prunes them MaxScore-style, without changing the results:
+            1. Terms in at most BM25_PROBE_MAX_DF_FRACTION of documents are scored first.
+               The $limit-th best of these partial scores is a threshold the top $limit
+               documents' full scores must reach.
+            2. Each term's bound (see _create_term_bounds) is the most it can add to a
+               document's score. Taking terms from the lowest bound up, those whose bounds
+               sum to less than the threshold are skippable: a document containing only
+               them can't reach it, so their postings aren't read to find candidates.
+            3. Documents containing an unskippable term are candidates. Those whose score
+               so far, plus the bounds of the terms not yet read, can reach the threshold
+               have the remaining terms' postings looked up, and are scored in full.
+        A term scores the same in a document whichever query contains it, so each term's
+        postings are read and scored once for the whole batch of queries.
+        """
+        if not self.has_term_bounds(fts_schema):
+            return self._unpruned_bm25_top_k_sql(fts_schema, docid_filter)
+
+        def term_scores_sql(terms_table: str, term_condition: str, docid_condition: str) -> str:
+            return f"""
+                SELECT postings.termid, postings.docid,
+                    {self._bm25_sql("idfs.idf", "postings.tf", "docs.len")} AS score
+                FROM (
+                    SELECT terms.termid, terms.docid, count(*) AS tf
+                    FROM {fts_schema}.terms AS terms
+                    WHERE terms.termid IN (SELECT termid FROM {terms_table} WHERE {term_condition})
+                        AND {docid_condition}
+                    GROUP BY terms.termid, terms.docid
+                ) AS postings
+                JOIN (SELECT DISTINCT termid, idf FROM {terms_table}) AS idfs ON idfs.termid = postings.termid
+                JOIN {fts_schema}.docs AS docs ON docs.docid = postings.docid
+                CROSS JOIN {fts_schema}.stats AS stats
+            """
+
+        return f"""
+            WITH query_terms AS (
+                SELECT *, row_number() OVER (PARTITION BY query_idx ORDER BY bound, termid) AS bound_rank
+                FROM (
+                    SELECT
+                        tokens.query_idx,
+                        dict.termid,
+                        log(((stats.num_docs - dict.df + 0.5) / (dict.df + 0.5)) + 1) AS idf,
+                        dict.df <= stats.num_docs * {self.BM25_PROBE_MAX_DF_FRACTION} AS probe,
+                        -- Headroom for rounding, since bounds and scores are summed in different orders
+                        {self._bm25_sql("idf", "bounds.max_tf", "bounds.min_len")} * (1 + 1e-9) AS bound
+                    FROM tokens
+                    JOIN {fts_schema}.dict AS dict ON dict.term = tokens.term
+                    JOIN {fts_schema}.{self.TERM_BOUNDS_TABLE_NAME} AS bounds ON bounds.termid = dict.termid
+                    CROSS JOIN {fts_schema}.stats AS stats
+                )
+            ),
+            probe_term_scores AS ({term_scores_sql("query_terms", "probe", docid_filter)}),
+            probe_scores AS (
+                -- A document is a candidate if its highest-ranked term isn't skippable
+                SELECT query_terms.query_idx, term_scores.docid, sum(term_scores.score) AS score,
+                    max(query_terms.bound_rank) AS max_bound_rank
+                FROM query_terms
+                JOIN probe_term_scores AS term_scores ON term_scores.termid = query_terms.termid
+                GROUP BY query_terms.query_idx, term_scores.docid
+            ),
+            thresholds AS (
+                SELECT query_idx, min(score) AS threshold
+                FROM (
+                    SELECT query_idx, score FROM probe_scores
+                    QUALIFY row_number() OVER (PARTITION BY query_idx ORDER BY score DESC) <= $limit
+                )
+                GROUP BY query_idx
+                HAVING count(*) = $limit
+            ),
+            ranked_terms AS (
+                SELECT
+                    query_terms.*,
+                    sum(query_terms.bound) OVER (
+                        PARTITION BY query_terms.query_idx ORDER BY query_terms.bound_rank ROWS UNBOUNDED PRECEDING
+                    ) < COALESCE(thresholds.threshold, 0) AS skippable
+                FROM query_terms
+                LEFT JOIN thresholds ON thresholds.query_idx = query_terms.query_idx
+            ),
+            query_bounds AS (
+                SELECT
+                    query_idx,
+                    count(*) FILTER (WHERE skippable) AS skippable_terms,
+                    COALESCE(sum(bound) FILTER (WHERE skippable AND NOT probe), 0) AS unread_bound
+                FROM ranked_terms
+                GROUP BY query_idx
+            ),
+            essential_term_scores AS ({term_scores_sql("ranked_terms", "NOT probe AND NOT skippable", docid_filter)}),
+            essential_scores AS (
+                SELECT ranked_terms.query_idx, term_scores.docid, sum(term_scores.score) AS score
+                FROM ranked_terms
+                JOIN essential_term_scores AS term_scores ON term_scores.termid = ranked_terms.termid
+                WHERE NOT ranked_terms.probe AND NOT ranked_terms.skippable
+                GROUP BY ranked_terms.query_idx, term_scores.docid
+            ),
+            survivors AS (
+                SELECT query_idx, docid, score
+                FROM (
+                    SELECT
+                        COALESCE(probe_scores.query_idx, essential_scores.query_idx) AS query_idx,
+                        COALESCE(probe_scores.docid, essential_scores.docid) AS docid,
+                        COALESCE(probe_scores.score, 0) + COALESCE(essential_scores.score, 0) AS score,
+                        essential_scores.docid IS NOT NULL
+                            OR probe_scores.max_bound_rank > query_bounds.skippable_terms AS candidate,
+                        query_bounds.unread_bound
+                    FROM probe_scores
+                    FULL OUTER JOIN essential_scores
+                        ON essential_scores.query_idx = probe_scores.query_idx
+                        AND essential_scores.docid = probe_scores.docid
+                    JOIN query_bounds
+                        ON query_bounds.query_idx = COALESCE(probe_scores.query_idx, essential_scores.query_idx)
+                ) AS read_scores
+                LEFT JOIN thresholds USING (query_idx)
+                WHERE candidate AND score + unread_bound >= COALESCE(threshold, 0)
+            ),
+            unread_term_scores AS (
+                {term_scores_sql("ranked_terms", "skippable AND NOT probe", "terms.docid IN (SELECT docid FROM survivors)")}
+            ),
+            unread_scores AS (
+                SELECT survivors.query_idx, survivors.docid, sum(term_scores.score) AS score
+                FROM survivors
+                JOIN ranked_terms ON ranked_terms.query_idx = survivors.query_idx
+                JOIN unread_term_scores AS term_scores
+                    ON term_scores.termid = ranked_terms.termid AND term_scores.docid = survivors.docid
+                WHERE ranked_terms.skippable AND NOT ranked_terms.probe
+                GROUP BY survivors.query_idx, survivors.docid
+            )
+            SELECT query_idx, docid, score
+            FROM (
+                SELECT survivors.query_idx, survivors.docid,
+                    survivors.score + COALESCE(unread_scores.score, 0) AS score
+                FROM survivors
+                LEFT JOIN unread_scores
+                    ON unread_scores.query_idx = survivors.query_idx AND unread_scores.docid = survivors.docid
+            )
+            QUALIFY row_number() OVER (PARTITION BY query_idx ORDER BY score DESC, docid) <= $limit
+        """
+
+    @classmethod
+    def _unpruned_bm25_top_k_sql(cls, fts_schema: str, docid_filter: str = "true") -> str:
+        """Returns _bm25_top_k_sql's query for an FTS index built before term bounds, scoring every posting."""
+        return f"""
+            WITH query_terms AS (
+                SELECT tokens.query_idx, dict.termid, dict.df
+                FROM tokens
+                JOIN {fts_schema}.dict AS dict ON dict.term = tokens.term
+            ),
+            term_tf AS (
+                SELECT query_terms.query_idx, terms.docid, query_terms.termid, query_terms.df, COUNT(*) AS tf
+                FROM query_terms
+                JOIN {fts_schema}.terms AS terms ON terms.termid = query_terms.termid
+                WHERE {docid_filter}
+                GROUP BY query_terms.query_idx, terms.docid, query_terms.termid, query_terms.df
+            ),
+            scores AS (
+                SELECT
+                    term_tf.query_idx,
+                    term_tf.docid,
+                    sum(
+                        {cls._bm25_sql(
+                            "log(((stats.num_docs - term_tf.df + 0.5) / (term_tf.df + 0.5)) + 1)",
+                            "term_tf.tf",
+                            "docs.len",
+                        )}
+                    ) AS score
+                FROM term_tf
+                JOIN {fts_schema}.docs AS docs ON docs.docid = term_tf.docid
+                CROSS JOIN {fts_schema}.stats AS stats
+                GROUP BY term_tf.query_idx, term_tf.docid
+            )
+            SELECT query_idx, docid, score
+            FROM scores
+            QUALIFY row_number() OVER (PARTITION BY query_idx ORDER BY score DESC, docid) <= $limit
+        """
+
+    def _trigram_top_k_sql(self, filtered: bool = False) -> str:
+        """
+        Returns a query for the top $limit companies per query_idx in the trigram index,
+        ranked by the cosine similarity of their name's trigram vector with each of the
+        `trigram_queries`, as (query_idx, company_number, similarity) rows. Only names
+        sharing a trigram with the query are scored, and those below $trigram_min_similarity
+        are dropped.
+
+        Candidates are found approximately: trigrams occurring in more than
+        $trigram_max_df_fraction of names (e.g. the trigrams of SERVICES) are skipped, since
+        reading their postings dominates the cost while barely separating names. The best
+        TRIGRAM_SHORTLIST_FACTOR * $limit candidates by the remaining trigrams are then
+        rescored exactly from their name keys, so the approximation costs only recall.
+
+        If `filtered`, only the names of the `filtered_companies` are scored.
+        """
+        # An inner join on the unique trigram_doc_id, rather than IN, lets DuckDB build its hash
+        # table from whichever side is smaller, so a filter passing most companies costs little
+        doc_filter = (
+            "JOIN filtered_companies ON filtered_companies.trigram_doc_id = postings.doc_id" if filtered else ""
+        )
+        return f"""
+            WITH query_trigrams AS ({self._trigrams_sql("trigram_queries", "query_idx")}),
+            query_norms AS (
+                SELECT query_idx, count(*) AS trigram_count FROM query_trigrams GROUP BY query_idx
+            ),
+            selective_trigrams AS (
+                SELECT query_trigrams.query_idx, query_trigrams.bucket
+                FROM query_trigrams
+                JOIN {self.TRIGRAM_DF_TABLE_NAME} AS df ON df.bucket = query_trigrams.bucket
+                WHERE df.df <= $trigram_max_df_fraction * (SELECT count(*) FROM {self.TRIGRAM_DOCS_TABLE_NAME})
+            ),
+            selective_shared AS (
+                SELECT selective_trigrams.query_idx, postings.doc_id, count(*) AS shared_count
+                FROM selective_trigrams
+                JOIN {self.TRIGRAMS_TABLE_NAME} AS postings ON postings.bucket = selective_trigrams.bucket
+                {doc_filter}
+                GROUP BY selective_trigrams.query_idx, postings.doc_id
+            ),
+            shortlist AS (
+                SELECT selective_shared.query_idx, docs.doc_id, docs.company_number, docs.trigram_count
+                FROM selective_shared
+                JOIN {self.TRIGRAM_DOCS_TABLE_NAME} AS docs ON docs.doc_id = selective_shared.doc_id
+                QUALIFY row_number() OVER (
+                    PARTITION BY selective_shared.query_idx
+                    ORDER BY selective_shared.shared_count / sqrt(docs.trigram_count) DESC, docs.doc_id
+                ) <= $limit * {self.TRIGRAM_SHORTLIST_FACTOR}
+            ),
+            shortlist_texts AS (
+                SELECT shortlist.query_idx, shortlist.doc_id, {company_name_trigram_text_sql("name_keys.name_key")} AS text
+                FROM shortlist
+                JOIN {self.NAME_KEYS_TABLE_NAME} AS name_keys ON name_keys.company_number = shortlist.company_number
+            ),
+            shortlist_trigrams AS ({self._trigrams_sql("shortlist_texts", "query_idx, doc_id")}),
+            shared AS (
+                SELECT shortlist_trigrams.query_idx, shortlist_trigrams.doc_id, count(*) AS shared_count
+                FROM shortlist_trigrams
+                JOIN query_trigrams
+                    ON query_trigrams.query_idx = shortlist_trigrams.query_idx
+                    AND query_trigrams.bucket = shortlist_trigrams.bucket
+                GROUP BY shortlist_trigrams.query_idx, shortlist_trigrams.doc_id
+            ),
+            similarities AS (
+                SELECT
+                    shortlist.query_idx,
+                    shortlist.company_number,
+                    shared.shared_count / sqrt(query_norms.trigram_count * shortlist.trigram_count) AS similarity
+                FROM shared
+                JOIN shortlist ON shortlist.query_idx = shared.query_idx AND shortlist.doc_id = shared.doc_id
+                JOIN query_norms ON query_norms.query_idx = shared.query_idx
+            )
+            SELECT query_idx, company_number, similarity
+            FROM similarities
+            WHERE similarity >= $trigram_min_similarity
+            QUALIFY row_number() OVER (PARTITION BY query_idx ORDER BY similarity DESC, company_number) <= $limit
+        """
+
+    def _search_filters_sql(self, filters: CompanySearchFilters) -> tuple[str, dict[str, Any]]:
+        """
+        Returns a condition on the search filters table selecting the companies that pass
+        `filters`, and its parameters. Each condition compares a column with constants, so
+        DuckDB can skip row groups by their min/max statistics.
+        """
+        conditions = []
+        params: dict[str, Any] = {}
+        for column, type_name in self.SEARCH_FILTER_ENUM_TYPES.items():
+            requested = getattr(filters, column)
+            if requested is None:
+                continue
+            # Values missing from the ENUM match no company, and can't be cast to it
+            known_values = self.search_filter_values()[column]
+            values = list(dict.fromkeys(
+                known_values[value.lower()] for value in requested if value.lower() in known_values
+            ))
+            for i, value in enumerate(values):
+                params[f"{column}_{i}"] = value
+            value_list = ", ".join(f"${column}_{i}::{type_name}" for i in range(len(values)))
+            conditions.append(f"{column} IN ({value_list})" if values else "false")
+        if filters.postcode_prefix is not None:
+            # The range lets row groups be skipped, and the pattern keeps to whole areas and districts
+            params["postcode_prefix"] = filters.postcode_prefix
+            params["postcode_prefix_end"] = filters.postcode_prefix + "~"
+            params["postcode_pattern"] = postcode_prefix_pattern(filters.postcode_prefix)
+            conditions.append(
+                "postcode >= $postcode_prefix AND postcode < $postcode_prefix_end "
+                "AND regexp_matches(postcode, $postcode_pattern)"
+            )
+        if filters.sic_codes is not None:
+            sic_code_conditions = []
+            for i, prefix in enumerate(filters.sic_codes):
+                params[f"sic_code_first_{i}"], params[f"sic_code_last_{i}"] = sic_code_range(prefix)
+                sic_code_conditions.extend(
+                    f"sic_code_{n} BETWEEN $sic_code_first_{i} AND $sic_code_last_{i}"
+                    for n in range(1, self.SIC_CODE_COUNT + 1)
+                )
+            conditions.append(f"({' OR '.join(sic_code_conditions)})")
+        if filters.incorporated_from is not None:
+            params["incorporated_from"] = filters.incorporated_from
+            conditions.append("incorporation_date >= $incorporated_from")
+        if filters.incorporated_to is not None:
+            params["incorporated_to"] = filters.incorporated_to
+            conditions.append("incorporation_date <= $incorporated_to")
+        return " AND ".join(conditions) or "true", params
+
+    def search_filter_values(self) -> dict[str, dict[str, str]]:
+        """Returns the values of each ENUM search filter column, keyed by their lower-case form."""
+        if self._search_filter_values is None:
+            self._search_filter_values = {
+                column: {
+                    value.lower(): value
+                    for (value,) in self.cursor().execute(f"SELECT unnest(enum_range(NULL::{type_name}));").fetchall()
+                }
+                for column, type_name in self.SEARCH_FILTER_ENUM_TYPES.items()
+            }
+        return self._search_filter_values
+
+    # Upper bound on the values in a single IN list, keeping lookups eligible for index scans.
+    EXACT_LOOKUP_CHUNK_SIZE = 1000
+
+    def find_exact_matches(
+        self, queries: list[str], fields: list[str] | None = None
+    ) -> dict[str, tuple[MatchDecision, Company]]:
+        """
+        Finds queries that are a company number, or exactly match the name of a single company.
+
+        Only the Company `fields` requested are selected (all of them by default), along
+        with the company name and number, and companies are constructed without
+        re-validating each row, as search_companies_by_names does.
+
+        Returns:
+            A dict keyed by each query with an exact match, giving whether it matched on
+            "company_number" or "exact_name", and the matched company. Company number
+            matches take precedence, and names shared by several companies are ignored.
+        """
+        if not self.con:
+            raise ConnectionError("Database is not connected.")
+
+        results: dict[str, tuple[MatchDecision, Company]] = {}
+        # fields are validated Company field names, so are safe to interpolate
+        selected_columns = (
+            ", ".join(f"companies.{field}" for field in dict.fromkeys(["company_name", "company_number", *fields]))
+            if fields
+            else "companies.*"
+        )
+
+        queries_by_number: dict[str, list[str]] = {}
+        for query in queries:
+            company_number = normalize_company_number(query)
+            if company_number:
+                queries_by_number.setdefault(company_number, []).append(query)
+        for company in self._select_companies_where_in("company_number", list(queries_by_number), selected_columns):
+            for query in queries_by_number[company.company_number]:
+                results[query] = ("company_number", company)
+
+        name_queries = [query for query in queries if query not in results]
+        if not self.has_name_keys():
+            companies_by_query = self._find_companies_by_exact_name(name_queries, selected_columns)
+        else:
+            companies_by_query = self.find_companies_by_name_keys(name_queries, selected_columns)
+        for query, companies in companies_by_query.items():
+            if len(companies) > 1:
+                # Prefer the one company whose name is spelt exactly as queried, if any
+                exact_name = normalize_exact_company_name(query)
+                companies = [company for company in companies if company.company_name == exact_name]
+            if len(companies) == 1:
+                results[query] = ("exact_name", companies[0])
+
+        return results
+
+    def has_previous_names(self) -> bool:
+        if self._has_previous_names is None:
+            self._has_previous_names = self.table_exists(f"{self.PREVIOUS_NAMES_FTS_SCHEMA_NAME}.docs")
+        return self._has_previous_names
+
+    def has_name_trigrams(self) -> bool:
+        if self._has_name_trigrams is None:
+            self._has_name_trigrams = self.table_exists(self.TRIGRAM_DF_TABLE_NAME)
+        return self._has_name_trigrams
+
+    def has_search_filters(self) -> bool:
+        if self._has_search_filters is None:
+            self._has_search_filters = self.table_exists(self.SEARCH_FILTERS_TABLE_NAME)
+        return self._has_search_filters
+
+    def has_term_bounds(self, fts_schema: str) -> bool:
+        if fts_schema not in self._has_term_bounds:
+            self._has_term_bounds[fts_schema] = self.table_exists(f"{fts_schema}.{self.TERM_BOUNDS_TABLE_NAME}")
+        return self._has_term_bounds[fts_schema]
+
+    def has_name_keys(self) -> bool:
+        if self._has_name_keys is None:
+            self._has_name_keys = self.table_exists(self.NAME_KEYS_TABLE_NAME)
+        return self._has_name_keys
+
+    def find_companies_by_name_keys(
+        self, names: list[str], selected_columns: str = "companies.*"
+    ) -> dict[str, list[Company]]:
+        """
+        Finds the companies whose names match each of many names, ignoring case, accents,
+        punctuation, "&" versus "AND", and how the LTD/PLC/LLP suffix is spelt.
+
+        All names are normalized and joined against the name keys in a single query, so
+        DuckDB resolves the whole batch with one hash (or index) join. Only the
+        `selected_columns` of each company are fetched.
+
+        Returns:
+            A dict keyed by each name that matched, giving the matching companies.
+        """
+        if not self.con:
+            raise ConnectionError("Database is not connected.")
+        if not names:
+            return {}
+
+        unique_names = list(dict.fromkeys(names))
+        query = f"""
+            WITH queries AS (
+                SELECT name, {company_name_key_sql("name")} AS name_key
+                FROM (SELECT unnest($names) AS name)
+            )
+            SELECT queries.name AS query_name, {selected_columns}
+            FROM queries
+            JOIN {self.NAME_KEYS_TABLE_NAME} AS name_keys ON name_keys.name_key = queries.name_key
+            JOIN {self.COMPANIES_TABLE_NAME} AS companies ON companies.company_number = name_keys.company_number
+            WHERE queries.name_key != '';
+        """
+        rows = self.fetch_rows(query, {"names": unique_names})
+        results: dict[str, list[Company]] = {}
+        for row in rows:
+            results.setdefault(row.pop("query_name"), []).append(Company.model_construct(**row))
+        return results
+
+    def _find_companies_by_exact_name(
+        self, names: list[str], selected_columns: str = "companies.*"
+    ) -> dict[str, list[Company]]:
+        """Finds the companies named exactly as each name, for databases without name keys."""
+        names_by_exact_name: dict[str, list[str]] = {}
+        for name in names:
+            names_by_exact_name.setdefault(normalize_exact_company_name(name), []).append(name)
+        results: dict[str, list[Company]] = {}
+        for company in self._select_companies_where_in("company_name", list(names_by_exact_name), selected_columns):
+            for name in names_by_exact_name[company.company_name]:
+                results.setdefault(name, []).append(company)
+        return results
+
+    def _select_companies_where_in(
+        self, column: str, values: list[str], selected_columns: str = "companies.*"
+    ) -> list[Company]:
+        companies = []
+        for i in range(0, len(values), self.EXACT_LOOKUP_CHUNK_SIZE):
+            chunk = values[i:i + self.EXACT_LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join("?" for _ in chunk)
+            query = (
+                f"SELECT {selected_columns} FROM {self.COMPANIES_TABLE_NAME} AS companies "
+                f"WHERE {column} IN ({placeholders});"
+            )
+            rows = self.fetch_rows(query, chunk)
+            companies.extend(Company.model_construct(**row) for row in rows)
+        return companies
+
+    def get_companies_by_numbers(self, company_numbers: list[str]) -> list[Company]:
+        """
+        Retrieves the companies with any of the given company numbers in a single query,
+        joining the numbers, passed as one list parameter, against the companies table.
+        Numbers that don't exist are left out.
+        """
+        if not self.con:
+            raise ConnectionError("Database is not connected.")
+        if not company_numbers:
+            return []
+        query = f"""
+            SELECT companies.*
+            FROM (SELECT DISTINCT unnest($company_numbers) AS company_number) AS numbers
+            JOIN {self.COMPANIES_TABLE_NAME} AS companies ON companies.company_number = numbers.company_number;
         """
-        results = self.con.execute(query, [name_fragment, limit]).fetch_arrow_table().to_pylist()
-        return [CompanyMatch.model_validate(row) for row in results]
+        rows = self.fetch_rows(query, {"company_numbers": company_numbers})
+        return [Company.model_validate(row) for row in rows]
 
     def get_company_by_number(self, company_number: str) -> Optional[Company]:
         """Retrieves a single company by its exact company number."""
         if not self.con:
             raise ConnectionError("Database is not connected.")
         query = f"SELECT * FROM {self.COMPANIES_TABLE_NAME} WHERE company_number = ?;"
-        results = self.con.execute(query, [company_number]).fetch_arrow_table().to_pylist()
+        results = self.fetch_rows(query, [company_number])
         return Company.model_validate(results[0]) if results else None
\ No newline at end of file
@@ -0,0 +1,79 @@
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseVersions:
+    """
+    Manages versioned copies of the companies database alongside `db_path`.
+
+    Each build is written to its own file, e.g. db/companies-20260201T030000123456-1f2e3d4c.duckdb,
+    and a pointer file (db/companies.duckdb.current) names the live version. Switching the
+    live version is an atomic replace of the pointer file, so readers always see either
+    the old or the new version. Databases created before versioning, at `db_path` itself,
+    are used as the live version until a versioned build replaces them.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.directory = self.db_path.parent
+        self.pointer_path = self.db_path.with_name(self.db_path.name + ".current")
+
+    def new_version_path(self) -> Path:
+        """
+        Returns a path for a new version that no other file has. Versions are named by
+        their creation time to the microsecond, so they sort oldest first, with a random
+        suffix so that builds started at the same time never share a file.
+        """
+        while True:
+            version = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+            path = self.directory / f"{self.db_path.stem}-{version}{self.db_path.suffix}"
+            if not path.exists() and path != self.current_path():
+                return path
+
+    def list_versions(self) -> list[Path]:
+        """Returns every versioned build, oldest first."""
+        return sorted(self.directory.glob(f"{self.db_path.stem}-*{self.db_path.suffix}"))
+
+    def current_path(self) -> Path | None:
+        """Returns the live database file, or None if no database has been built."""
+        if self.pointer_path.exists():
+            current = self.directory / self.pointer_path.read_text(encoding="utf-8").strip()
+            if current.exists():
+                return current
+            logger.warning(f"Database version '{current}' named by '{self.pointer_path}' does not exist.")
+        if self.db_path.exists():
+            return self.db_path
+        return None
+
+    def set_current(self, path: Path):
+        """Atomically makes `path` the live database version."""
+        temp_pointer_path = self.pointer_path.with_name(self.pointer_path.name + ".tmp")
+        temp_pointer_path.write_text(path.name, encoding="utf-8")
+        os.replace(temp_pointer_path, self.pointer_path)
+        logger.info(f"Live database version is now '{path}'.")
+
+    def previous_version(self) -> Path | None:
+        """Returns the versioned build before the live one, for rollback."""
+        current = self.current_path()
+        earlier = [path for path in self.list_versions() if current is None or path.name < current.name]
+        return earlier[-1] if earlier else None
+
+    def prune(self, keep: int):
+        """Deletes all but the newest `keep` versioned builds, never deleting the live one."""
+        current = self.current_path()
+        versions = self.list_versions()
+        for path in versions[:max(len(versions) - keep, 0)]:
+            if path != current:
+                logger.info(f"Deleting old database version '{path}'.")
+                self.delete_version(path)
+
+    def delete_version(self, path: Path):
+        """Deletes a database version and the files alongside it, e.g. its WAL and suggest index."""
+        path.unlink(missing_ok=True)
+        for sibling_path in self.directory.glob(f"{path.name}.*"):
+            sibling_path.unlink(missing_ok=True)
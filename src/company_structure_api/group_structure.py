@@ -0,0 +1,197 @@
+import logging
+from array import array
+from collections import deque
+
+from company_structure_api.models import (
+    GroupEntity,
+    GroupEntityAnalysis,
+    GroupRelationship,
+    GroupStructureAnalysis,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class GroupStructureError(ValueError):
+    """Raised when a group structure can't be analysed, e.g. because it contains an ownership loop."""
+
+    def __init__(self, message: str, cycle: list[str] | None = None):
+        super().__init__(message)
+        self.cycle = cycle
+
+
+class OwnershipGraph:
+    """
+    A group structure's ownership relationships as a compact, array-backed directed graph.
+
+    Entities are numbered 0..n-1, and the edges from each parent to its children are stored
+    in compressed sparse row form: the children of entity i are
+    children[child_offsets[i]:child_offsets[i + 1]], with the fraction of each child the
+    parent owns in the matching position of fractions. Relationships naming the same parent
+    and child are combined.
+    """
+
+    def __init__(self, entity_ids: list[str], edges: dict[tuple[int, int], float]):
+        self.entity_ids = entity_ids
+        self.size = len(entity_ids)
+
+        # A counting sort of the edges by parent
+        self.child_offsets = array("l", [0]) * (self.size + 1)
+        self.parent_counts = array("l", [0]) * self.size
+        for parent, child in edges:
+            self.child_offsets[parent + 1] += 1
+            self.parent_counts[child] += 1
+        for i in range(self.size):
+            self.child_offsets[i + 1] += self.child_offsets[i]
+        self.children = array("l", [0]) * len(edges)
+        self.fractions = array("d", [0.0]) * len(edges)
+        next_positions = self.child_offsets[:-1]
+        for (parent, child), fraction in edges.items():
+            position = next_positions[parent]
+            self.children[position] = child
+            self.fractions[position] = fraction
+            next_positions[parent] = position + 1
+
+    @classmethod
+    def from_structure(cls, entities: list[GroupEntity], relationships: list[GroupRelationship]) -> "OwnershipGraph":
+        """
+        Builds the graph for a group structure. Relationships may refer to entities by id,
+        TIN or name, and are resolved with a lookup table rather than a search per relationship.
+        """
+        entity_ids = list(dict.fromkeys(entity.id for entity in entities))
+        index_by_id = {entity_id: index for index, entity_id in enumerate(entity_ids)}
+        # As in the UI, a TIN or name refers to the first entity with it, and ids take precedence
+        index_by_key: dict[str, int] = {}
+        for entity in reversed(entities):
+            for key in (entity.name, entity.tin):
+                if key:
+                    index_by_key[key] = index_by_id[entity.id]
+        index_by_key.update(index_by_id)
+
+        edges: dict[tuple[int, int], float] = {}
+        for relationship in relationships:
+            parent = index_by_key.get(relationship.parent)
+            child = index_by_key.get(relationship.child)
+            for key, index in ((relationship.parent, parent), (relationship.child, child)):
+                if index is None:
+                    raise GroupStructureError(f"Entity not found: {key}")
+            if parent == child:
+                raise GroupStructureError(f"Invalid relationship: entity {entity_ids[parent]} cannot own itself.")
+            edges[parent, child] = edges.get((parent, child), 0.0) + relationship.percentage_ownership / 100
+        return cls(entity_ids, edges)
+
+    def child_edges(self, parent: int) -> range:
+        return range(self.child_offsets[parent], self.child_offsets[parent + 1])
+
+    def find_cycle(self) -> list[str] | None:
+        """
+        Returns an ownership loop as the ids of the entities along it, starting and ending
+        with the same entity, or None if the structure has no loops.
+        """
+        unvisited, in_progress, done = 0, 1, 2
+        state = bytearray(self.size)
+        for start in range(self.size):
+            if state[start] != unvisited:
+                continue
+            # An iterative depth-first search, so deep structures can't overflow the stack
+            path = [start]
+            next_edges = [self.child_offsets[start]]
+            state[start] = in_progress
+            while path:
+                node = path[-1]
+                edge = next_edges[-1]
+                if edge == self.child_offsets[node + 1]:
+                    state[node] = done
+                    path.pop()
+                    next_edges.pop()
+                    continue
+                next_edges[-1] += 1
+                child = self.children[edge]
+                if state[child] == in_progress:
+                    cycle = path[path.index(child):] + [child]
+                    return [self.entity_ids[i] for i in cycle]
+                if state[child] == unvisited:
+                    state[child] = in_progress
+                    path.append(child)
+                    next_edges.append(self.child_offsets[child])
+        return None
+
+    def topological_order(self) -> array:
+        """
+        Returns the entities ordered so that every parent comes before its children.
+
+        Raises:
+            GroupStructureError: If the structure contains an ownership loop.
+        """
+        parent_counts = array("l", self.parent_counts)
+        queue = deque(i for i in range(self.size) if parent_counts[i] == 0)
+        order = array("l")
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for edge in self.child_edges(node):
+                child = self.children[edge]
+                parent_counts[child] -= 1
+                if parent_counts[child] == 0:
+                    queue.append(child)
+        if len(order) < self.size:
+            cycle = self.find_cycle()
+            raise GroupStructureError(f"Ownership loop found: {' -> '.join(cycle or [])}", cycle=cycle)
+        return order
+
+    def analyse(self) -> GroupStructureAnalysis:
+        """
+        Computes, in a single pass over the entities in topological order:
+            - depth: the length of the longest ownership chain from an ultimate parent, for
+              laying the structure out in levels.
+            - ultimate_parents: the entities with no owners that own the entity, directly or
+              indirectly.
+            - effective_ownership: the percentage of the entity each ultimate parent owns
+              through every chain of ownership, i.e. the sum over paths of the product of
+              each step's ownership.
+
+        Ownership is propagated as sparse vectors keyed by ultimate parent, so the work is
+        proportional to the number of relationships times the number of ultimate parents
+        that actually reach each entity, not to the square of the number of entities.
+        """
+        order = self.topological_order()
+        children, fractions, child_offsets = self.children, self.fractions, self.child_offsets
+        depths = array("l", [0]) * self.size
+        ownership: list[dict[int, float]] = [{} for _ in range(self.size)]
+        for node in order:
+            # An ultimate parent owns all of itself, but isn't reported as owning itself
+            node_ownership = {node: 1.0}.items() if self.parent_counts[node] == 0 else ownership[node].items()
+            child_depth = depths[node] + 1
+            for edge in range(child_offsets[node], child_offsets[node + 1]):
+                child = children[edge]
+                fraction = fractions[edge]
+                if depths[child] < child_depth:
+                    depths[child] = child_depth
+                child_ownership = ownership[child]
+                for root, root_fraction in node_ownership:
+                    child_ownership[root] = child_ownership.get(root, 0.0) + root_fraction * fraction
+
+        # The results are built from validated input, so aren't validated again
+        entity_ids = self.entity_ids
+        return GroupStructureAnalysis.model_construct(
+            ultimate_parents=[entity_ids[i] for i in range(self.size) if self.parent_counts[i] == 0],
+            max_depth=max(depths, default=0),
+            entities=[
+                GroupEntityAnalysis.model_construct(
+                    id=entity_ids[i],
+                    depth=depths[i],
+                    ultimate_parents=[entity_ids[root] for root in ownership[i]],
+                    effective_ownership={entity_ids[root]: fraction * 100 for root, fraction in ownership[i].items()},
+                )
+                for i in range(self.size)
+            ],
+        )
+
+
+def analyse_group_structure(entities: list[GroupEntity], relationships: list[GroupRelationship]) -> GroupStructureAnalysis:
+    graph = OwnershipGraph.from_structure(entities, relationships)
+    analysis = graph.analyse()
+    logger.info(
+        f"Analysed group structure with {graph.size} entities and {len(graph.children)} relationships."
+    )
+    return analysis
@@ -0,0 +1,33 @@
+import asyncio
+import logging
+
+from fastapi import APIRouter, HTTPException
+from starlette.responses import Response
+
+from company_structure_api.group_structure import GroupStructureError, analyse_group_structure
+from company_structure_api.models import GroupStructureAnalysis, GroupStructureRequest
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api")
+
+
+@router.post(
+    "/group-structure/analyse",
+    response_model=GroupStructureAnalysis,
+    responses={422: {"description": "The structure refers to unknown entities or contains an ownership loop."}},
+    tags=["Group Structure"]
+)
+async def analyse(request: GroupStructureRequest):
+    """
+    Analyses a group structure's ownership graph. Returns each entity's depth for layout,
+    its ultimate parents, and the effective percentage each ultimate parent owns of it
+    through indirect ownership. An ownership loop is rejected with the entities along it.
+    """
+    try:
+        # Large groups take long enough to analyse that it runs off the event loop
+        analysis = await asyncio.to_thread(analyse_group_structure, request.entities, request.relationships)
+    except GroupStructureError as e:
+        logger.info(f"Rejected group structure: {e}")
+        raise HTTPException(status_code=422, detail={"message": str(e), "cycle": e.cycle})
+    return Response(content=analysis.model_dump_json(), media_type="application/json")
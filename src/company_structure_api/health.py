@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException, Request
+from starlette.responses import JSONResponse, PlainTextResponse
+
+from company_structure_api.metrics import metrics
+from company_structure_api.models import DatabaseStatus
+
+router = APIRouter(tags=["Health"])
+
+
+@router.get("/healthz")
+async def healthz():
+    """Liveness probe. Succeeds as soon as the server is accepting requests."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz", response_model=DatabaseStatus, responses={503: {"model": DatabaseStatus}})
+async def readyz(request: Request):
+    """
+    Readiness probe. Succeeds once the companies database is available, and otherwise
+    responds with 503 and the progress of the database build.
+    """
+    status = request.app.state.company_visualizer.database_status
+    return JSONResponse(status.model_dump(mode="json"), status_code=200 if status.ready else 503)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, tags=["Metrics"])
+async def prometheus_metrics(request: Request):
+    """
+    Prometheus metrics: latency histograms for each stage of the matching pipeline and for
+    API requests, LLM requests and token usage, how recommendations were decided, cache
+    hit rates and the database query queue. Responds with 404 unless metrics are enabled.
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are not enabled.")
+    company_visualizer = request.app.state.company_visualizer
+    gauges = [("database_ready", "Whether the companies database is ready to serve.", {},
+               float(company_visualizer.database_status.ready))]
+    if company_visualizer.db:
+        for name, value in company_visualizer.db.pool_stats().items():
+            gauges.append((f"db_{name}", "Database query pool statistics.", {}, value))
+    for cache_name, cache in (
+        ("recommendation", company_visualizer.recommendation_cache),
+        ("company", company_visualizer.company_cache),
+    ):
+        if cache:
+            stats = cache.stats()
+            # The caches are recreated when the database version changes, which resets these
+            gauges.append(("cache_hits", "Cache hits since the live database version was loaded.",
+                           {"cache": cache_name}, stats["hits"]))
+            gauges.append(("cache_misses", "Cache misses since the live database version was loaded.",
+                           {"cache": cache_name}, stats["misses"]))
+            gauges.append(("cache_entries", "Entries in the cache.", {"cache": cache_name}, stats["size"]))
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,59 @@
+import argparse
+import logging
+
+from company_structure_api.config import Settings
+from company_structure_api.db import build_database_version
+from company_structure_api.db_versions import DatabaseVersions
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild(config: Settings, incremental: bool):
+    """Builds and validates a new database version, then makes it live."""
+    versions = DatabaseVersions(config.db_path)
+    new_path = build_database_version(config, versions, incremental=incremental)
+    logger.info(f"Rebuild complete. Running servers will swap to '{new_path}' on their next poll.")
+
+
+def rollback(config: Settings):
+    """Makes the version before the live one live again."""
+    versions = DatabaseVersions(config.db_path)
+    previous_path = versions.previous_version()
+    if previous_path is None:
+        raise SystemExit("There is no earlier database version to roll back to.")
+    versions.set_current(previous_path)
+
+
+def list_versions(config: Settings):
+    versions = DatabaseVersions(config.db_path)
+    current_path = versions.current_path()
+    for path in versions.list_versions():
+        print(f"{'*' if path == current_path else ' '} {path}")
+    if current_path is not None and current_path not in versions.list_versions():
+        print(f"* {current_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the Companies House database versions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="Build a new database version from DATA_SOURCE and make it live.")
+    rebuild_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Apply only the changes between the live version and DATA_SOURCE, instead of a full rebuild.",
+    )
+    subparsers.add_parser("rollback", help="Make the previous database version live.")
+    subparsers.add_parser("versions", help="List database versions, marking the live one with '*'.")
+    args = parser.parse_args()
+
+    config = Settings()
+    if args.command == "rebuild":
+        rebuild(config, incremental=args.incremental)
+    elif args.command == "rollback":
+        rollback(config)
+    elif args.command == "versions":
+        list_versions(config)
+
+
+if __name__ == "__main__":
+    main()
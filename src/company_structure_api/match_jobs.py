@@ -0,0 +1,491 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+from company_structure_api.companies_api_router import match_names
+from company_structure_api.company_visualizer import CompanyVisualizer
+from company_structure_api.config import Settings
+from company_structure_api.models import CompanySearchFilters, MatchJob
+
+logger = logging.getLogger(__name__)
+
+
+def match_job_store_path(config: Settings) -> str:
+    return config.match_job_store_path or os.path.join(os.path.dirname(config.db_path), "match_jobs.sqlite")
+
+
+class MatchJobStore:
+    """
+    Durable storage for bulk-match jobs, in a local SQLite file.
+
+    Each job has a row in match_jobs, and each of its distinct names a row in
+    match_job_items, holding the name's result (as the JSON the API returns) or error once
+    it has been matched. Names still pending when the server stops are matched when it
+    restarts; names already matched are never matched again.
+
+    Every call is a blocking SQLite call, so callers on the event loop should make them
+    from a worker thread (e.g. with asyncio.to_thread). The connection is shared between
+    threads, one at a time.
+    """
+
+    JOBS_TABLE_NAME = "match_jobs"
+    ITEMS_TABLE_NAME = "match_job_items"
+
+    def __init__(self, store_path: str):
+        self.store_path = store_path
+        self.con: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def connect(self):
+        if self.con:
+            return
+
+        Path(self.store_path).parent.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Opening match job store at: {self.store_path}")
+        self.con = sqlite3.connect(self.store_path, isolation_level=None, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL;")
+        self.con.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.JOBS_TABLE_NAME} (
+                job_id TEXT PRIMARY KEY,
+                team TEXT NOT NULL,
+                status TEXT NOT NULL,
+                fields TEXT,
+                filters TEXT,
+                total INTEGER NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        self.con.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.ITEMS_TABLE_NAME} (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                query TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                PRIMARY KEY (job_id, position)
+            );
+        """)
+        # Stores created before jobs could be filtered lack the filters column
+        job_columns = {row[1] for row in self.con.execute(f"PRAGMA table_info({self.JOBS_TABLE_NAME});")}
+        if "filters" not in job_columns:
+            self.con.execute(f"ALTER TABLE {self.JOBS_TABLE_NAME} ADD COLUMN filters TEXT;")
+
+    def close(self):
+        with self._lock:
+            if self.con:
+                self.con.close()
+                self.con = None
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Holds the connection for the calling thread until the block exits."""
+        with self._lock:
+            if not self.con:
+                raise ConnectionError("Match job store is not connected.")
+            yield self.con
+
+    def create_job(
+        self,
+        team: str,
+        names: list[str],
+        fields: list[str] | None,
+        filters: CompanySearchFilters | None = None,
+    ) -> MatchJob:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connection() as con:
+            con.execute("BEGIN;")
+            try:
+                con.execute(
+                    f"INSERT INTO {self.JOBS_TABLE_NAME} "
+                    "(job_id, team, status, fields, filters, total, created_at, updated_at) "
+                    "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?);",
+                    [
+                        job_id,
+                        team,
+                        json.dumps(fields) if fields is not None else None,
+                        filters.model_dump_json() if filters is not None else None,
+                        len(names),
+                        now,
+                        now,
+                    ],
+                )
+                con.executemany(
+                    f"INSERT INTO {self.ITEMS_TABLE_NAME} (job_id, position, query, status) "
+                    "VALUES (?, ?, ?, 'pending');",
+                    [(job_id, position, name) for position, name in enumerate(names)],
+                )
+                con.execute("COMMIT;")
+            except Exception:
+                con.execute("ROLLBACK;")
+                raise
+            return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> MatchJob | None:
+        with self._connection() as con:
+            row = con.execute(
+                f"SELECT job_id, team, status, total, completed, failed, created_at, updated_at "
+                f"FROM {self.JOBS_TABLE_NAME} WHERE job_id = ?;",
+                [job_id],
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, team, status, total, completed, failed, created_at, updated_at = row
+            return MatchJob(
+                job_id=job_id,
+                team=team,
+                status=status,
+                total=total,
+                completed=completed,
+                failed=failed,
+                created_at=datetime.fromtimestamp(created_at, timezone.utc),
+                updated_at=datetime.fromtimestamp(updated_at, timezone.utc),
+            )
+
+    def get_fields(self, job_id: str) -> list[str] | None:
+        with self._connection() as con:
+            row = con.execute(
+                f"SELECT fields FROM {self.JOBS_TABLE_NAME} WHERE job_id = ?;", [job_id]
+            ).fetchone()
+            return json.loads(row[0]) if row and row[0] else None
+
+    def get_filters(self, job_id: str) -> CompanySearchFilters | None:
+        with self._connection() as con:
+            row = con.execute(
+                f"SELECT filters FROM {self.JOBS_TABLE_NAME} WHERE job_id = ?;", [job_id]
+            ).fetchone()
+            return CompanySearchFilters.model_validate_json(row[0]) if row and row[0] else None
+
+    def unfinished_jobs(self) -> list[tuple[str, str]]:
+        """Returns the (job_id, team) of every queued or running job, oldest first."""
+        with self._connection() as con:
+            return con.execute(
+                f"SELECT job_id, team FROM {self.JOBS_TABLE_NAME} "
+                "WHERE status IN ('queued', 'running') ORDER BY created_at;"
+            ).fetchall()
+
+    def pending_items(self, job_id: str, from_position: int, limit: int) -> list[tuple[int, str]]:
+        """Returns up to `limit` pending (position, query) items of a job, from `from_position` on."""
+        with self._connection() as con:
+            return con.execute(
+                f"SELECT position, query FROM {self.ITEMS_TABLE_NAME} "
+                "WHERE job_id = ? AND status = 'pending' AND position >= ? ORDER BY position LIMIT ?;",
+                [job_id, from_position, limit],
+            ).fetchall()
+
+    def record_items(self, job_id: str, results: list[tuple[int, str]], failures: list[tuple[int, str]]):
+        """
+        Stores the (position, result JSON) results and (position, error) failures of a job's
+        items. Items that are no longer pending, e.g. because a retried chunk overlapped
+        one that had already finished, are left as they are.
+        """
+        with self._connection() as con:
+            con.execute("BEGIN;")
+            try:
+                done = con.executemany(
+                    f"UPDATE {self.ITEMS_TABLE_NAME} SET status = 'done', result = ? "
+                    "WHERE job_id = ? AND position = ? AND status = 'pending';",
+                    [(result, job_id, position) for position, result in results],
+                ).rowcount
+                failed = con.executemany(
+                    f"UPDATE {self.ITEMS_TABLE_NAME} SET status = 'failed', error = ? "
+                    "WHERE job_id = ? AND position = ? AND status = 'pending';",
+                    [(error, job_id, position) for position, error in failures],
+                ).rowcount
+                con.execute(
+                    f"""
+                    UPDATE {self.JOBS_TABLE_NAME}
+                    SET completed = completed + ?, failed = failed + ?, updated_at = ?,
+                        status = CASE WHEN status = 'queued' THEN 'running' ELSE status END
+                    WHERE job_id = ?;
+                    """,
+                    [max(done, 0) + max(failed, 0), max(failed, 0), time.time(), job_id],
+                )
+                con.execute("COMMIT;")
+            except Exception:
+                con.execute("ROLLBACK;")
+                raise
+
+    def finish_job(self, job_id: str):
+        with self._connection() as con:
+            con.execute(
+                f"UPDATE {self.JOBS_TABLE_NAME} SET status = 'completed', updated_at = ? "
+                "WHERE job_id = ? AND status IN ('queued', 'running');",
+                [time.time(), job_id],
+            )
+
+    def cancel_job(self, job_id: str) -> bool:
+        """Cancels a queued or running job. Returns whether it was cancelled."""
+        with self._connection() as con:
+            cursor = con.execute(
+                f"UPDATE {self.JOBS_TABLE_NAME} SET status = 'cancelled', updated_at = ? "
+                "WHERE job_id = ? AND status IN ('queued', 'running');",
+                [time.time(), job_id],
+            )
+            return cursor.rowcount > 0
+
+    def results_page_json(self, job_id: str, offset: int, limit: int) -> str:
+        """
+        Returns a JSON array of a job's items from `offset`, in submission order. Stored
+        results are spliced in as they are, rather than parsed and serialized again.
+        """
+        with self._connection() as con:
+            rows = con.execute(
+                f"SELECT position, query, status, result, error FROM {self.ITEMS_TABLE_NAME} "
+                "WHERE job_id = ? AND position >= ? ORDER BY position LIMIT ?;",
+                [job_id, offset, limit],
+            ).fetchall()
+        items = (
+            f'{{"position":{position},"query":{json.dumps(query)},"status":"{status}",'
+            f'"result":{result or "null"},"error":{json.dumps(error)}}}'
+            for position, query, status, result, error in rows
+        )
+        return "[" + ",".join(items) + "]"
+
+    def prune(self, max_age_seconds: float):
+        """Deletes finished jobs last updated more than `max_age_seconds` ago."""
+        cutoff = time.time() - max_age_seconds
+        with self._connection() as con:
+            con.execute("BEGIN;")
+            try:
+                con.execute(
+                    f"DELETE FROM {self.ITEMS_TABLE_NAME} WHERE job_id IN ("
+                    f"SELECT job_id FROM {self.JOBS_TABLE_NAME} "
+                    "WHERE status IN ('completed', 'cancelled') AND updated_at < ?);",
+                    [cutoff],
+                )
+                deleted = con.execute(
+                    f"DELETE FROM {self.JOBS_TABLE_NAME} "
+                    "WHERE status IN ('completed', 'cancelled') AND updated_at < ?;",
+                    [cutoff],
+                ).rowcount
+                con.execute("COMMIT;")
+            except Exception:
+                con.execute("ROLLBACK;")
+                raise
+        if deleted:
+            logger.info(f"Deleted {deleted} finished match jobs.")
+
+
+class MatchJobRunner:
+    """
+    Runs bulk-match jobs in the background on a fixed number of workers.
+
+    Each worker repeatedly claims the next chunk of llm_batch_size pending names and matches
+    them with the same pipeline as /api/match-companies, storing the results as it goes.
+    Chunks are claimed round-robin across teams, and then across each team's jobs, so a
+    team submitting many large jobs can't starve the others of workers.
+
+    The store is only called from worker threads, so a busy job never blocks the event loop.
+    """
+
+    def __init__(self, store: MatchJobStore, company_visualizer: CompanyVisualizer, workers: int, chunk_size: int):
+        self.store = store
+        self.company_visualizer = company_visualizer
+        self.workers = workers
+        self.chunk_size = max(chunk_size, 1)
+        # The jobs with names left to claim, by team, in round-robin order
+        self.queues: OrderedDict[str, deque[str]] = OrderedDict()
+        self.teams: dict[str, str] = {}
+        # The position to claim each job's next chunk from
+        self.next_positions: dict[str, int] = {}
+        # Chunks to claim again before any new names, e.g. after a database swap
+        self.retry_chunks: dict[str, deque[list[tuple[int, str]]]] = {}
+        # Jobs with every name claimed, which finish once their in-flight chunks do
+        self.exhausted_jobs: set[str] = set()
+        self.in_flight_chunks: Counter[str] = Counter()
+        self.fields: dict[str, list[str] | None] = {}
+        self.filters: dict[str, CompanySearchFilters | None] = {}
+        self.work_available = asyncio.Event()
+        # Held while claiming, so two workers never read the same job's next chunk
+        self.claim_lock = asyncio.Lock()
+        self.tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        for job_id, team in await asyncio.to_thread(self.store.unfinished_jobs):
+            logger.info(f"Resuming match job {job_id}.")
+            fields = await asyncio.to_thread(self.store.get_fields, job_id)
+            filters = await asyncio.to_thread(self.store.get_filters, job_id)
+            self._enqueue(job_id, team, fields, filters)
+        self.tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stops the workers. Names they were matching stay pending, and resume on the next start."""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def submit(
+        self,
+        team: str,
+        names: list[str],
+        fields: list[str] | None,
+        filters: CompanySearchFilters | None = None,
+    ) -> MatchJob:
+        job = await asyncio.to_thread(self.store.create_job, team, names, fields, filters)
+        self._enqueue(job.job_id, team, fields, filters)
+        logger.info(f"Queued match job {job.job_id} for team '{team}' with {len(names)} names.")
+        return job
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancels a job. Chunks already being matched finish, but no more are claimed."""
+        if not await asyncio.to_thread(self.store.cancel_job, job_id):
+            return False
+        if job_id in self.teams and job_id not in self.exhausted_jobs:
+            self._dequeue(job_id)
+            self.exhausted_jobs.add(job_id)
+            await self._finish_if_done(job_id)
+        return True
+
+    def _enqueue(
+        self, job_id: str, team: str, fields: list[str] | None, filters: CompanySearchFilters | None
+    ):
+        self.queues.setdefault(team, deque()).append(job_id)
+        self.teams[job_id] = team
+        self.next_positions[job_id] = 0
+        self.fields[job_id] = fields
+        self.filters[job_id] = filters
+        self.work_available.set()
+
+    def _dequeue(self, job_id: str):
+        team = self.teams[job_id]
+        job_ids = self.queues[team]
+        job_ids.remove(job_id)
+        if not job_ids:
+            del self.queues[team]
+
+    async def _claim_chunk(self) -> tuple[str, list[tuple[int, str]]] | None:
+        """Claims the next chunk of pending names, taking turns between teams and then jobs."""
+        async with self.claim_lock:
+            while self.queues:
+                team, job_ids = next(iter(self.queues.items()))
+                self.queues.move_to_end(team)
+                job_id = job_ids[0]
+                job_ids.rotate(-1)
+                if self.retry_chunks.get(job_id):
+                    items = self.retry_chunks[job_id].popleft()
+                else:
+                    items = await asyncio.to_thread(
+                        self.store.pending_items, job_id, self.next_positions[job_id], self.chunk_size
+                    )
+                    if job_id not in self.queues.get(team, ()):
+                        # Cancelled while its names were being read
+                        continue
+                    if items:
+                        self.next_positions[job_id] = items[-1][0] + 1
+                if items:
+                    self.in_flight_chunks[job_id] += 1
+                    return job_id, items
+                # Every name has been claimed
+                self._dequeue(job_id)
+                self.exhausted_jobs.add(job_id)
+                await self._finish_if_done(job_id)
+            return None
+
+    async def _retry_chunk(self, job_id: str, items: list[tuple[int, str]]):
+        """
+        Claims a chunk's names again ahead of the job's other pending names. Only the chunk
+        is retried, so chunks claimed after it, which may still be in flight, aren't.
+        """
+        if job_id in self.exhausted_jobs:
+            job = await asyncio.to_thread(self.store.get_job, job_id)
+            if job.status in ("cancelled", "completed"):
+                return
+            if job_id in self.exhausted_jobs:
+                self.exhausted_jobs.discard(job_id)
+                self.queues.setdefault(self.teams[job_id], deque()).append(job_id)
+        self.retry_chunks.setdefault(job_id, deque()).append(items)
+        self.work_available.set()
+
+    async def _finish_if_done(self, job_id: str):
+        """Finishes a job once every name has been claimed and matched, and forgets it."""
+        if job_id not in self.exhausted_jobs or self.in_flight_chunks[job_id] > 0:
+            return
+        # Forgotten before the store is updated, so no other worker finishes it too
+        self.exhausted_jobs.discard(job_id)
+        del self.in_flight_chunks[job_id]
+        for state in (self.teams, self.next_positions, self.retry_chunks, self.fields, self.filters):
+            state.pop(job_id, None)
+        await asyncio.to_thread(self.store.finish_job, job_id)
+        logger.info(f"Match job {job_id} is no longer running.")
+
+    async def _work(self):
+        while True:
+            try:
+                await self._work_on_next_chunk()
+            except Exception:
+                # e.g. the job store couldn't be read or written. The worker carries on.
+                logger.exception("An unexpected error occurred in a match job worker. Retrying in 1 second.")
+                await asyncio.sleep(1)
+
+    async def _work_on_next_chunk(self):
+        if self.company_visualizer.db is None:
+            # The database is still being built
+            await asyncio.sleep(1)
+            return
+        # Cleared before claiming, so work queued while the claim awaits the store isn't missed
+        self.work_available.clear()
+        claimed = await self._claim_chunk()
+        if claimed is None:
+            await self.work_available.wait()
+            return
+        job_id, items = claimed
+        try:
+            await self._match_chunk(job_id, items)
+        except Exception:
+            # The chunk's names are still pending, e.g. because their results couldn't be stored
+            await self._retry_chunk(job_id, items)
+            raise
+        finally:
+            self.in_flight_chunks[job_id] -= 1
+        await self._finish_if_done(job_id)
+
+    async def _match_chunk(self, job_id: str, items: list[tuple[int, str]]):
+        names = [query for _, query in items]
+        try:
+            results = await match_names(
+                names, self.company_visualizer, self.fields.get(job_id), self.filters.get(job_id)
+            )
+        except ConnectionError as e:
+            # Most likely a database swap. The names are retried rather than failed.
+            logger.warning(f"Database connection error during match job {job_id}, retrying chunk: {e}")
+            await asyncio.sleep(1)
+            await self._retry_chunk(job_id, items)
+            return
+        except Exception as e:
+            logger.exception(f"An unexpected error occurred during match job {job_id}.")
+            await asyncio.to_thread(
+                self.store.record_items, job_id, [], [(position, str(e)) for position, _ in items]
+            )
+            return
+        await asyncio.to_thread(
+            self.store.record_items,
+            job_id,
+            [
+                (position, results[query].model_dump_json(by_alias=True, exclude_unset=True))
+                for position, query in items
+            ],
+            [],
+        )
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.requests import Request
+from starlette.responses import Response
+
+from company_structure_api.match_jobs import MatchJobRunner
+from company_structure_api.models import MatchJob, MatchJobRequest, MatchJobResultsPage
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api")
+
+
+def match_job_runner(request: Request) -> MatchJobRunner:
+    return request.app.state.match_job_runner
+
+InjectedMatchJobRunner = Annotated[MatchJobRunner, Depends(match_job_runner)]
+
+
+async def get_job_or_404(runner: MatchJobRunner, job_id: str) -> MatchJob:
+    job = await asyncio.to_thread(runner.store.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Match job {job_id} not found.")
+    return job
+
+
+@router.post(
+    "/match-jobs",
+    response_model=MatchJob,
+    status_code=202,
+    tags=["Match Jobs"]
+)
+async def submit_match_job(request: MatchJobRequest, runner: InjectedMatchJobRunner):
+    """
+    Queues a list of company names to be matched in the background, and returns the job
+    to poll for progress. Jobs survive server restarts, carrying on from the names not yet
+    matched. Jobs may be submitted while the database is still being built, and start once
+    it is ready.
+    """
+    names = list(dict.fromkeys(request.company_names))
+    return await runner.submit(request.team, names, request.company_fields(), request.filters)
+
+
+@router.get(
+    "/match-jobs/{job_id}",
+    response_model=MatchJob,
+    tags=["Match Jobs"]
+)
+async def get_match_job(job_id: str, runner: InjectedMatchJobRunner):
+    """Returns a match job's status and progress."""
+    return await get_job_or_404(runner, job_id)
+
+
+@router.get(
+    "/match-jobs/{job_id}/results",
+    response_model=MatchJobResultsPage,
+    tags=["Match Jobs"]
+)
+async def get_match_job_results(
+    job_id: str,
+    runner: InjectedMatchJobRunner,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+):
+    """
+    Returns a page of a match job's names in the order they were submitted, each with its
+    match result once it has been matched. Results can be fetched while the job is running.
+    """
+    job = await get_job_or_404(runner, job_id)
+    items = await asyncio.to_thread(runner.store.results_page_json, job_id, offset, limit)
+    # The stored results are already JSON, so the page is assembled rather than re-serialized
+    content = f'{{"job":{job.model_dump_json()},"offset":{offset},"items":{items}}}'
+    return Response(content=content, media_type="application/json")
+
+
+@router.delete(
+    "/match-jobs/{job_id}",
+    response_model=MatchJob,
+    tags=["Match Jobs"]
+)
+async def cancel_match_job(job_id: str, runner: InjectedMatchJobRunner):
+    """
+    Cancels a queued or running match job. Names already matched keep their results.
+    Cancelling a finished job has no effect.
+    """
+    if await runner.cancel(job_id):
+        logger.info(f"Cancelled match job {job_id}.")
+    return await get_job_or_404(runner, job_id)
@@ -0,0 +1,225 @@
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "company_structure"
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# The longest parameter representation written to the slow query log
+SLOW_QUERY_MAX_PARAMS_LENGTH = 1000
+
+# The stage timings of the request being handled, for its Server-Timing header
+_request_timings: ContextVar[dict[str, list[float]] | None] = ContextVar("request_timings", default=None)
+
+
+class _Histogram:
+    __slots__ = ("bucket_counts", "count", "sum")
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(DURATION_BUCKETS, value)
+        if index < len(DURATION_BUCKETS):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "stage", "started_at")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started_at)
+        return False
+
+
+class Metrics:
+    """
+    In-process instrumentation of the matching pipeline, served in the Prometheus text
+    format at /metrics.
+
+    Records a latency histogram per pipeline stage (search, LLM, serialization and so on),
+    LLM requests and token usage by model, and how many recommendations each stage of
+    recommend_best_matches decided. While a request is being handled, its own stage
+    timings are also collected for its Server-Timing header.
+
+    Everything is a no-op until enabled with `configure`, so when disabled the cost of
+    instrumenting a stage is a single attribute check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_query_seconds: float | None = None
+        self._lock = threading.Lock()
+        self._stage_durations: dict[str, _Histogram] = {}
+        self._request_durations: dict[tuple[str, str], _Histogram] = {}
+        self._counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+
+    def configure(self, enabled: bool, slow_query_seconds: float | None = None):
+        self.enabled = enabled
+        self.slow_query_seconds = slow_query_seconds
+
+    def stage(self, stage: str) -> _StageTimer | _NoopTimer:
+        """Returns a context manager that times a stage of the pipeline."""
+        if not self.enabled:
+            return _NOOP_TIMER
+        return _StageTimer(self, stage)
+
+    def observe(self, stage: str, seconds: float):
+        """Records the duration of a stage, and adds it to the current request's Server-Timing."""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._stage_durations.get(stage)
+            if histogram is None:
+                histogram = self._stage_durations[stage] = _Histogram()
+            histogram.observe(seconds)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.setdefault(stage, []).append(seconds)
+
+    def increment(self, name: str, value: float = 1, **labels: str):
+        """Adds to a counter, named without the metric prefix or _total suffix."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def record_llm_usage(self, model: str, usage: Any):
+        """Counts an LLM request and its token usage, from the completion's `usage`."""
+        if not self.enabled:
+            return
+        self.increment("llm_requests", model=model)
+        if usage is not None:
+            self.increment("llm_prompt_tokens", usage.prompt_tokens or 0, model=model)
+            self.increment("llm_completion_tokens", usage.completion_tokens or 0, model=model)
+
+    def log_if_slow_query(self, query: str, params: Any, seconds: float):
+        if self.slow_query_seconds is None or seconds < self.slow_query_seconds:
+            return
+        params_repr = repr(params)
+        if len(params_repr) > SLOW_QUERY_MAX_PARAMS_LENGTH:
+            params_repr = params_repr[:SLOW_QUERY_MAX_PARAMS_LENGTH] + "..."
+        logger.warning(f"Slow query ({seconds * 1000:.1f}ms): {' '.join(query.split())} params={params_repr}")
+
+    def start_request(self):
+        """Starts collecting the current request's stage timings. Returns a token for `finish_request`."""
+        return _request_timings.set({})
+
+    def finish_request(self, token, route: str, status_code: int, seconds: float) -> str | None:
+        """
+        Records a request's duration, and returns its Server-Timing header value, or None
+        if no stages were timed.
+        """
+        timings = _request_timings.get()
+        _request_timings.reset(token)
+        with self._lock:
+            key = (route, str(status_code))
+            histogram = self._request_durations.get(key)
+            if histogram is None:
+                histogram = self._request_durations[key] = _Histogram()
+            histogram.observe(seconds)
+        if not timings:
+            return None
+        # A stage run several times in a request, e.g. concurrent LLM calls, is reported
+        # once with its total duration and the number of runs
+        return ", ".join(
+            f'{stage};dur={sum(durations) * 1000:.1f}' + (f';desc="x{len(durations)}"' if len(durations) > 1 else "")
+            for stage, durations in timings.items()
+        )
+
+    def render(self, gauges: Iterable[tuple[str, str, dict[str, str], float]] = ()) -> str:
+        """
+        Returns every metric in the Prometheus text exposition format. `gauges` are
+        (name, help, labels, value) samples of point-in-time values, such as cache sizes,
+        collected when scraped.
+        """
+        lines: list[str] = []
+        with self._lock:
+            self._render_histograms(
+                lines, "stage_duration_seconds", "Duration of each stage of the matching pipeline.",
+                {("stage", stage): histogram for stage, histogram in self._stage_durations.items()},
+            )
+            self._render_histograms(
+                lines, "request_duration_seconds", "Duration of API requests by route and status code.",
+                {
+                    ("route", route, "status", status): histogram
+                    for (route, status), histogram in self._request_durations.items()
+                },
+            )
+            counters_by_name: dict[str, list[tuple[tuple[tuple[str, str], ...], float]]] = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                counters_by_name.setdefault(name, []).append((labels, value))
+        for name, samples in counters_by_name.items():
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+            for labels, value in samples:
+                lines.append(f"{METRIC_PREFIX}_{name}_total{_format_labels(dict(labels))} {value:g}")
+        typed_gauges: set[str] = set()
+        for name, help_text, labels, value in gauges:
+            if name not in typed_gauges:
+                typed_gauges.add(name)
+                lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            lines.append(f"{METRIC_PREFIX}_{name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histograms(lines: list[str], name: str, help_text: str, histograms: dict[tuple[str, ...], _Histogram]):
+        if not histograms:
+            return
+        metric = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        for label_items, histogram in sorted(histograms.items()):
+            labels = dict(zip(label_items[::2], label_items[1::2]))
+            cumulative = 0
+            for upper_bound, bucket_count in zip(DURATION_BUCKETS, histogram.bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{metric}_bucket{_format_labels({**labels, 'le': f'{upper_bound:g}'})} {cumulative}")
+            lines.append(f"{metric}_bucket{_format_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum:g}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# The process's metrics, configured from Settings on startup
+metrics = Metrics()
@@ -1,6 +1,14 @@
-from datetime import date
-from typing import List, Dict, Optional
-from pydantic import BaseModel, Field, ConfigDict
+import re
+from datetime import date, datetime
+from typing import List, Dict, Literal, Optional
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
+
+from company_structure_api.company_names import (
+    normalize_postcode,
+    parse_sic_code,
+    postcode_prefix_pattern,
+    sic_code_range,
+)
 
 # Define the data structure for a company using Pydantic.
 class Company(BaseModel):
@@ -77,11 +85,160 @@ PYDANTIC_TO_DUCKDB = {
 
 class CompanyMatch(Company):
     score: float = Field(description="Relevance score of the match")
+    matched_name: Optional[str] = Field(
+        default=None, description="The company's current or previous name that matched the search"
+    )
+    matched_name_changed_on: Optional[date] = Field(
+        default=None, description="When the company changed from the matched name, if it is a previous name"
+    )
+    similarity: Optional[float] = Field(
+        default=None,
+        description="The character-trigram similarity of the query and the company's name, from 0 to 1, "
+                    "if the company was found by trigram search",
+    )
+
+class CompanySuggestion(BaseModel):
+    """A company suggested while a name or number is being typed."""
+    company_name: str = Field(alias='CompanyName')
+    company_number: str = Field(alias='CompanyNumber')
+    company_status: Optional[str] = Field(alias='CompanyStatus', default=None)
+
+    model_config = ConfigDict(populate_by_name=True)
+
+# The Company fields returned by the "summary" profile, which are those the UI displays.
+COMPANY_SUMMARY_FIELDS = [
+    'company_name',
+    'company_number',
+    'regaddress_careof',
+    'regaddress_pobox',
+    'regaddress_addressline1',
+    'regaddress_addressline2',
+    'regaddress_posttown',
+    'regaddress_county',
+    'regaddress_country',
+    'regaddress_postcode',
+    'company_category',
+    'company_status',
+    'incorporation_date',
+    'dissolution_date',
+    'uri',
+]
+
+# Company fields keyed by both their name and alias, e.g. 'company_name' and 'CompanyName'.
+COMPANY_FIELD_NAMES = {
+    **{name: name for name in Company.model_fields},
+    **{field.alias: name for name, field in Company.model_fields.items()},
+}
+
+# The Company fields CompanySearchFilters.matches reads.
+COMPANY_FILTER_FIELDS = [
+    'company_status',
+    'company_category',
+    'regaddress_postcode',
+    'siccode_sictext_1',
+    'siccode_sictext_2',
+    'siccode_sictext_3',
+    'siccode_sictext_4',
+    'incorporation_date',
+]
+
+class CompanySearchFilters(BaseModel):
+    """
+    Restricts the companies a search can match. Every filter given must hold, and a filter
+    given several values matches any of them.
+    """
+    company_status: Optional[List[str]] = Field(
+        default=None,
+        min_length=1,
+        description='Company statuses, e.g. "Active", ignoring case.',
+    )
+    company_category: Optional[List[str]] = Field(
+        default=None,
+        min_length=1,
+        description='Company categories, e.g. "Private Limited Company", ignoring case.',
+    )
+    postcode_prefix: Optional[str] = Field(
+        default=None,
+        description='The registered office postcode area ("LS"), district ("LS1") or sector ("LS1 4"), ignoring case.',
+    )
+    sic_codes: Optional[List[str]] = Field(
+        default=None,
+        min_length=1,
+        description='SIC codes, or their leading digits ("62" for every code from 62000 to 62999), '
+                    'matching any of a company\'s SIC codes.',
+    )
+    incorporated_from: Optional[date] = Field(default=None, description="The earliest incorporation date, inclusive.")
+    incorporated_to: Optional[date] = Field(default=None, description="The latest incorporation date, inclusive.")
+
+    @field_validator('postcode_prefix')
+    @classmethod
+    def validate_postcode_prefix(cls, postcode_prefix: Optional[str]) -> Optional[str]:
+        if postcode_prefix is None:
+            return None
+        postcode_prefix = " ".join(postcode_prefix.upper().split())
+        if not postcode_prefix or not postcode_prefix.replace(" ", "").isalnum() or not postcode_prefix[0].isalpha():
+            raise ValueError(f"Invalid postcode prefix: {postcode_prefix!r}")
+        return postcode_prefix
+
+    @field_validator('sic_codes')
+    @classmethod
+    def validate_sic_codes(cls, sic_codes: Optional[List[str]]) -> Optional[List[str]]:
+        if sic_codes is None:
+            return None
+        invalid_codes = [code for code in sic_codes if not (code.isdigit() and 1 <= len(code) <= 5)]
+        if invalid_codes:
+            raise ValueError(f"SIC codes must be 1 to 5 digits: {', '.join(invalid_codes)}")
+        return sic_codes
+
+    @model_validator(mode='after')
+    def validate_incorporation_dates(self) -> 'CompanySearchFilters':
+        if self.incorporated_from and self.incorporated_to and self.incorporated_from > self.incorporated_to:
+            raise ValueError("incorporated_from is after incorporated_to.")
+        return self
+
+    def is_empty(self) -> bool:
+        return all(value is None for value in self.model_dump().values())
+
+    def matches(self, company: Company) -> bool:
+        """Whether a company passes the filters, mirroring how the database applies them."""
+        if self.company_status is not None and (company.company_status or "").lower() not in {
+            status.lower() for status in self.company_status
+        }:
+            return False
+        if self.company_category is not None and (company.company_category or "").lower() not in {
+            category.lower() for category in self.company_category
+        }:
+            return False
+        if self.postcode_prefix is not None and not (
+            company.regaddress_postcode
+            and re.match(postcode_prefix_pattern(self.postcode_prefix), normalize_postcode(company.regaddress_postcode))
+        ):
+            return False
+        if self.sic_codes is not None:
+            codes = [
+                code
+                for text in (company.siccode_sictext_1, company.siccode_sictext_2,
+                             company.siccode_sictext_3, company.siccode_sictext_4)
+                if (code := parse_sic_code(text)) is not None
+            ]
+            ranges = [sic_code_range(prefix) for prefix in self.sic_codes]
+            if not any(first <= code <= last for code in codes for first, last in ranges):
+                return False
+        if self.incorporated_from is not None or self.incorporated_to is not None:
+            if company.incorporation_date is None:
+                return False
+            if self.incorporated_from is not None and company.incorporation_date < self.incorporated_from:
+                return False
+            if self.incorporated_to is not None and company.incorporation_date > self.incorporated_to:
+                return False
+        return True
+
 
 class CompanyMatchRequest(BaseModel):
     """
     Defines the structure for the company matching request.
-    It expects a list of one or more company names to search for.
+    It expects a list of one or more company names to search for, and optionally
+    which company fields to return for each match.
     """
 
     company_names: List[str] = Field(
@@ -89,8 +246,58 @@ class CompanyMatchRequest(BaseModel):
         min_length=1,
         description="A non-empty list of company names to find matches for.",
     )
+    profile: Literal["full", "summary"] = Field(
+        default="full",
+        description="'full' returns every company field, 'summary' returns the name, number, address and status.",
+    )
+    fields: Optional[List[str]] = Field(
+        default=None,
+        description="Company fields to return, by name or alias, overriding the profile. "
+                    "The company name and number are always returned.",
+    )
+    filters: Optional[CompanySearchFilters] = Field(
+        default=None,
+        description="Restricts the companies matched, e.g. to active companies in a postcode area.",
+    )
+
+    @field_validator('fields')
+    @classmethod
+    def validate_fields(cls, fields: Optional[List[str]]) -> Optional[List[str]]:
+        if fields is None:
+            return None
+        unknown_fields = [field for field in fields if field not in COMPANY_FIELD_NAMES]
+        if unknown_fields:
+            raise ValueError(f"Unknown company fields: {', '.join(unknown_fields)}")
+        return [COMPANY_FIELD_NAMES[field] for field in fields]
+
+    def company_fields(self) -> Optional[List[str]]:
+        """The Company fields to select for each match, or None for all of them."""
+        if self.fields is not None:
+            return list(dict.fromkeys(['company_name', 'company_number', *self.fields]))
+        if self.profile == "summary":
+            return COMPANY_SUMMARY_FIELDS
+        return None
+
+
+class CompanyLookupRequest(BaseModel):
+    """A list of company numbers to fetch the Companies House records for."""
+    company_numbers: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=5000,
+        description="Company numbers to look up. Numeric numbers may omit their leading zeros.",
+    )
 
 
+class CompanyLookupResponse(BaseModel):
+    """The companies found, keyed by the company number as requested, and the numbers not found."""
+    companies: Dict[str, Company]
+    not_found: List[str]
+
+
+# The stage of the matching pipeline that chose a recommended match.
+MatchDecision = Literal["company_number", "exact_name", "score_margin", "cache", "reranker", "llm", "fallback"]
+
 class CompanyMatchResult(BaseModel):
     """
     Represents the result of a company match, including a recommended match
@@ -98,6 +305,10 @@ class CompanyMatchResult(BaseModel):
     """
     recommended_match: Optional[CompanyMatch] = None
     other_matches: List[CompanyMatch]
+    decided_by: Optional[MatchDecision] = Field(
+        default=None,
+        description="Which stage of the matching pipeline chose the recommended match.",
+    )
 
 
 class CompanyMatchResponse(BaseModel):
@@ -108,3 +319,114 @@ class CompanyMatchResponse(BaseModel):
     """
 
     matches: Dict[str, CompanyMatchResult]
+
+
+class CompanyMatchStreamResult(BaseModel):
+    """A streamed match result for a single search term."""
+    type: Literal["result"] = "result"
+    query: str
+    result: CompanyMatchResult
+
+
+class CompanyMatchStreamProgress(BaseModel):
+    """Streamed after each group of search terms completes."""
+    type: Literal["progress"] = "progress"
+    completed: int
+    total: int
+
+
+class CompanyMatchStreamError(BaseModel):
+    """Streamed when a search term could not be matched."""
+    type: Literal["error"] = "error"
+    query: Optional[str] = None
+    detail: str
+
+
+class MatchJobRequest(CompanyMatchRequest):
+    """A bulk-match request to run in the background, on behalf of a team."""
+    team: str = Field(
+        default="default",
+        min_length=1,
+        max_length=100,
+        description="The team submitting the job. Workers are shared fairly between teams.",
+    )
+
+
+MatchJobStatus = Literal["queued", "running", "completed", "cancelled"]
+
+class MatchJob(BaseModel):
+    """The progress of a background bulk-match job. Each distinct name is matched once."""
+    job_id: str
+    team: str
+    status: MatchJobStatus
+    total: int = Field(description="The number of distinct names to match.")
+    completed: int = Field(description="The number of names matched so far, including those that failed.")
+    failed: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class MatchJobItem(BaseModel):
+    """A name in a bulk-match job, with its result once it has been matched."""
+    position: int
+    query: str
+    status: Literal["pending", "done", "failed"]
+    result: Optional[CompanyMatchResult] = None
+    error: Optional[str] = None
+
+
+class MatchJobResultsPage(BaseModel):
+    """A page of a bulk-match job's names and results, in submission order."""
+    job: MatchJob
+    offset: int
+    items: List[MatchJobItem]
+
+
+class DatabaseStatus(BaseModel):
+    """
+    Reports whether the companies database is ready to serve, and the progress of
+    building it if not.
+    """
+    ready: bool = False
+    phase: str = Field(default="starting", description="The current stage of startup or the database build.")
+    rows_loaded: int = Field(default=0, description="Rows loaded so far when streaming the data source.")
+    started_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class GroupEntity(BaseModel):
+    """An entity in a group structure, as parsed from the workbook's Entities sheet."""
+    id: str
+    name: str = ""
+    tin: str = ""
+
+
+class GroupRelationship(BaseModel):
+    """An ownership relationship, as parsed from the workbook's Relationships sheet."""
+    parent: str = Field(description="The owning entity's id, TIN or name.")
+    child: str = Field(description="The owned entity's id, TIN or name.")
+    percentage_ownership: float = Field(alias='percentageOwnership', ge=0, le=100)
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class GroupStructureRequest(BaseModel):
+    """A group structure's entities and the ownership relationships between them."""
+    entities: List[GroupEntity] = Field(..., min_length=1)
+    relationships: List[GroupRelationship]
+
+
+class GroupEntityAnalysis(BaseModel):
+    id: str
+    depth: int = Field(description="The length of the longest ownership chain from an ultimate parent.")
+    ultimate_parents: List[str] = Field(description="The unowned entities that own this one, directly or indirectly.")
+    effective_ownership: Dict[str, float] = Field(
+        description="The percentage of this entity owned by each ultimate parent, through every chain of ownership."
+    )
+
+
+class GroupStructureAnalysis(BaseModel):
+    ultimate_parents: List[str]
+    max_depth: int
+    entities: List[GroupEntityAnalysis]
+
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Lower-cases a query and collapses runs of whitespace."""
+    return " ".join(query.lower().split())
+
+
+class RecommendationCache:
+    """
+    A persistent cache of LLM best-match recommendations, stored in a local SQLite file.
+
+    Entries are keyed on the normalized query, the ordered candidate company numbers,
+    the model name and the prompt version, so any change to the candidates, model or
+    prompt results in a miss. Entries expire after `ttl_seconds`, and the least recently
+    used entries are evicted once the cache holds more than `max_entries`.
+
+    The cache records the version of the companies database it was populated from, and
+    clears itself when opened against a different (rebuilt) database.
+
+    Callers on the event loop should use get_many and put_many from a worker thread (e.g.
+    with asyncio.to_thread), since every lookup and write is a blocking SQLite call. The
+    connection is shared between threads, one at a time.
+    """
+
+    TABLE_NAME = "recommendations"
+    META_TABLE_NAME = "cache_meta"
+
+    def __init__(self, cache_path: str, db_version: str, ttl_seconds: int, max_entries: int):
+        self.cache_path = cache_path
+        self.db_version = db_version
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.con: sqlite3.Connection | None = None
+        self._size = 0
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def connect(self):
+        if self.con:
+            return
+
+        Path(self.cache_path).parent.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Opening recommendation cache at: {self.cache_path}")
+        self.con = sqlite3.connect(self.cache_path, isolation_level=None, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL;")
+        self.con.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.TABLE_NAME} (
+                key TEXT PRIMARY KEY,
+                company_number TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            );
+        """)
+        self.con.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.TABLE_NAME}_last_accessed ON {self.TABLE_NAME} (last_accessed);"
+        )
+        self.con.execute(f"CREATE TABLE IF NOT EXISTS {self.META_TABLE_NAME} (key TEXT PRIMARY KEY, value TEXT);")
+
+        row = self.con.execute(f"SELECT value FROM {self.META_TABLE_NAME} WHERE key = 'db_version';").fetchone()
+        if row is None or row[0] != self.db_version:
+            logger.info("Companies database has changed since the recommendation cache was populated. Clearing cache.")
+            self.clear()
+            self.con.execute(
+                f"INSERT OR REPLACE INTO {self.META_TABLE_NAME} (key, value) VALUES ('db_version', ?);",
+                [self.db_version],
+            )
+
+        self.con.execute(f"DELETE FROM {self.TABLE_NAME} WHERE created_at < ?;", [time.time() - self.ttl_seconds])
+        self._size = self.con.execute(f"SELECT COUNT(*) FROM {self.TABLE_NAME};").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self.con:
+                self.con.close()
+                self.con = None
+
+    @staticmethod
+    def make_key(query: str, candidate_numbers: list[str], model_name: str, prompt_version: str) -> str:
+        payload = json.dumps([normalize_query(query), candidate_numbers, model_name, prompt_version])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Returns the cached company number for a key, or None on a miss or expired entry."""
+        if not self.con:
+            raise ConnectionError("Recommendation cache is not connected.")
+
+        with self._lock:
+            now = time.time()
+            row = self.con.execute(
+                f"SELECT company_number FROM {self.TABLE_NAME} WHERE key = ? AND created_at >= ?;",
+                [key, now - self.ttl_seconds],
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.con.execute(f"UPDATE {self.TABLE_NAME} SET last_accessed = ? WHERE key = ?;", [now, key])
+            return row[0]
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        """Returns the cached company number for each key that has one, in a single transaction."""
+        with self._lock:
+            if not self.con:
+                raise ConnectionError("Recommendation cache is not connected.")
+            with self._transaction():
+                return {key: company_number for key in keys if (company_number := self.get(key)) is not None}
+
+    def put(self, key: str, company_number: str):
+        if not self.con:
+            raise ConnectionError("Recommendation cache is not connected.")
+
+        with self._lock:
+            now = time.time()
+            cursor = self.con.execute(
+                f"""
+                INSERT INTO {self.TABLE_NAME} (key, company_number, created_at, last_accessed) VALUES (?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET company_number = excluded.company_number,
+                    created_at = excluded.created_at, last_accessed = excluded.last_accessed;
+                """,
+                [key, company_number, now, now],
+            )
+            # Upserts also report a row count of 1, so _size is an upper bound until _evict recounts.
+            self._size += cursor.rowcount
+            if self._size > self.max_entries:
+                self._evict()
+
+    def put_many(self, company_numbers: dict[str, str]):
+        """Caches the company number for each key, in a single transaction."""
+        with self._lock:
+            if not self.con:
+                raise ConnectionError("Recommendation cache is not connected.")
+            with self._transaction():
+                for key, company_number in company_numbers.items():
+                    self.put(key, company_number)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self.con.execute("BEGIN;")
+        try:
+            yield
+        except BaseException:
+            self.con.execute("ROLLBACK;")
+            raise
+        self.con.execute("COMMIT;")
+
+    def _evict(self):
+        self._size = self.con.execute(f"SELECT COUNT(*) FROM {self.TABLE_NAME};").fetchone()[0]
+        if self._size <= self.max_entries:
+            return
+
+        # Evict down to 90% of capacity so eviction doesn't run on every insert.
+        target_size = int(self.max_entries * 0.9)
+        self.con.execute(
+            f"""
+            DELETE FROM {self.TABLE_NAME} WHERE key IN (
+                SELECT key FROM {self.TABLE_NAME} ORDER BY last_accessed ASC LIMIT ?
+            );
+            """,
+            [self._size - target_size],
+        )
+        self._size = target_size
+        logger.info(f"Evicted least recently used recommendations. Cache now holds {self._size} entries.")
+
+    def clear(self):
+        if not self.con:
+            raise ConnectionError("Recommendation cache is not connected.")
+        with self._lock:
+            self.con.execute(f"DELETE FROM {self.TABLE_NAME};")
+            self._size = 0
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": self._size}
@@ -0,0 +1,211 @@
+import logging
+import re
+from functools import lru_cache
+from typing import NamedTuple, Protocol
+
+from company_structure_api.company_names import normalize_company_name_key
+from company_structure_api.models import CompanyMatch
+
+logger = logging.getLogger(__name__)
+
+# A UK postcode anywhere in a query, split into its outward and inward codes
+POSTCODE_PATTERN = re.compile(r"\b([A-Z]{1,2}[0-9][A-Z0-9]?) ?([0-9][A-Z]{2})\b")
+
+# Candidate names and towns recur across queries and requests, so their keys are memoized
+name_key = lru_cache(maxsize=100_000)(normalize_company_name_key)
+
+
+class RerankedMatch(NamedTuple):
+    company_number: str
+    # How far the chosen match's score leads the runner-up's, from 0 to 1
+    margin: float
+
+
+class Reranker(Protocol):
+    """
+    Chooses the best match for each query that the earlier stages of
+    CompanyVisualizer.recommend_best_matches couldn't decide, as an alternative to the LLM.
+    """
+
+    def rerank(self, queries: dict[str, list[CompanyMatch]]) -> dict[str, RerankedMatch]:
+        ...
+
+
+def jaro_winkler(a: str, b: str, prefix_scale: float = 0.1) -> float:
+    """Returns the Jaro-Winkler similarity of two strings, from 0 (no similarity) to 1 (equal)."""
+    if a == b:
+        return 1.0
+    len_a, len_b = len(a), len(b)
+    if not len_a or not len_b:
+        return 0.0
+    window = max(max(len_a, len_b) // 2 - 1, 0)
+    matched_b = [False] * len_b
+    matches_a = []
+    for i, char in enumerate(a):
+        end = min(i + window + 1, len_b)
+        j = b.find(char, max(i - window, 0), end)
+        while j != -1 and matched_b[j]:
+            j = b.find(char, j + 1, end)
+        if j != -1:
+            matched_b[j] = True
+            matches_a.append(char)
+    if not matches_a:
+        return 0.0
+    matches_b = [char for char, matched in zip(b, matched_b) if matched]
+    transpositions = sum(x != y for x, y in zip(matches_a, matches_b)) / 2
+    m = len(matches_a)
+    jaro = (m / len_a + m / len_b + (m - transpositions) / m) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * prefix_scale * (1 - jaro)
+
+
+class QueryHints(NamedTuple):
+    # The name part of the query, in name key form, with any postcode removed
+    name_keys: tuple[str, ...]
+    name_tokens: tuple[frozenset[str], ...]
+    # The query with spaces around it, for finding a town in
+    padded_key: str
+    postcode: tuple[str, str] | None
+
+
+def query_hints(query: str) -> QueryHints:
+    """
+    Splits a query into the forms compared against each candidate. Queries are often a
+    name followed by part of an address, e.g. "Acme Ltd, Leeds LS1 4AP", so the name is
+    compared both as a whole and as the text before the first comma.
+    """
+    upper_query = query.upper()
+    postcode_match = POSTCODE_PATTERN.search(upper_query)
+    postcode = postcode_match.groups() if postcode_match else None
+    name = POSTCODE_PATTERN.sub(" ", upper_query)
+    variants = [name]
+    if "," in name:
+        variants.append(name.split(",", 1)[0])
+    name_keys = tuple(dict.fromkeys(key for key in map(normalize_company_name_key, variants) if key))
+    return QueryHints(
+        name_keys=name_keys,
+        name_tokens=tuple(frozenset(key.split()) for key in name_keys),
+        padded_key=f" {normalize_company_name_key(upper_query)} ",
+        postcode=postcode,
+    )
+
+
+class LocalReranker:
+    """
+    Scores query/candidate pairs with string-similarity features and a fixed linear model,
+    in process, in microseconds per pair rather than an LLM round trip per batch.
+
+    The features of every pair of every query in a request are computed together, one
+    feature column at a time, and then combined with WEIGHTS into a score from 0 to 1:
+        - name_equal: the query and candidate names are equal ignoring case, punctuation
+          and the spelling of LTD/PLC/LLP.
+        - token_jaccard: the share of name words the two have in common.
+        - jaro_winkler: the Jaro-Winkler similarity of the names, which tolerates typos.
+        - postcode: the query contains the candidate's postcode (1), or its outward code (0.5).
+        - town: the query contains the candidate's post town.
+        - bm25: the candidate's full-text search score relative to the query's top score.
+    A candidate that matched on a previous name is compared on whichever of its current
+    and matched names is more similar.
+    """
+
+    WEIGHTS = {
+        "name_equal": 0.35,
+        "token_jaccard": 0.2,
+        "jaro_winkler": 0.25,
+        "postcode": 0.07,
+        "town": 0.03,
+        "bm25": 0.1,
+    }
+
+    def rerank(self, queries: dict[str, list[CompanyMatch]]) -> dict[str, RerankedMatch]:
+        pairs = [(query, match) for query, matches in queries.items() for match in matches]
+        if not pairs:
+            return {}
+        hints = {query: query_hints(query) for query in queries}
+        top_scores = {query: max((match.score for match in matches), default=0.0) for query, matches in queries.items()}
+        candidate_keys = [self._candidate_name_keys(match) for _, match in pairs]
+
+        name_equals = [
+            float(any(key in candidate for key in hints[query].name_keys))
+            for (query, _), candidate in zip(pairs, candidate_keys)
+        ]
+        features = {
+            "name_equal": name_equals,
+            "token_jaccard": [
+                max(
+                    (
+                        len(query_tokens & candidate_tokens) / len(query_tokens | candidate_tokens)
+                        for query_tokens in hints[query].name_tokens
+                        for candidate_tokens in (frozenset(key.split()) for key in candidate)
+                    ),
+                    default=0.0,
+                )
+                for (query, _), candidate in zip(pairs, candidate_keys)
+            ],
+            "jaro_winkler": [
+                1.0 if name_equal else max(
+                    (jaro_winkler(query_key, key) for query_key in hints[query].name_keys for key in candidate),
+                    default=0.0,
+                )
+                for (query, _), candidate, name_equal in zip(pairs, candidate_keys, name_equals)
+            ],
+            "postcode": [self._postcode_feature(hints[query].postcode, match) for query, match in pairs],
+            "town": [self._town_feature(hints[query].padded_key, match) for query, match in pairs],
+            "bm25": [
+                match.score / top_scores[query] if top_scores[query] > 0 else 0.0
+                for query, match in pairs
+            ],
+        }
+        scores = [0.0] * len(pairs)
+        for name, weight in self.WEIGHTS.items():
+            scores = [score + weight * value for score, value in zip(scores, features[name])]
+
+        ranked: dict[str, list[tuple[float, str]]] = {}
+        for (query, match), score in zip(pairs, scores):
+            ranked.setdefault(query, []).append((score, match.company_number))
+        results = {}
+        for query, candidates in ranked.items():
+            # Ties keep the search order, so the higher BM25 match wins
+            best_score, best_number = max(candidates, key=lambda candidate: candidate[0])
+            runner_up_score = max((score for score, number in candidates if number != best_number), default=0.0)
+            results[query] = RerankedMatch(best_number, best_score - runner_up_score)
+        logger.info(f"Reranked {len(pairs)} candidates for {len(results)} queries locally.")
+        return results
+
+    @staticmethod
+    def _candidate_name_keys(match: CompanyMatch) -> tuple[str, ...]:
+        names = [match.company_name]
+        matched_name = getattr(match, "matched_name", None)
+        if matched_name and matched_name != match.company_name:
+            names.append(matched_name)
+        return tuple(name_key(name) for name in names)
+
+    @staticmethod
+    def _postcode_feature(postcode: tuple[str, str] | None, match: CompanyMatch) -> float:
+        candidate_postcode = getattr(match, "regaddress_postcode", None)
+        if postcode is None or not candidate_postcode:
+            return 0.0
+        candidate_match = POSTCODE_PATTERN.search(candidate_postcode.upper())
+        if candidate_match is None:
+            return 0.0
+        if candidate_match.groups() == postcode:
+            return 1.0
+        return 0.5 if candidate_match.group(1) == postcode[0] else 0.0
+
+    @staticmethod
+    def _town_feature(padded_query_key: str, match: CompanyMatch) -> float:
+        town = getattr(match, "regaddress_posttown", None)
+        if not town:
+            return 0.0
+        return float(f" {name_key(town)} " in padded_query_key)
+
+
+def create_reranker(reranker: str) -> Reranker | None:
+    """Returns the reranker named in Settings.reranker, or None if the LLM decides alone."""
+    if reranker == "llm":
+        return None
+    return LocalReranker()
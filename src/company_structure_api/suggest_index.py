@@ -0,0 +1,129 @@
+import bisect
+import logging
+import os
+from pathlib import Path
+
+import pyarrow
+import pyarrow.ipc
+
+from company_structure_api.company_names import company_name_key_prefixes, normalize_company_number
+from company_structure_api.models import CompanySuggestion
+
+logger = logging.getLogger(__name__)
+
+
+def suggest_index_path(db_path: str | Path) -> Path:
+    """Returns the path of the suggest index built for a database file."""
+    return Path(f"{db_path}.suggest.arrow")
+
+
+class CompanySuggestIndex:
+    """
+    A prefix index over normalized company names and company numbers, for search-as-you-type.
+
+    The index is an Arrow IPC file written next to the database version it was built from,
+    holding every company's name key, number, name and status sorted by name key, and the
+    row positions sorted by company number. It is memory-mapped rather than read, so it
+    opens instantly and the operating system shares its pages between server processes.
+    A prefix is found by binary search, so a lookup takes a few microseconds however
+    large the register is.
+    """
+
+    SCHEMA = pyarrow.schema([
+        ("name_key", pyarrow.string()),
+        ("company_number", pyarrow.string()),
+        ("company_name", pyarrow.string()),
+        ("company_status", pyarrow.string()),
+        ("number_order", pyarrow.int32()),
+    ])
+
+    def __init__(self, table: pyarrow.Table):
+        # Plain arrays, so positions can be indexed directly. A file written by `write` has
+        # a single chunk, which is used as is to keep it memory-mapped rather than copied.
+        columns = {
+            name: column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+            for name, column in zip(table.column_names, table.columns)
+        }
+        self.name_keys = columns["name_key"]
+        self.company_numbers = columns["company_number"]
+        self.company_names = columns["company_name"]
+        self.company_statuses = columns["company_status"]
+        self.number_order = columns["number_order"]
+
+    def __len__(self) -> int:
+        return len(self.name_keys)
+
+    @classmethod
+    def open(cls, path: Path) -> "CompanySuggestIndex":
+        table = pyarrow.ipc.open_file(pyarrow.memory_map(str(path))).read_all()
+        logger.info(f"Opened suggest index '{path}' with {table.num_rows} companies.")
+        return cls(table)
+
+    @classmethod
+    def write(cls, table: pyarrow.Table, path: Path):
+        """
+        Writes an index table, as returned by CompaniesHouseDB.suggest_index_table, to
+        `path`. The file is written alongside and renamed into place.
+        """
+        temp_path = path.with_name(path.name + ".tmp")
+        with pyarrow.ipc.new_file(str(temp_path), cls.SCHEMA) as writer:
+            writer.write_table(table.cast(cls.SCHEMA).combine_chunks())
+        os.replace(temp_path, path)
+        logger.info(f"Wrote suggest index '{path}' with {table.num_rows} companies.")
+
+    def suggest(self, query: str, limit: int = 10) -> list[CompanySuggestion]:
+        """
+        Returns up to `limit` companies whose company number or normalized name starts
+        with the query. Company number matches come first, then name matches in
+        alphabetical order, which puts an exact name match ahead of longer names. A
+        partly typed suffix matches the suffix's folded form, e.g. "Acme Limi" matches
+        "Acme Limited".
+        """
+        positions: list[int] = []
+
+        number_prefix = "".join(query.split()).upper()
+        if number_prefix.isalnum() and any(c.isdigit() for c in number_prefix):
+            # A purely numeric query may be a number without its leading zeros
+            company_number = normalize_company_number(query)
+            if company_number and company_number != number_prefix:
+                positions.extend(self._number_prefix_positions(company_number, 1))
+            positions.extend(self._number_prefix_positions(number_prefix, limit))
+
+        # Positions are in name key order, so the merged matches of every prefix stay alphabetical
+        name_positions = set()
+        for name_prefix in company_name_key_prefixes(query):
+            name_positions.update(self._name_prefix_positions(name_prefix, limit))
+        positions.extend(sorted(name_positions)[:limit])
+
+        suggestions = []
+        for position in dict.fromkeys(positions):
+            suggestions.append(CompanySuggestion(
+                company_number=self.company_numbers[position].as_py(),
+                company_name=self.company_names[position].as_py(),
+                company_status=self.company_statuses[position].as_py(),
+            ))
+            if len(suggestions) == limit:
+                break
+        return suggestions
+
+    def _name_prefix_positions(self, prefix: str, limit: int) -> list[int]:
+        positions = []
+        position = bisect.bisect_left(self.name_keys, prefix, key=lambda key: key.as_py())
+        while position < len(self.name_keys) and len(positions) < limit:
+            if not self.name_keys[position].as_py().startswith(prefix):
+                break
+            positions.append(position)
+            position += 1
+        return positions
+
+    def _number_prefix_positions(self, prefix: str, limit: int) -> list[int]:
+        positions = []
+        start = bisect.bisect_left(
+            self.number_order, prefix, key=lambda position: self.company_numbers[position.as_py()].as_py()
+        )
+        for order in range(start, min(start + limit, len(self.number_order))):
+            position = self.number_order[order].as_py()
+            if not self.company_numbers[position].as_py().startswith(prefix):
+                break
+            positions.append(position)
+        return positions
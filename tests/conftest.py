@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic_register import SyntheticRegister
+from company_structure_api.config import Settings
+from company_structure_api.db import CompaniesHouseDB
+
+# Large enough that common words make up a small share of each name's postings, small
+# enough to build in a few seconds
+REGISTER_ROWS = 3000
+REGISTER_SEED = 1
+
+
+def build_database(source_path: Path, db_path: Path, **settings) -> Path:
+    """Builds a database from a register file, as a full build does."""
+    config = source_settings(source_path, db_path, **settings)
+    with CompaniesHouseDB(db_path=str(db_path)) as db:
+        db.create_database_from_source(config)
+        db.validate()
+    return db_path
+
+
+def source_settings(source_path: Path, db_path: Path, **settings) -> Settings:
+    return Settings(
+        data_source=str(source_path),
+        db_path=str(db_path),
+        data_dir=str(db_path.parent / "data"),
+        parquet_cache_enabled=False,
+        **settings,
+    )
+
+
+@pytest.fixture(scope="session")
+def register() -> SyntheticRegister:
+    return SyntheticRegister(REGISTER_ROWS, REGISTER_SEED)
+
+
+@pytest.fixture(scope="session")
+def register_csv(register, tmp_path_factory) -> Path:
+    path = tmp_path_factory.mktemp("register") / "register.csv"
+    register.write(path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def database_path(register_csv, tmp_path_factory) -> Path:
+    return build_database(register_csv, tmp_path_factory.mktemp("db") / "companies.duckdb")
+
+
+@pytest.fixture(scope="session")
+def db(database_path) -> CompaniesHouseDB:
+    with CompaniesHouseDB(db_path=str(database_path), read_only=True, pool_size=2) as db:
+        yield db
+
+
+@pytest.fixture(scope="session")
+def queries(register) -> list[str]:
+    return register.queries(40, seed=2)
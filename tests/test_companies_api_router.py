@@ -0,0 +1,68 @@
+import json
+
+from company_structure_api.companies_api_router import build_match_result, format_stream_event
+from company_structure_api.company_visualizer import Recommendation
+from company_structure_api.models import (
+    CompanyMatch,
+    CompanyMatchStreamError,
+    CompanyMatchStreamProgress,
+    CompanyMatchStreamResult,
+)
+
+
+def company_match(company_number: str, score: float) -> CompanyMatch:
+    # As the search builds matches, with only the selected fields set
+    return CompanyMatch.model_construct(
+        company_name=f"COMPANY {company_number} LTD", company_number=company_number, score=score
+    )
+
+
+def test_build_match_result_splits_recommended_match():
+    matches = [company_match("00000001", 2.0), company_match("00000002", 1.0)]
+    result = build_match_result(matches, Recommendation("00000002", "llm"))
+    assert result.recommended_match.company_number == "00000002"
+    assert [match.company_number for match in result.other_matches] == ["00000001"]
+    assert result.decided_by == "llm"
+
+
+def test_build_match_result_falls_back_to_top_match():
+    matches = [company_match("00000001", 2.0), company_match("00000002", 1.0)]
+    result = build_match_result(matches, Recommendation("99999999", "llm"))
+    assert result.recommended_match.company_number == "00000001"
+    assert result.decided_by == "fallback"
+
+
+def test_stream_events_carry_their_type():
+    events = [
+        CompanyMatchStreamResult(
+            query="company 1",
+            result=build_match_result([company_match("00000001", 2.0)], Recommendation("00000001", "score_margin")),
+        ),
+        CompanyMatchStreamProgress(completed=1, total=2),
+        CompanyMatchStreamError(query="company 2", detail="failed"),
+    ]
+    lines = [json.loads(format_stream_event(event, "ndjson")) for event in events]
+    assert [line["type"] for line in lines] == ["result", "progress", "error"]
+
+    sse = format_stream_event(events[1], "sse")
+    assert sse.startswith("event: progress\ndata: ")
+    assert json.loads(sse.split("data: ", 1)[1])["type"] == "progress"
+
+
+def test_stream_results_only_carry_selected_fields():
+    event = CompanyMatchStreamResult(
+        query="company 1",
+        result=build_match_result([company_match("00000001", 2.0)], Recommendation("00000001", "exact_name")),
+    )
+    payload = json.loads(format_stream_event(event, "ndjson"))
+    assert payload["query"] == "company 1"
+    assert payload["result"]["decided_by"] == "exact_name"
+    assert payload["result"]["recommended_match"] == {
+        "CompanyName": "COMPANY 00000001 LTD", "CompanyNumber": "00000001", "score": 2.0,
+    }
+
+
+def test_no_match_results_report_null_decided_by():
+    event = CompanyMatchStreamResult(query="nothing", result=build_match_result([], None))
+    payload = json.loads(format_stream_event(event, "ndjson"))
+    assert payload["result"] == {"recommended_match": None, "other_matches": [], "decided_by": None}
@@ -0,0 +1,124 @@
+import re
+from collections import Counter
+
+import duckdb
+import pytest
+
+from company_structure_api.company_names import (
+    company_name_key_prefixes,
+    company_name_key_sql,
+    normalize_company_name_key,
+    normalize_company_number,
+    normalize_exact_company_name,
+    normalize_postcode,
+    parse_sic_code,
+    postcode_prefix_pattern,
+    postcode_sql,
+    sic_code_range,
+    sic_code_sql,
+)
+
+NAMES = [
+    ("Acme Holdings Ltd.", "ACME HOLDINGS LTD"),
+    ("ACME HOLDINGS LIMITED", "ACME HOLDINGS LTD"),
+    ("acme  holdings l.t.d.", "ACME HOLDINGS LTD"),
+    ("Smith & Sons Limited", "SMITH AND SONS LTD"),
+    ("Café Nero Public Limited Company", "CAFE NERO PLC"),
+    ("Brown's Partners Limited Liability Partnership", "BROWNS PARTNERS LLP"),
+    ("Cwmni Cymraeg Cyfyngedig", "CWMNI CYMRAEG LTD"),
+    ("LIMITED EDITIONS HOLDINGS", "LIMITED EDITIONS HOLDINGS"),
+    ("Limited", "LTD"),
+    ("  --  ", ""),
+]
+
+
+@pytest.mark.parametrize("name, key", NAMES)
+def test_name_keys_fold_case_punctuation_and_suffixes(name, key):
+    assert normalize_company_name_key(name) == key
+
+
+@pytest.mark.parametrize("name, key", NAMES)
+def test_name_key_sql_matches_python(name, key):
+    assert duckdb.execute(f"SELECT {company_name_key_sql('$name')};", {"name": name}).fetchone()[0] == key
+
+
+@pytest.mark.parametrize("prefix, keys", [
+    ("Crown Apex Properties Limi", ["CROWN APEX PROPERTIES LIMI", "CROWN APEX PROPERTIES LLP", "CROWN APEX PROPERTIES LTD"]),
+    ("Acme Public Lim", ["ACME PUBLIC LIM", "ACME PLC", "ACME PUBLIC LLP", "ACME PUBLIC LTD"]),
+    ("Acme Ltd", ["ACME LTD"]),
+    ("Acme Hold", ["ACME HOLD"]),
+    (" - ", []),
+])
+def test_name_key_prefixes_include_partly_typed_suffixes(prefix, keys):
+    assert company_name_key_prefixes(prefix) == keys
+
+
+def test_exact_company_names_are_upper_case_and_single_spaced():
+    assert normalize_exact_company_name("  acme   holdings\tltd ") == "ACME HOLDINGS LTD"
+
+
+@pytest.mark.parametrize("query, company_number", [
+    ("1234", "00001234"),
+    ("01234567", "01234567"),
+    ("sc 123456", "SC123456"),
+    ("SC12345", None),
+    ("123456789", None),
+    ("Acme Ltd", None),
+])
+def test_company_numbers_are_normalized(query, company_number):
+    assert normalize_company_number(query) == company_number
+
+
+@pytest.mark.parametrize("postcode", ["ls1 4ap", "LS14AP", "EC1A 1BB", "m1 1ae", "B1"])
+def test_postcode_sql_matches_python(postcode):
+    assert duckdb.execute(f"SELECT {postcode_sql('$postcode')};", {"postcode": postcode}).fetchone()[0] == (
+        normalize_postcode(postcode)
+    )
+
+
+@pytest.mark.parametrize("prefix, postcode, matches", [
+    ("LS", "LS1 4AP", True),
+    ("L", "LS1 4AP", False),
+    ("L", "L1 8JQ", True),
+    ("LS1", "LS1 4AP", True),
+    ("LS1", "LS14 6AB", False),
+    ("LS1 4", "LS1 4AP", True),
+    ("LS1 4", "LS1 5AP", False),
+])
+def test_postcode_prefixes_match_whole_areas_and_districts(prefix, postcode, matches):
+    assert bool(re.match(postcode_prefix_pattern(prefix), postcode)) == matches
+
+
+def test_sic_codes_are_parsed_and_ranged():
+    assert parse_sic_code("62012 - Business and domestic software development") == 62012
+    assert parse_sic_code("None Supplied") is None
+    assert duckdb.execute(f"SELECT {sic_code_sql('$text')};", {"text": "62012 - Software"}).fetchone()[0] == 62012
+    assert sic_code_range("62") == (62000, 62999)
+    assert sic_code_range("62012") == (62012, 62012)
+
+
+def test_exact_matches_ignore_case_and_suffix_spelling(db, register):
+    companies = [register.company(index) for index in range(register.rows)]
+    key_counts = Counter(normalize_company_name_key(company.company_name) for company in companies)
+    company = next(
+        company for company in companies
+        if company.company_name.endswith(" LIMITED") and key_counts[normalize_company_name_key(company.company_name)] == 1
+    )
+    query = company.company_name.removesuffix(" LIMITED").title() + " Ltd."
+    number_query = company.company_number.lstrip("0") if company.company_number.isdigit() else company.company_number
+
+    matches = db.find_exact_matches([query, number_query, "No Such Company Ltd"])
+
+    decided_by, matched = matches[query]
+    assert (decided_by, matched.company_number) == ("exact_name", company.company_number)
+    decided_by, matched = matches[number_query]
+    assert (decided_by, matched.company_number) == ("company_number", company.company_number)
+    assert "No Such Company Ltd" not in matches
+
+
+def test_names_shared_by_several_companies_are_not_exact_matches(db, register):
+    names = [register.company(index).company_name for index in range(register.rows)]
+    shared_name = next(name for name in names if names.count(name) > 1)
+    # Every company with the name is spelt as queried, so none of them is preferred
+    query = shared_name.lower()
+    assert query not in db.find_exact_matches([query])
@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from company_structure_api.company_visualizer import EXACT_MATCH_SCORE, CompanyVisualizer
+from company_structure_api.config import Settings
+from company_structure_api.models import COMPANY_FILTER_FIELDS, Company, CompanyMatch, CompanySearchFilters
+
+
+class FakeDB:
+    """Stands in for CompaniesHouseDB, returning the given exact matches."""
+
+    def __init__(self, exact_matches: dict[str, tuple[str, Company]]):
+        self.exact_matches = exact_matches
+        self.requested_fields = []
+
+    async def run(self, function, *args, **kwargs):
+        return function(*args, **kwargs)
+
+    def find_exact_matches(self, queries: list[str], fields: list[str] | None = None):
+        self.requested_fields.append(fields)
+        return {query: match for query, match in self.exact_matches.items() if query in queries}
+
+
+class DrainingDB:
+    """Stands in for a CompaniesHouseDB version whose in-flight queries finish when `drained` is set."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.drained = asyncio.Event()
+        self.closed = False
+
+    def version(self) -> str:
+        return self.db_path
+
+    async def close_when_idle(self):
+        await self.drained.wait()
+        self.closed = True
+
+
+class FailingCompletions:
+    """Stands in for the OpenAI chat completions API when the LLM is unavailable."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise RuntimeError("The LLM is unavailable.")
+
+
+def company_match(company_number: str, score: float) -> CompanyMatch:
+    return CompanyMatch.model_construct(
+        company_name=f"COMPANY {company_number} LTD", company_number=company_number, score=score
+    )
+
+
+def company_visualizer(db: FakeDB | None = None, **settings) -> CompanyVisualizer:
+    config = Settings(openai_api_key="test", recommendation_cache_enabled=False, **settings)
+    visualizer = CompanyVisualizer(config, None)
+    visualizer.db = db
+    return visualizer
+
+
+@pytest.mark.asyncio
+async def test_exact_match_is_added_with_the_searched_fields():
+    exact_company = Company.model_construct(
+        company_name="EXACT HOLDINGS LIMITED", company_number="00000009", company_status="Active"
+    )
+    db = FakeDB({"exact holdings ltd": ("exact_name", exact_company)})
+    visualizer = company_visualizer(db)
+    queries = {"exact holdings ltd": [company_match("00000001", 3.0)]}
+    fields = ["company_name", "company_number", "company_status"]
+
+    results = await visualizer.recommend_best_matches(queries, fields=fields)
+
+    assert results["exact holdings ltd"].company_number == "00000009"
+    assert results["exact holdings ltd"].decided_by == "exact_name"
+    added = queries["exact holdings ltd"][0]
+    assert added.company_number == "00000009"
+    assert added.score == max(EXACT_MATCH_SCORE, 3.0)
+    assert added.model_fields_set == {*fields, "score"}
+    assert db.requested_fields == [fields]
+
+
+@pytest.mark.asyncio
+async def test_exact_matches_are_fetched_with_the_filtered_fields():
+    exact_company = Company.model_construct(
+        company_name="EXACT HOLDINGS LIMITED", company_number="00000009", company_status="Dissolved"
+    )
+    db = FakeDB({"exact holdings ltd": ("exact_name", exact_company)})
+    visualizer = company_visualizer(db)
+    queries = {"exact holdings ltd": [company_match("00000001", 3.0)]}
+    fields = ["company_name", "company_number"]
+
+    results = await visualizer.recommend_best_matches(
+        queries, CompanySearchFilters(company_status=["Active"]), fields
+    )
+
+    # The exact match fails the filters, so the search's only match is used
+    assert results["exact holdings ltd"].decided_by == "score_margin"
+    assert db.requested_fields == [[*fields, *COMPANY_FILTER_FIELDS]]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("llm_batch_size", [1, 2])
+async def test_failed_llm_requests_fall_back_to_the_top_match(llm_batch_size: int):
+    exact_company = Company.model_construct(company_name="EXACT LIMITED", company_number="00000009")
+    visualizer = company_visualizer(
+        FakeDB({"exact ltd": ("exact_name", exact_company)}),
+        llm_batch_size=llm_batch_size,
+        llm_bypass_score_margin=None,
+    )
+    completions = FailingCompletions()
+    visualizer.openai_client.chat.completions = completions
+    queries = {
+        "exact ltd": [company_match("00000001", 3.0), company_match("00000002", 2.0)],
+        **{f"name {i}": [company_match(f"1000000{i}", 3.0), company_match(f"2000000{i}", 2.0)] for i in range(3)},
+    }
+
+    results = await visualizer.recommend_best_matches(queries)
+
+    assert completions.calls == (3 if llm_batch_size == 1 else 2)
+    assert results["exact ltd"].decided_by == "exact_name"
+    for i in range(3):
+        assert results[f"name {i}"].company_number == f"1000000{i}"
+        assert results[f"name {i}"].decided_by == "fallback"
+
+
+@pytest.mark.asyncio
+async def test_swapped_out_databases_drain_without_holding_the_versions_lock():
+    old_db, new_db = DrainingDB("old.duckdb"), DrainingDB("new.duckdb")
+    visualizer = company_visualizer(old_db)
+
+    async with visualizer.database_versions_lock:
+        await asyncio.wait_for(visualizer.swap_database(new_db), timeout=1)
+    assert visualizer.db is new_db
+    assert not old_db.closed
+
+    old_db.drained.set()
+    await asyncio.gather(*visualizer.retiring_databases)
+    assert old_db.closed
+    assert not visualizer.retiring_databases
@@ -0,0 +1,89 @@
+import os
+import shutil
+import threading
+
+import pytest
+
+from company_structure_api.config import Settings
+from company_structure_api.db import build_database_version, import_database_artifact
+from company_structure_api.db_versions import DatabaseVersions
+from tests.conftest import source_settings
+
+
+def test_new_version_paths_are_unique_and_ordered(tmp_path):
+    versions = DatabaseVersions(str(tmp_path / "companies.duckdb"))
+    paths = []
+    for _ in range(50):
+        path = versions.new_version_path()
+        path.touch()
+        paths.append(path)
+
+    assert len(set(paths)) == len(paths)
+    assert versions.list_versions() == paths
+
+
+def test_versions_sort_after_older_second_resolution_names(tmp_path):
+    versions = DatabaseVersions(str(tmp_path / "companies.duckdb"))
+    old_path = tmp_path / "companies-20260201T030000.duckdb"
+    old_path.touch()
+    versions.set_current(old_path)
+    new_path = versions.new_version_path()
+    new_path.touch()
+
+    assert versions.list_versions() == [old_path, new_path]
+    versions.set_current(new_path)
+    assert versions.previous_version() == old_path
+
+
+def test_new_version_path_is_never_the_live_version(tmp_path):
+    versions = DatabaseVersions(str(tmp_path / "companies.duckdb"))
+    live_path = versions.new_version_path()
+    live_path.write_bytes(b"live")
+    versions.set_current(live_path)
+
+    for _ in range(10):
+        assert versions.new_version_path() != live_path
+
+
+def test_import_refuses_to_overwrite_the_live_version(tmp_path, monkeypatch):
+    config = Settings(db_path=str(tmp_path / "companies.duckdb"))
+    versions = DatabaseVersions(config.db_path)
+    live_path = versions.new_version_path()
+    live_path.write_bytes(b"live")
+    versions.set_current(live_path)
+    artifact_path = tmp_path / "artifact.duckdb"
+    artifact_path.write_bytes(b"artifact")
+    monkeypatch.setattr(versions, "new_version_path", lambda: live_path)
+
+    with pytest.raises(ValueError, match="live version"):
+        import_database_artifact(config, versions, artifact_path)
+    assert live_path.read_bytes() == b"live"
+    assert versions.current_path() == live_path
+
+
+def test_imported_artifacts_are_copied(database_path, tmp_path):
+    config = Settings(db_path=str(tmp_path / "companies.duckdb"))
+    versions = DatabaseVersions(config.db_path)
+    artifact_path = tmp_path / "artifact.duckdb"
+    shutil.copyfile(database_path, artifact_path)
+
+    live_path = import_database_artifact(config, versions, artifact_path)
+
+    assert versions.current_path() == live_path
+    assert os.stat(live_path).st_ino != os.stat(artifact_path).st_ino
+    # Overwriting the artifact leaves the live version as it was
+    artifact_path.write_bytes(b"rebuilt")
+    assert live_path.read_bytes() == database_path.read_bytes()
+
+
+def test_cancelled_builds_are_deleted(register_csv, tmp_path):
+    config = source_settings(register_csv, tmp_path / "companies.duckdb")
+    versions = DatabaseVersions(config.db_path)
+    cancelled = threading.Event()
+    cancelled.set()
+
+    with pytest.raises(InterruptedError):
+        build_database_version(config, versions, cancelled=cancelled)
+
+    assert versions.current_path() is None
+    assert versions.list_versions() == []
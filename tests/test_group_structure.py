@@ -0,0 +1,70 @@
+import pytest
+
+from company_structure_api.group_structure import GroupStructureError, analyse_group_structure
+from company_structure_api.models import GroupEntity, GroupRelationship
+
+
+def entities(*ids: str) -> list[GroupEntity]:
+    return [GroupEntity(id=entity_id, name=f"{entity_id} Ltd", tin=f"TIN-{entity_id}") for entity_id in ids]
+
+
+def owns(parent: str, child: str, percentage: float) -> GroupRelationship:
+    return GroupRelationship(parent=parent, child=child, percentage_ownership=percentage)
+
+
+def by_id(analysis) -> dict:
+    return {entity.id: entity for entity in analysis.entities}
+
+
+def test_effective_ownership_sums_every_chain():
+    analysis = analyse_group_structure(
+        entities("A", "B", "C"),
+        [owns("A", "B", 60), owns("B", "C", 50), owns("A", "C", 20)],
+    )
+    results = by_id(analysis)
+    assert analysis.ultimate_parents == ["A"]
+    assert results["B"].effective_ownership == pytest.approx({"A": 60})
+    # 60% of 50% through B, plus 20% directly
+    assert results["C"].effective_ownership == pytest.approx({"A": 50})
+    assert results["A"].effective_ownership == {}
+
+
+def test_depth_is_the_longest_chain_and_parents_are_tracked_separately():
+    analysis = analyse_group_structure(
+        entities("A", "B", "C", "D", "E"),
+        [owns("A", "B", 100), owns("B", "C", 100), owns("A", "C", 0), owns("E", "C", 50), owns("C", "D", 40)],
+    )
+    results = by_id(analysis)
+    assert analysis.max_depth == 3
+    assert [results[entity_id].depth for entity_id in "ABCDE"] == [0, 1, 2, 3, 0]
+    assert sorted(analysis.ultimate_parents) == ["A", "E"]
+    assert sorted(results["D"].ultimate_parents) == ["A", "E"]
+    assert results["D"].effective_ownership == pytest.approx({"A": 40, "E": 20})
+
+
+def test_relationships_resolve_names_and_tins_and_duplicates_are_combined():
+    analysis = analyse_group_structure(
+        entities("A", "B"),
+        [owns("A Ltd", "TIN-B", 30), owns("A", "B", 25)],
+    )
+    assert by_id(analysis)["B"].effective_ownership == pytest.approx({"A": 55})
+
+
+def test_ownership_loops_are_reported():
+    with pytest.raises(GroupStructureError) as error:
+        analyse_group_structure(
+            entities("A", "B", "C", "D"),
+            [owns("A", "B", 50), owns("B", "C", 50), owns("C", "D", 50), owns("D", "B", 10)],
+        )
+    cycle = error.value.cycle
+    assert cycle[0] == cycle[-1]
+    assert sorted(cycle[:-1]) == ["B", "C", "D"]
+
+
+@pytest.mark.parametrize("relationship, message", [
+    (owns("A", "A", 10), "cannot own itself"),
+    (owns("A", "Z", 10), "Entity not found: Z"),
+])
+def test_invalid_relationships_are_rejected(relationship, message):
+    with pytest.raises(GroupStructureError, match=message):
+        analyse_group_structure(entities("A", "B"), [relationship])
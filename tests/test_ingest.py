@@ -0,0 +1,187 @@
+import csv
+import shutil
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic_register import SyntheticRegister
+from company_structure_api.db import CompaniesHouseDB
+from company_structure_api.models import CompanySearchFilters, DatabaseStatus
+from tests.conftest import REGISTER_SEED, build_database, source_settings
+from tests.test_search import assert_same_ranking
+
+
+def load_table(source_path: Path, db_path: Path, **settings) -> list[tuple]:
+    config = source_settings(source_path, db_path, **settings)
+    with CompaniesHouseDB(db_path=str(db_path)) as db:
+        db._load_source(config, db.COMPANIES_TABLE_NAME)
+        return db.cursor().execute(f"SELECT * FROM {db.COMPANIES_TABLE_NAME} ORDER BY company_number;").fetchall()
+
+
+def test_zip_streaming_loads_the_same_rows_as_csv(register, register_csv, tmp_path):
+    zip_path = tmp_path / "register.zip"
+    register.write(zip_path)
+    status = DatabaseStatus()
+    config = source_settings(zip_path, tmp_path / "zip.duckdb", ingest_block_size_bytes=64 * 1024)
+
+    with CompaniesHouseDB(db_path=config.db_path, status=status) as db:
+        db._load_source(config, db.COMPANIES_TABLE_NAME)
+        zip_rows = db.cursor().execute(f"SELECT * FROM {db.COMPANIES_TABLE_NAME} ORDER BY company_number;").fetchall()
+
+    assert zip_rows == load_table(register_csv, tmp_path / "csv.duckdb")
+    assert status.rows_loaded == register.rows
+    # Nothing is extracted to disk
+    assert not (tmp_path / "data").exists() or not any((tmp_path / "data").iterdir())
+
+
+def test_csv_loads_report_the_rows_loaded(register, register_csv, tmp_path):
+    status = DatabaseStatus()
+    config = source_settings(register_csv, tmp_path / "csv.duckdb")
+
+    with CompaniesHouseDB(db_path=config.db_path, status=status) as db:
+        db._load_source(config, db.COMPANIES_TABLE_NAME)
+
+    assert status.rows_loaded == register.rows
+
+
+def write_next_snapshot(register: SyntheticRegister, path: Path):
+    """
+    Writes a snapshot that renames, changes, removes and adds companies relative to the
+    register, with names drawn from the same vocabulary.
+    """
+    renames = SyntheticRegister(register.rows, REGISTER_SEED + 1)
+    added = SyntheticRegister(register.rows + 150, REGISTER_SEED)
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=register.COLUMNS, lineterminator="\n")
+        writer.writeheader()
+        for index in range(register.rows):
+            if index % 37 == 0:
+                continue
+            row = dict(register.company(index).row)
+            if index % 23 == 0:
+                row["CompanyName"] = renames.company(index).company_name
+            elif index % 29 == 0:
+                row["CompanyStatus"] = "Active" if row["CompanyStatus"] == "Dissolved" else "Dissolved"
+            writer.writerow(row)
+        for index in range(register.rows, added.rows):
+            writer.writerow(added.company(index).row)
+
+
+@pytest.fixture(scope="module")
+def snapshot_databases(register, database_path, tmp_path_factory) -> tuple[Path, Path, Path]:
+    """The next snapshot, applied incrementally to the register's database and built in full."""
+    directory = tmp_path_factory.mktemp("snapshot")
+    snapshot_path = directory / "snapshot.csv"
+    write_next_snapshot(register, snapshot_path)
+
+    incremental_path = directory / "incremental.duckdb"
+    shutil.copyfile(database_path, incremental_path)
+    # Update the FTS index in place, however many names changed
+    config = source_settings(snapshot_path, incremental_path, incremental_fts_max_fraction=1.0)
+    with CompaniesHouseDB(db_path=str(incremental_path)) as db:
+        db.apply_snapshot_from_source(config)
+        db.validate()
+
+    full_path = build_database(snapshot_path, directory / "full.duckdb")
+    return snapshot_path, incremental_path, full_path
+
+
+def fts_statistics(db: CompaniesHouseDB) -> dict:
+    cursor = db.cursor()
+    schema = db.FTS_SCHEMA_NAME
+    return {
+        "stats": cursor.execute(f"SELECT num_docs, round(avgdl, 9) FROM {schema}.stats;").fetchall(),
+        "df": dict(cursor.execute(f"SELECT term, df FROM {schema}.dict WHERE df > 0;").fetchall()),
+        "term_bounds": dict(cursor.execute(f"""
+            SELECT dict.term, (bounds.max_tf, bounds.min_len)
+            FROM {schema}.{db.TERM_BOUNDS_TABLE_NAME} AS bounds
+            JOIN {schema}.dict AS dict ON dict.termid = bounds.termid;
+        """).fetchall()),
+    }
+
+
+def search_filter_rows(db: CompaniesHouseDB) -> list[tuple]:
+    """Returns each company's search filters, with the names its docids refer to in place of the docids."""
+    return db.cursor().execute(f"""
+        SELECT
+            filters.* EXCLUDE (docid, trigram_doc_id, company_status, company_category),
+            filters.company_status::VARCHAR, filters.company_category::VARCHAR,
+            docs.name, trigram_docs.company_number
+        FROM {db.SEARCH_FILTERS_TABLE_NAME} AS filters
+        LEFT JOIN {db.FTS_SCHEMA_NAME}.docs AS docs ON docs.docid = filters.docid
+        LEFT JOIN {db.TRIGRAM_DOCS_TABLE_NAME} AS trigram_docs ON trigram_docs.doc_id = filters.trigram_doc_id
+        ORDER BY filters.company_number;
+    """).fetchall()
+
+
+def test_incremental_update_matches_a_full_build(snapshot_databases, queries):
+    _, incremental_path, full_path = snapshot_databases
+    with (
+        CompaniesHouseDB(db_path=str(incremental_path), read_only=True) as incremental,
+        CompaniesHouseDB(db_path=str(full_path), read_only=True) as full,
+    ):
+        assert incremental.row_count() == full.row_count()
+        assert fts_statistics(incremental) == fts_statistics(full)
+
+        incremental_results = incremental.search_companies_by_names(queries, limit=5)
+        full_results = full.search_companies_by_names(queries, limit=5)
+        for query in queries:
+            assert_same_ranking(incremental_results[query], full_results[query])
+
+        assert incremental.find_exact_matches(queries) == full.find_exact_matches(queries)
+
+        assert search_filter_rows(incremental) == search_filter_rows(full)
+        filters = CompanySearchFilters(company_status=["Dissolved"])
+        incremental_results = incremental.search_companies_by_names(queries, limit=5, filters=filters)
+        full_results = full.search_companies_by_names(queries, limit=5, filters=filters)
+        for query in queries:
+            assert_same_ranking(incremental_results[query], full_results[query])
+
+
+def test_incremental_update_keeps_postings_clustered_by_term(snapshot_databases):
+    _, incremental_path, _ = snapshot_databases
+    with CompaniesHouseDB(db_path=str(incremental_path), read_only=True) as db:
+        # The appended postings are a second run in termid order, after the existing ones
+        descents = db.cursor().execute(f"""
+            SELECT count(*) FROM (
+                SELECT termid < lag(termid) OVER (ORDER BY rowid) AS descent FROM {db.FTS_SCHEMA_NAME}.terms
+            )
+            WHERE descent;
+        """).fetchone()[0]
+    assert descents <= 1
+
+
+def test_incremental_update_adds_new_filter_values(register, database_path, tmp_path):
+    company = register.company(5)
+    snapshot_path = tmp_path / "snapshot.csv"
+    with open(snapshot_path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=register.COLUMNS, lineterminator="\n")
+        writer.writeheader()
+        for index in range(register.rows):
+            row = dict(register.company(index).row)
+            if index == 5:
+                row["CompanyStatus"] = "In Administration"
+            writer.writerow(row)
+    db_path = tmp_path / "incremental.duckdb"
+    shutil.copyfile(database_path, db_path)
+
+    with CompaniesHouseDB(db_path=str(db_path)) as db:
+        db.apply_snapshot_from_source(source_settings(snapshot_path, db_path))
+        filters = CompanySearchFilters(company_status=["In Administration"])
+        matches = db.search_companies_by_names([company.company_name], limit=5, filters=filters)[company.company_name]
+    assert [match.company_number for match in matches] == [company.company_number]
+
+
+def test_incremental_update_records_the_delta(register, snapshot_databases):
+    _, incremental_path, _ = snapshot_databases
+    kept = [index for index in range(register.rows) if index % 37 != 0]
+    updated = sum(1 for index in kept if index % 23 == 0 or index % 29 == 0)
+    removed = register.rows - len(kept)
+    with CompaniesHouseDB(db_path=str(incremental_path), read_only=True) as db:
+        snapshot = db.cursor().execute(f"""
+            SELECT ingest_mode, inserted_count, updated_count, removed_count
+            FROM {db.SNAPSHOTS_TABLE_NAME} ORDER BY loaded_at DESC LIMIT 1;
+        """).fetchone()
+        removals = db.cursor().execute(f"SELECT count(*) FROM {db.REMOVALS_TABLE_NAME};").fetchone()[0]
+    assert snapshot == ("incremental", 150, updated, removed)
+    assert removals == removed
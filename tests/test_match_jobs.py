@@ -0,0 +1,217 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from company_structure_api import match_jobs
+from company_structure_api.match_jobs import MatchJobRunner, MatchJobStore
+from company_structure_api.models import CompanyMatch, CompanyMatchResult, CompanySearchFilters
+
+NAMES = [f"Company {i} Ltd" for i in range(10)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    with MatchJobStore(str(tmp_path / "match_jobs.sqlite")) as store:
+        yield store
+
+
+def result_json(query: str) -> str:
+    return json.dumps({"recommended_match": None, "other_matches": [], "query": query})
+
+
+def test_jobs_record_each_item_once(store):
+    job = store.create_job("team-a", NAMES, ["company_name"], CompanySearchFilters(company_status=["Active"]))
+    assert (job.status, job.total, job.completed) == ("queued", 10, 0)
+    assert store.get_fields(job.job_id) == ["company_name"]
+    assert store.get_filters(job.job_id) == CompanySearchFilters(company_status=["Active"])
+
+    store.record_items(job.job_id, [(0, result_json(NAMES[0])), (1, result_json(NAMES[1]))], [(2, "failed")])
+    # A retried chunk overlapping finished items doesn't count them again
+    store.record_items(job.job_id, [(1, result_json("again")), (2, result_json("again")), (3, result_json(NAMES[3]))], [])
+
+    job = store.get_job(job.job_id)
+    assert (job.status, job.completed, job.failed) == ("running", 4, 1)
+    assert store.pending_items(job.job_id, 0, 3) == [(4, NAMES[4]), (5, NAMES[5]), (6, NAMES[6])]
+    assert store.pending_items(job.job_id, 8, 10) == [(8, NAMES[8]), (9, NAMES[9])]
+
+    items = json.loads(store.results_page_json(job.job_id, 1, 3))
+    assert [(item["position"], item["status"]) for item in items] == [(1, "done"), (2, "failed"), (3, "done")]
+    assert items[0]["result"]["query"] == NAMES[1]
+    assert items[1]["error"] == "failed"
+
+
+def test_unfinished_jobs_survive_a_restart(tmp_path):
+    path = str(tmp_path / "match_jobs.sqlite")
+    with MatchJobStore(path) as store:
+        running = store.create_job("team-a", NAMES, None)
+        cancelled = store.create_job("team-b", NAMES, None)
+        finished = store.create_job("team-c", NAMES, None)
+        assert store.cancel_job(cancelled.job_id)
+        assert not store.cancel_job(cancelled.job_id)
+        store.finish_job(finished.job_id)
+    with MatchJobStore(path) as store:
+        assert store.unfinished_jobs() == [(running.job_id, "team-a")]
+        store.prune(max_age_seconds=-1)
+        assert store.get_job(cancelled.job_id) is None
+        assert store.get_job(finished.job_id) is None
+        assert store.get_job(running.job_id) is not None
+
+
+class FakeMatcher:
+    """Stands in for match_names, recording the names it's asked to match."""
+
+    def __init__(self):
+        self.names: list[str] = []
+
+    async def __call__(self, names, company_visualizer, fields=None, filters=None):
+        self.names.extend(names)
+        await asyncio.sleep(0)
+        return {
+            name: CompanyMatchResult(
+                recommended_match=CompanyMatch(company_name=name.upper(), company_number="00000001", score=1.0),
+                other_matches=[],
+                decided_by="score_margin",
+            )
+            for name in names
+        }
+
+
+async def wait_for_job(store: MatchJobStore, job_id: str, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while store.get_job(job_id).status != "completed":
+        assert time.monotonic() < deadline, "The match job didn't finish."
+        await asyncio.sleep(0.01)
+    return store.get_job(job_id)
+
+
+@pytest.fixture
+def matcher(monkeypatch) -> FakeMatcher:
+    matcher = FakeMatcher()
+    monkeypatch.setattr(match_jobs, "match_names", matcher)
+    return matcher
+
+
+def runner(store: MatchJobStore, workers: int = 2, chunk_size: int = 3) -> MatchJobRunner:
+    return MatchJobRunner(store, SimpleNamespace(db=object()), workers=workers, chunk_size=chunk_size)
+
+
+@pytest.mark.asyncio
+async def test_runner_matches_every_name(store, matcher):
+    job_runner = runner(store)
+    await job_runner.start()
+    try:
+        jobs = [await job_runner.submit(team, NAMES, None) for team in ("team-a", "team-b")]
+        for job in jobs:
+            job = await wait_for_job(store, job.job_id)
+            assert (job.completed, job.failed) == (10, 0)
+            items = json.loads(store.results_page_json(job.job_id, 0, 100))
+            assert [item["result"]["recommended_match"]["CompanyName"] for item in items] == [
+                name.upper() for name in NAMES
+            ]
+    finally:
+        await job_runner.stop()
+    assert sorted(matcher.names) == sorted(NAMES * 2)
+    assert not job_runner.teams and not job_runner.in_flight_chunks
+
+
+@pytest.mark.asyncio
+async def test_resumed_jobs_only_match_pending_names(store, matcher):
+    job = store.create_job("team-a", NAMES, None)
+    store.record_items(job.job_id, [(position, result_json(NAMES[position])) for position in (0, 1, 2, 5)], [])
+
+    job_runner = runner(store)
+    await job_runner.start()
+    try:
+        job = await wait_for_job(store, job.job_id)
+    finally:
+        await job_runner.stop()
+    assert job.completed == 10
+    assert sorted(matcher.names) == sorted(NAMES[position] for position in (3, 4, 6, 7, 8, 9))
+
+
+@pytest.mark.asyncio
+async def test_retried_chunks_are_claimed_again_before_new_names(store):
+    job_runner = runner(store)
+    job = await job_runner.submit("team-a", NAMES, None)
+    _, first_chunk = await job_runner._claim_chunk()
+    _, second_chunk = await job_runner._claim_chunk()
+
+    # The first chunk fails while the second is still in flight
+    await job_runner._retry_chunk(job.job_id, first_chunk)
+
+    assert await job_runner._claim_chunk() == (job.job_id, first_chunk)
+    assert await job_runner._claim_chunk() == (job.job_id, [(6, NAMES[6]), (7, NAMES[7]), (8, NAMES[8])])
+    assert second_chunk == [(3, NAMES[3]), (4, NAMES[4]), (5, NAMES[5])]
+
+
+@pytest.mark.asyncio
+async def test_retrying_a_chunk_of_an_exhausted_job_queues_it_again(store):
+    job_runner = runner(store, chunk_size=10)
+    job = await job_runner.submit("team-a", NAMES, None)
+    _, chunk = await job_runner._claim_chunk()
+    assert await job_runner._claim_chunk() is None
+
+    await job_runner._retry_chunk(job.job_id, chunk)
+
+    assert await job_runner._claim_chunk() == (job.job_id, chunk)
+    assert store.get_job(job.job_id).status == "queued"
+
+
+@pytest.mark.asyncio
+async def test_workers_survive_job_store_errors(store, matcher, monkeypatch):
+    record_items = store.record_items
+    calls = []
+
+    def failing_record_items(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        record_items(*args)
+
+    monkeypatch.setattr(store, "record_items", failing_record_items)
+    job_runner = runner(store, workers=1)
+    await job_runner.start()
+    try:
+        job = await wait_for_job(store, (await job_runner.submit("team-a", NAMES, None)).job_id)
+    finally:
+        await job_runner.stop()
+    assert (job.completed, job.failed) == (10, 0)
+    # Only the chunk whose results weren't stored is matched again
+    assert sorted(matcher.names) == sorted(NAMES + NAMES[:3])
+
+
+@pytest.mark.asyncio
+async def test_cancelled_jobs_stop_claiming_names(store, matcher):
+    job_runner = runner(store)
+    job = await job_runner.submit("team-a", NAMES, None)
+    assert await job_runner.cancel(job.job_id)
+    assert not await job_runner.cancel(job.job_id)
+
+    assert await job_runner._claim_chunk() is None
+    assert store.get_job(job.job_id).status == "cancelled"
+    assert not job_runner.teams
+
+
+@pytest.mark.asyncio
+async def test_store_calls_run_off_the_event_loop(store, matcher, monkeypatch):
+    loop_thread = threading.get_ident()
+    store_threads = set()
+    pending_items = store.pending_items
+
+    def recording_pending_items(*args):
+        store_threads.add(threading.get_ident())
+        return pending_items(*args)
+
+    monkeypatch.setattr(store, "pending_items", recording_pending_items)
+    job_runner = runner(store)
+    await job_runner.start()
+    try:
+        await wait_for_job(store, (await job_runner.submit("team-a", NAMES, None)).job_id)
+    finally:
+        await job_runner.stop()
+    assert store_threads and loop_thread not in store_threads
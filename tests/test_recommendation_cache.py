@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from company_structure_api.recommendation_cache import RecommendationCache
+
+
+def open_cache(path, db_version: str = "v1", ttl_seconds: int = 3600, max_entries: int = 100) -> RecommendationCache:
+    cache = RecommendationCache(str(path), db_version, ttl_seconds, max_entries)
+    cache.connect()
+    return cache
+
+
+def test_keys_depend_on_the_normalized_query_and_candidates():
+    key = RecommendationCache.make_key("Acme  Ltd", ["1", "2"], "model", "v1")
+    assert key == RecommendationCache.make_key(" acme ltd ", ["1", "2"], "model", "v1")
+    assert key != RecommendationCache.make_key("Acme Ltd", ["2", "1"], "model", "v1")
+    assert key != RecommendationCache.make_key("Acme Ltd", ["1", "2"], "model", "v2")
+
+
+def test_put_many_and_get_many(tmp_path):
+    with open_cache(tmp_path / "cache.sqlite") as cache:
+        cache.put_many({"a": "00000001", "b": "00000002"})
+        assert cache.get_many(["a", "b", "c"]) == {"a": "00000001", "b": "00000002"}
+        assert cache.stats() == {"hits": 2, "misses": 1, "size": 2}
+
+
+def test_entries_persist_until_the_database_changes(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    with open_cache(path) as cache:
+        cache.put("a", "00000001")
+    with open_cache(path) as cache:
+        assert cache.get("a") == "00000001"
+    with open_cache(path, db_version="v2") as cache:
+        assert cache.get("a") is None
+        assert cache.stats()["size"] == 0
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    with open_cache(tmp_path / "cache.sqlite", ttl_seconds=60) as cache:
+        cache.put("a", "00000001")
+        monkeypatch.setattr(time, "time", lambda now=time.time(): now + 61)
+        assert cache.get("a") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    with open_cache(tmp_path / "cache.sqlite", max_entries=10) as cache:
+        for i in range(10):
+            cache.put(f"key{i}", f"{i:08}")
+            # Entries are ordered by access time
+            time.sleep(0.001)
+        assert cache.get("key0") == "00000000"
+        cache.put("key10", "00000010")
+        assert cache.stats()["size"] == 9
+        remaining = cache.get_many([f"key{i}" for i in range(11)])
+        assert set(remaining) == {"key0", *(f"key{i}" for i in range(3, 11))}
+
+
+def test_a_closed_cache_raises(tmp_path):
+    cache = open_cache(tmp_path / "cache.sqlite")
+    cache.close()
+    with pytest.raises(ConnectionError):
+        cache.get_many(["a"])
@@ -0,0 +1,71 @@
+import pytest
+
+from company_structure_api.models import CompanyMatch
+from company_structure_api.reranker import LocalReranker, create_reranker, jaro_winkler, query_hints
+
+
+@pytest.mark.parametrize("a, b, similarity", [
+    ("MARTHA", "MARHTA", 0.9611),
+    ("DWAYNE", "DUANE", 0.84),
+    ("DIXON", "DICKSONX", 0.8133),
+    ("ACME", "ACME", 1.0),
+    ("ACME", "", 0.0),
+    ("ABC", "XYZ", 0.0),
+])
+def test_jaro_winkler(a, b, similarity):
+    assert jaro_winkler(a, b) == pytest.approx(similarity, abs=1e-4)
+
+
+def match(company_number: str, company_name: str, score: float, **fields) -> CompanyMatch:
+    return CompanyMatch.model_construct(company_number=company_number, company_name=company_name, score=score, **fields)
+
+
+def test_query_hints_split_out_the_postcode_and_name():
+    hints = query_hints("Acme Holdings Limited, Leeds LS1 4AP")
+    assert hints.postcode == ("LS1", "4AP")
+    assert hints.name_keys == ("ACME HOLDINGS LIMITED LEEDS", "ACME HOLDINGS LTD")
+
+
+def test_exact_names_outrank_higher_search_scores():
+    results = LocalReranker().rerank({
+        "Acme Holdings Ltd": [
+            match("00000001", "ACME HOLDINGS GROUP LIMITED", 9.0),
+            match("00000002", "ACME HOLDINGS LIMITED", 7.5),
+        ],
+    })
+    company_number, margin = results["Acme Holdings Ltd"]
+    assert company_number == "00000002"
+    assert 0 < margin <= 1
+
+
+def test_previous_names_are_compared_too():
+    results = LocalReranker().rerank({
+        "Old Name Ltd": [
+            match("00000001", "OLD NAMES LIMITED", 9.0),
+            match("00000002", "NEW NAME LIMITED", 5.0, matched_name="OLD NAME LIMITED"),
+        ],
+    })
+    assert results["Old Name Ltd"].company_number == "00000002"
+
+
+def test_postcode_and_town_break_ties_between_equal_names():
+    candidates = [
+        match("00000001", "ACME LIMITED", 8.0, regaddress_postcode="M1 1AE", regaddress_posttown="MANCHESTER"),
+        match("00000002", "ACME LIMITED", 8.0, regaddress_postcode="LS1 4AP", regaddress_posttown="LEEDS"),
+        match("00000003", "ACME LIMITED", 8.0, regaddress_postcode="LS2 7DA", regaddress_posttown="LEEDS"),
+    ]
+    results = LocalReranker().rerank({"Acme Ltd LS1 4AP": candidates, "Acme Ltd, Leeds": candidates})
+    assert results["Acme Ltd LS1 4AP"].company_number == "00000002"
+    # Both Leeds companies match the town equally, so the earlier one wins
+    assert results["Acme Ltd, Leeds"].company_number == "00000002"
+    assert results["Acme Ltd, Leeds"].margin == pytest.approx(0)
+
+
+def test_the_only_candidate_leads_by_its_whole_score():
+    results = LocalReranker().rerank({"Acme Ltd": [match("00000001", "ACME LIMITED", 3.0)], "Nothing": []})
+    assert results == {"Acme Ltd": ("00000001", pytest.approx(0.35 + 0.2 + 0.25 + 0.1))}
+
+
+def test_create_reranker():
+    assert create_reranker("llm") is None
+    assert isinstance(create_reranker("local"), LocalReranker)
@@ -0,0 +1,106 @@
+import pytest
+
+from company_structure_api.db import CompaniesHouseDB
+from company_structure_api.models import CompanyMatch
+
+
+def assert_same_ranking(actual: list[CompanyMatch], expected: list[CompanyMatch]):
+    """
+    Asserts two searches ranked the same companies with the same scores. Companies tied on
+    the last score may be cut off differently, so those are only compared by score.
+    """
+    actual_scores = [round(match.score, 6) for match in actual]
+    expected_scores = [round(match.score, 6) for match in expected]
+    assert actual_scores == expected_scores
+    if expected_scores:
+        cutoff = expected_scores[-1]
+        assert (
+            {match.company_number for match in actual if round(match.score, 6) > cutoff}
+            == {match.company_number for match in expected if round(match.score, 6) > cutoff}
+        )
+
+
+def bm25_search(db: CompaniesHouseDB, names: list[str], limit: int = 5) -> dict[str, list[CompanyMatch]]:
+    return db.search_companies_by_names(names, limit, include_previous_names=False, include_trigrams=False)
+
+
+def test_batched_search_matches_single_searches(db, queries):
+    batched = db.search_companies_by_names(queries, limit=5)
+    assert list(batched) == list(dict.fromkeys(queries))
+    for query in queries:
+        single = db.search_companies_by_names([query], limit=5)[query]
+        assert [(m.company_number, round(m.score, 6)) for m in batched[query]] == [
+            (m.company_number, round(m.score, 6)) for m in single
+        ]
+
+
+def test_index_search_ranks_as_the_full_scan_does(db, queries):
+    index_results = bm25_search(db, queries)
+    for query in queries:
+        assert_same_ranking(index_results[query], db._search_companies_by_name_scan(query, 5))
+
+
+def test_scan_mode_applies_to_batched_searches(db, queries, monkeypatch):
+    index_results = bm25_search(db, queries)
+    monkeypatch.setattr(db, "search_mode", "scan")
+    scan_results = db.search_companies_by_names(queries, limit=5, fields=["company_name", "company_number"])
+    assert list(scan_results) == list(index_results)
+    for query in queries:
+        assert_same_ranking(scan_results[query], index_results[query])
+        assert all(
+            match.model_fields_set == {"score", "company_name", "company_number"} for match in scan_results[query]
+        )
+
+
+@pytest.mark.parametrize("limit", [1, 5, 50])
+def test_pruned_search_ranks_as_scoring_every_term(db, queries, limit):
+    pruned = bm25_search(db, queries, limit)
+    db._has_term_bounds[db.FTS_SCHEMA_NAME] = False
+    try:
+        unpruned = bm25_search(db, queries, limit)
+    finally:
+        db._has_term_bounds.pop(db.FTS_SCHEMA_NAME)
+    for query in queries:
+        assert_same_ranking(pruned[query], unpruned[query])
+
+
+def test_search_ranks_the_named_company_first(db, register):
+    company = register.company(123)
+    matches = db.search_companies_by_names([company.company_name], limit=5)[company.company_name]
+    assert company.company_number in [
+        match.company_number for match in matches if match.score == matches[0].score
+    ]
+
+
+def test_search_selects_only_the_requested_fields(db, register):
+    name = register.company(7).company_name
+    matches = db.search_companies_by_names([name], limit=3, fields=["company_name", "company_number"])[name]
+    assert matches
+    for match in matches:
+        assert match.model_fields_set <= {
+            "company_name", "company_number", "score", "similarity", "matched_name", "matched_name_changed_on",
+        }
+
+
+def test_search_finds_previous_names(db, register):
+    company = next(
+        company for company in map(register.company, range(register.rows)) if company.previous_names
+    )
+    previous_name = company.previous_names[0]
+    matches = db.search_companies_by_names([previous_name], limit=10)[previous_name]
+    match = next(match for match in matches if match.company_number == company.company_number)
+    assert match.matched_name == previous_name
+    assert match.matched_name_changed_on is not None
+
+
+def test_trigram_search_finds_names_with_typos(db, register):
+    company = register.company(42)
+    # Run the words together, which word search can't match
+    query = company.company_name.rsplit(" ", 1)[0].replace(" ", "")
+    matches = db.search_companies_by_names([query], limit=5)[query]
+    match = next(match for match in matches if match.company_number == company.company_number)
+    assert 0.5 <= match.similarity <= 1
+
+
+def test_names_without_terms_have_no_matches(db):
+    assert db.search_companies_by_names(["", "!!!"], limit=5) == {"": [], "!!!": []}
@@ -0,0 +1,71 @@
+from datetime import date
+
+import pydantic
+import pytest
+
+from company_structure_api.models import CompanySearchFilters
+
+FILTERS = [
+    CompanySearchFilters(company_status=["active"]),
+    CompanySearchFilters(company_status=["Liquidation", "Dissolved"]),
+    CompanySearchFilters(company_category=["public limited company"]),
+    CompanySearchFilters(postcode_prefix="ls"),
+    CompanySearchFilters(postcode_prefix="LS1"),
+    CompanySearchFilters(sic_codes=["62"]),
+    CompanySearchFilters(sic_codes=["41100", "56101"]),
+    CompanySearchFilters(incorporated_from=date(2000, 1, 1), incorporated_to=date(2010, 12, 31)),
+    CompanySearchFilters(company_status=["Active"], postcode_prefix="EC1"),
+]
+
+
+def test_filter_values_are_validated():
+    assert CompanySearchFilters(postcode_prefix=" ls1  4 ").postcode_prefix == "LS1 4"
+    for invalid in (
+        {"postcode_prefix": "1LS"},
+        {"sic_codes": ["6201x"]},
+        {"sic_codes": ["620123"]},
+        {"company_status": []},
+        {"incorporated_from": "2020-01-01", "incorporated_to": "2019-01-01"},
+    ):
+        with pytest.raises(pydantic.ValidationError):
+            CompanySearchFilters(**invalid)
+    assert CompanySearchFilters().is_empty()
+
+
+@pytest.mark.parametrize("filters", FILTERS, ids=lambda filters: filters.model_dump_json(exclude_none=True))
+def test_filtered_search_only_matches_companies_passing_the_filters(db, queries, filters):
+    filtered = db.search_companies_by_names(
+        queries, limit=5, include_previous_names=False, include_trigrams=False, filters=filters
+    )
+    unfiltered = db.search_companies_by_names(
+        queries, limit=50, include_previous_names=False, include_trigrams=False
+    )
+    for query in queries:
+        assert all(filters.matches(match) for match in filtered[query])
+        # Companies passing the filters rank as they do in an unfiltered search
+        passing = [match for match in unfiltered[query] if filters.matches(match)]
+        if filtered[query] and len(passing) > len(filtered[query]):
+            cutoff = round(filtered[query][-1].score, 6)
+            assert {m.company_number for m in filtered[query] if round(m.score, 6) > cutoff} == {
+                m.company_number for m in passing if round(m.score, 6) > cutoff
+            }
+
+
+def test_filters_excluding_every_company_match_nothing(db, queries):
+    results = db.search_companies_by_names(queries, limit=5, filters=CompanySearchFilters(company_status=["Unknown"]))
+    assert all(matches == [] for matches in results.values())
+
+
+@pytest.mark.parametrize("search_mode", ["scan", "compare"])
+def test_filters_apply_in_every_search_mode(db, queries, search_mode, monkeypatch):
+    filters = CompanySearchFilters(company_status=["active"])
+    expected = db.search_companies_by_names(
+        queries, limit=5, include_previous_names=False, include_trigrams=False, filters=filters
+    )
+    monkeypatch.setattr(db, "search_mode", search_mode)
+    results = db.search_companies_by_names(
+        queries, limit=5, include_previous_names=False, include_trigrams=False, filters=filters
+    )
+    for query in queries:
+        assert all(filters.matches(match) for match in results[query])
+        assert [round(m.score, 6) for m in results[query]] == [round(m.score, 6) for m in expected[query]]
@@ -0,0 +1,54 @@
+import pytest
+
+from company_structure_api.company_names import normalize_company_name_key
+from company_structure_api.suggest_index import CompanySuggestIndex
+
+
+@pytest.fixture(scope="module")
+def suggest_index(db, tmp_path_factory) -> CompanySuggestIndex:
+    path = tmp_path_factory.mktemp("suggest") / "companies.duckdb.suggest.arrow"
+    CompanySuggestIndex.write(db.suggest_index_table(), path)
+    return CompanySuggestIndex.open(path)
+
+
+def test_suggests_names_by_normalized_prefix(suggest_index, register):
+    company = register.company(10)
+    prefix = company.company_name.title()[:8]
+    suggestions = suggest_index.suggest(prefix, limit=50)
+    assert suggestions
+    for suggestion in suggestions:
+        assert normalize_company_name_key(suggestion.company_name).startswith(normalize_company_name_key(prefix))
+    keys = [normalize_company_name_key(suggestion.company_name) for suggestion in suggestions]
+    assert keys == sorted(keys)
+
+
+def test_suggests_full_names_with_either_suffix_spelling(suggest_index, register):
+    company = next(
+        company for company in map(register.company, range(register.rows)) if company.company_name.endswith(" LIMITED")
+    )
+    for query in (company.company_name, company.company_name.removesuffix("LIMITED") + "ltd"):
+        numbers = [suggestion.company_number for suggestion in suggest_index.suggest(query, limit=50)]
+        assert company.company_number in numbers
+
+
+def test_suggests_full_names_while_the_suffix_is_typed(suggest_index, register):
+    company = next(
+        company for company in map(register.company, range(register.rows)) if company.company_name.endswith(" LIMITED")
+    )
+    name = company.company_name.removesuffix("LIMITED").lower()
+    for query in (name + "l", name + "limi", name + "limite"):
+        numbers = [suggestion.company_number for suggestion in suggest_index.suggest(query, limit=50)]
+        assert company.company_number in numbers
+
+
+def test_suggests_company_numbers_without_leading_zeros(suggest_index, register):
+    company = next(
+        company for company in map(register.company, range(register.rows)) if company.company_number.isdigit()
+    )
+    suggestions = suggest_index.suggest(company.company_number.lstrip("0"), limit=5)
+    assert suggestions[0].company_number == company.company_number
+
+
+def test_suggests_nothing_for_unknown_prefixes(suggest_index):
+    assert suggest_index.suggest("zzzz", limit=5) == []
+    assert len(suggest_index) > 0